@@ -0,0 +1,140 @@
+# achievements.py - Badges awarded incrementally from attempt events
+# Every original attempt updates a small per-user state row (attempt count, best score,
+# models used, day streak, times of the latest passing attempts) and awards any badge
+# whose rule that state now satisfies: constant work per attempt, no history queries.
+# Replaying the same update over the whole history in (user, created_at) order rebuilds
+# every state and badge from scratch (backfill_achievements below).
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PERFECT_SCORE = 95.0            # Perfectionist
+PASSING_SCORE = 70.0            # attempts that count towards Speed Demon
+SPEED_DEMON_ATTEMPTS = 5        # ... this many passing attempts
+SPEED_DEMON_WINDOW_SECONDS = 600    # ... within this many seconds
+STREAK_DAYS = 5                 # Consistency Master: attempts on this many consecutive days
+EXPLORER_MODELS = ["openai", "claude", "gemini"]    # Model Explorer: used all of them
+
+BACKFILL_BATCH_SIZE = 5000
+
+# (achievement_type, achievement_name); the position is the bit in AchievementState.earned
+ACHIEVEMENTS = [
+    ("first_attempt", "First Steps"),
+    ("perfect_score", "Perfectionist"),
+    ("speed_demon", "Speed Demon"),
+    ("consistency", "Consistency Master"),
+    ("multi_model", "Model Explorer"),
+]
+ACHIEVEMENT_TYPES = [achievement_type for achievement_type, _ in ACHIEVEMENTS]
+
+STATE_COLUMNS = ["attempts", "best_score", "models", "streak_days", "last_day", "recent_passes", "earned"]
+
+
+class AchievementState:
+    """Per-user counters the badge rules are evaluated against"""
+
+    def __init__(self, attempts: int = 0, best_score: float = 0.0, models: int = 0, streak_days: int = 0,
+                 last_day: int = 0, recent_passes: str = "", earned: int = 0):
+        self.attempts = attempts
+        self.best_score = best_score
+        self.models = models                # bit per EXPLORER_MODELS entry
+        self.streak_days = streak_days
+        self.last_day = last_day            # proleptic ordinal of the latest attempt's day
+        self.recent_passes = recent_passes  # epoch seconds of the latest passing attempts
+        self.earned = earned                # bit per ACHIEVEMENTS entry
+
+    @classmethod
+    def from_row(cls, row) -> "AchievementState":
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return tuple(getattr(self, column) for column in STATE_COLUMNS)
+
+
+def earned_mask(achievement_types) -> int:
+    """`earned` bits for already-awarded achievement types (unknown types are ignored)"""
+    mask = 0
+    for achievement_type in achievement_types:
+        if achievement_type in ACHIEVEMENT_TYPES:
+            mask |= 1 << ACHIEVEMENT_TYPES.index(achievement_type)
+    return mask
+
+
+def parse_created_at(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def apply_attempt(state: AchievementState, model_name: str, total_score: float,
+                  created_at: Any) -> List[Tuple[str, str]]:
+    """Fold one attempt into `state` and return the achievements it unlocks"""
+    created = parse_created_at(created_at)
+    state.attempts += 1
+    state.best_score = max(state.best_score, total_score)
+    if model_name in EXPLORER_MODELS:
+        state.models |= 1 << EXPLORER_MODELS.index(model_name)
+
+    day = created.toordinal()
+    if day == state.last_day + 1:
+        state.streak_days += 1
+    elif day > state.last_day:
+        state.streak_days = 1
+    state.last_day = max(state.last_day, day)
+
+    passes: List[int] = [int(t) for t in state.recent_passes.split()]
+    if total_score >= PASSING_SCORE:
+        passes = (passes + [int(created.timestamp())])[-SPEED_DEMON_ATTEMPTS:]
+        state.recent_passes = " ".join(map(str, passes))
+
+    reached = {
+        "first_attempt": True,
+        "perfect_score": state.best_score >= PERFECT_SCORE,
+        "speed_demon": len(passes) == SPEED_DEMON_ATTEMPTS
+                       and passes[-1] - passes[0] <= SPEED_DEMON_WINDOW_SECONDS,
+        "consistency": state.streak_days >= STREAK_DAYS,
+        "multi_model": state.models == (1 << len(EXPLORER_MODELS)) - 1,
+    }
+
+    unlocked = []
+    for bit, (achievement_type, name) in enumerate(ACHIEVEMENTS):
+        if reached[achievement_type] and not state.earned & (1 << bit):
+            state.earned |= 1 << bit
+            unlocked.append((achievement_type, name))
+    return unlocked
+
+
+async def backfill_achievements(storage, batch_size: int = BACKFILL_BATCH_SIZE,
+                                progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+    """Rebuild every user's state and badges in one streaming pass over the history.
+    Badges keep the timestamp of the attempt that earned them."""
+    await storage.reset_achievements()
+    totals = {"attempts": 0, "users": 0, "awarded": 0}
+    states: List[Tuple[int, AchievementState]] = []
+    awards: List[Tuple[int, str, str, str]] = []
+    user_id, state = None, None
+
+    async def flush():
+        await storage.save_achievement_states(states, awards)
+        totals["users"] += len(states)
+        totals["awarded"] += len(awards)
+        states.clear()
+        awards.clear()
+
+    async for rows in storage.iter_achievement_events(batch_size):
+        for row_user_id, model_name, total_score, created_at in rows:
+            if row_user_id != user_id:
+                if state is not None:
+                    states.append((user_id, state))
+                user_id, state = row_user_id, AchievementState()
+            earned_at = parse_created_at(created_at).strftime("%Y-%m-%d %H:%M:%S")
+            for achievement_type, name in apply_attempt(state, model_name, total_score, created_at):
+                awards.append((user_id, achievement_type, name, earned_at))
+        totals["attempts"] += len(rows)
+        if len(states) >= batch_size:
+            await flush()
+        if progress:
+            progress(totals["attempts"])
+
+    if state is not None:
+        states.append((user_id, state))
+    await flush()
+    return totals
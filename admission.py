@@ -0,0 +1,78 @@
+# admission.py - Concurrency cap with a bounded wait queue for expensive endpoints
+# Each worker runs at most `max_concurrency` evaluations at once. Up to `max_queue`
+# further requests wait (for at most `queue_timeout` seconds) for a slot; anything
+# beyond that is rejected straight away so an overloaded worker sheds load in
+# microseconds instead of stacking up requests that will time out anyway.
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+
+class AdmissionRejected(Exception):
+    """No slot available; retry_after is a hint in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-process semaphore plus queue accounting and metrics"""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.avg_seconds = 1.0   # EWMA of time spent holding a slot, for Retry-After
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def retry_after(self) -> int:
+        """Rough time until the current queue drains"""
+        backlog = (self.waiting + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(self.avg_seconds * backlog))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot for the body of the `async with`, or raise AdmissionRejected"""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.stats["rejected_queue_full"] += 1
+                raise AdmissionRejected("queue_full", self.retry_after())
+            self.stats["queued"] += 1
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["rejected_timeout"] += 1
+                raise AdmissionRejected("queue_timeout", self.retry_after())
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.stats["admitted"] += 1
+        self.active += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.avg_seconds = 0.9 * self.avg_seconds + 0.1 * (time.perf_counter() - started)
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_seconds": round(self.avg_seconds, 3),
+        }
@@ -0,0 +1,49 @@
+# archive_attempts.py - Move old attempts out of the hot table into monthly archive files
+# Attempts created more than --older-than-days ago are copied to archive/attempts_YYYY_MM.db
+# next to the database and deleted from the attempts table, in short batches (safe to run
+# while the API is serving). History endpoints, exports and rebuilds keep reading them
+# through the attempt_archives manifest; see attempt_archive.py. SQLite only.
+#
+#   python archive_attempts.py --db prompt_trainer.db --older-than-days 180
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from attempt_archive import DEFAULT_ARCHIVE_BATCH_SIZE
+from storage import create_storage
+
+DATABASE_PATH = "prompt_trainer.db"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive attempts older than a given age")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL", DATABASE_PATH),
+                        help="SQLite database file (default: $DATABASE_URL)")
+    parser.add_argument("--older-than-days", type=float, default=float(os.getenv("ATTEMPT_ARCHIVE_DAYS", "180")),
+                        help="Archive attempts created before this many days ago (default: $ATTEMPT_ARCHIVE_DAYS or 180)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_ARCHIVE_BATCH_SIZE)
+    return parser.parse_args()
+
+async def run(db: str, older_than: datetime, batch_size: int):
+    storage = create_storage(db)
+    if storage.backend != "sqlite":
+        sys.exit("❌ Archiving is SQLite only; on PostgreSQL partition the attempts table by month instead")
+    await storage.init_schema()
+    return await storage.archive_attempts(
+        older_than, batch_size, progress=lambda month, moved: print(f"   ... {month}: {moved:,} attempts")
+    )
+
+def main():
+    args = parse_args()
+    older_than = datetime.utcnow() - timedelta(days=args.older_than_days)
+    print(f"🗃️ Archiving attempts created before {older_than:%Y-%m-%d %H:%M} UTC...")
+    started = time.perf_counter()
+    moved = asyncio.run(run(args.db, older_than, args.batch_size))
+    print(f"✅ Archived {sum(moved.values()):,} attempts from {len(moved)} months "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
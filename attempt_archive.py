@@ -0,0 +1,100 @@
+# attempt_archive.py - Hot/cold split of the SQLite attempts table
+# SQLiteStorage.archive_attempts() moves attempts older than a cutoff into one SQLite file
+# per calendar month (archive/attempts_2026_01.db next to the database), so the hot table
+# and its indexes only hold recent history. The attempt_archives manifest in the main
+# database lists each month's file, its row count and id range, and `through`: archived
+# rows count only when created_at < through, and every hot row is at or after it. A move
+# commits to the archive file first and to the main database second (WAL gives no atomic
+# commit across files), so rows of an interrupted move are still hot and are ignored in
+# the archive until a rerun finishes it.
+# Readers attach an archive (ATTACH) only when a query reaches back into its month.
+# Aggregates that need the whole history read the archived_rollups counts instead.
+# Archived rows keep the compact encoding, so a file is only readable next to its database.
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Union
+from urllib.parse import quote
+
+ARCHIVE_DIR = "archive"
+DEFAULT_ARCHIVE_BATCH_SIZE = 5000
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"   # how SQLite stores created_at
+
+
+class ArchiveMonth(NamedTuple):
+    month: str        # "2026-01"
+    path: str         # resolved file path
+    through: str      # archived rows are the month's attempts with created_at < through
+    attempts: int
+    min_id: int
+    max_id: int
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(moment: datetime) -> datetime:
+    """Start of the month after the one `moment` falls in"""
+    return (month_start(moment) + timedelta(days=32)).replace(day=1)
+
+
+def archive_file_name(month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"attempts_{month.replace('-', '_')}.db")
+
+
+def resolve_archive_path(db_path: str, path: str) -> str:
+    """Manifest paths are relative to the database's directory, so the pair can be moved"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), path)
+
+
+def list_archives(conn: sqlite3.Connection, db_path: str, newest_first: bool = False,
+                  since: Optional[str] = None, until: Optional[str] = None,
+                  after_id: Optional[int] = None) -> List[ArchiveMonth]:
+    """Archived months that can hold rows with since <= created_at < until and id > after_id"""
+    conditions, params = ["attempts > 0"], []
+    if since is not None:
+        conditions.append("through > ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("month || '-01 00:00:00' < ?")
+        params.append(until)
+    if after_id is not None:
+        conditions.append("max_id > ?")
+        params.append(after_id)
+    try:
+        rows = conn.execute(f'''
+            SELECT month, path, through, attempts, min_id, max_id FROM attempt_archives
+            WHERE {" AND ".join(conditions)}
+            ORDER BY month {"DESC" if newest_first else "ASC"}
+        ''', params).fetchall()
+    except sqlite3.OperationalError:   # a database that was never archived (or predates archiving)
+        return []
+    return [ArchiveMonth(row[0], resolve_archive_path(db_path, row[1]), *row[2:]) for row in rows]
+
+
+@contextmanager
+def attached(conn: sqlite3.Connection, path: str, create: bool = False, uri: bool = False,
+             alias: str = "archive") -> Iterator[str]:
+    """ATTACH an archive file for the duration of the block. uri=True (for connections
+    opened with uri=True) attaches it read-only."""
+    if not create and not os.path.exists(path):
+        raise FileNotFoundError(f"Attempt archive {path} is missing")
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{quote(path)}?mode=ro" if uri else path,))
+    try:
+        yield alias
+    finally:
+        conn.execute(f"DETACH DATABASE {alias}")
+
+
+def open_archive(path: str) -> sqlite3.Connection:
+    """Read-only connection to one archive file, for readers that merge several at once"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Attempt archive {path} is missing")
+    return sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True)
+
+
+def as_timestamp(moment: Union[str, datetime]) -> str:
+    return moment if isinstance(moment, str) else moment.strftime(TIMESTAMP_FORMAT)
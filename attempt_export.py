@@ -0,0 +1,268 @@
+# attempt_export.py - Streaming export of the attempts table
+# Shared by the /api/admin/export/attempts endpoint and the export_attempts.py CLI.
+# Rows are read through a read-only connection in fixed-size chunks, so memory stays
+# bounded and (with the database in WAL mode) evaluation writes are never blocked.
+# Archived months (attempt_archive.py) in the requested range are attached and exported
+# first, oldest first, followed by the hot table.
+
+import asyncio
+import csv
+import io
+import json
+import sqlite3
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from compact_storage import FeedbackCodec, METRIC_KEYS, join_metrics, decompress_text
+from attempt_archive import attached, list_archives
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+BASE_COLUMNS = [
+    "id", "user_id", "username", "challenge_id", "model_name", "prompt", "ai_response",
+    "semantic_accuracy", "task_compliance", "style_match", "efficiency_score", "total_score",
+    "time_taken", "created_at",
+]
+
+# _generate_feedback emits at most one message per dimension plus an overall one
+MAX_FEEDBACK_ITEMS = 5
+
+COLUMNS = (
+    BASE_COLUMNS
+    + [f"metric_{key}" for key in METRIC_KEYS]
+    + ["feedback_count"]
+    + [f"feedback_{n}" for n in range(1, MAX_FEEDBACK_ITEMS + 1)]
+)
+
+
+def normalize_timestamp(value: Optional[Any]) -> Optional[str]:
+    """Convert a date/datetime (or ISO string) into the format SQLite stores created_at in"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_export_query(challenge_id: Optional[str] = None, user_id: Optional[int] = None,
+                       model_name: Optional[str] = None, since: Optional[Any] = None,
+                       until: Optional[Any] = None, numbered: bool = False,
+                       table: str = "attempts", through: Optional[str] = None):
+    """SQL and parameters for the filtered export, in primary-key order.
+    numbered=True writes PostgreSQL-style $1, $2 placeholders instead of ?.
+    table/through read an attached archive, up to its `through` timestamp."""
+    conditions = []
+    params: List[Any] = []
+
+    def placeholder(value, cast: str = "") -> str:
+        params.append(value)
+        return f"${len(params)}{cast}" if numbered else "?"
+
+    if challenge_id:
+        conditions.append(f"a.challenge_id = {placeholder(challenge_id)}")
+    if user_id is not None:
+        conditions.append(f"a.user_id = {placeholder(user_id)}")
+    if model_name:
+        conditions.append(f"a.model_name = {placeholder(model_name)}")
+    if since is not None:
+        conditions.append(f"a.created_at >= {placeholder(normalize_timestamp(since), '::text::timestamp')}")
+    if until is not None:
+        conditions.append(f"a.created_at < {placeholder(normalize_timestamp(until), '::text::timestamp')}")
+    if through is not None:
+        conditions.append(f"a.created_at < {placeholder(through)}")
+
+    sql = '''
+        SELECT a.id, a.user_id, u.username, a.challenge_id, a.model_name, a.prompt, a.ai_response,
+               a.semantic_accuracy, a.task_compliance, a.style_match, a.efficiency_score, a.total_score,
+               a.time_taken, a.created_at, a.feedback, a.detailed_metrics,
+               a.metric_response_length, a.metric_prompt_length, a.metric_readability_grade,
+               a.metric_complexity_score
+        FROM {table} a
+        LEFT JOIN users u ON a.user_id = u.id
+    '''.format(table=table)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY a.id"
+    return sql, params
+
+
+def expand_row(row, feedback_codec: FeedbackCodec) -> Dict[str, Any]:
+    """Flatten one attempts row, expanding detailed_metrics and feedback into columns"""
+    record = dict(zip(BASE_COLUMNS, row[:len(BASE_COLUMNS)]))
+    record["ai_response"] = decompress_text(record["ai_response"])
+    feedback_value, extra_metrics = row[len(BASE_COLUMNS)], row[len(BASE_COLUMNS) + 1]
+
+    try:
+        metrics = join_metrics(row[len(BASE_COLUMNS) + 2:], extra_metrics)
+    except ValueError:
+        metrics = {}
+    for key in METRIC_KEYS:
+        record[f"metric_{key}"] = metrics.get(key)
+
+    try:
+        feedback = feedback_codec.decode(feedback_value)
+    except ValueError:
+        feedback = [feedback_value]
+    record["feedback_count"] = len(feedback)
+    for n in range(MAX_FEEDBACK_ITEMS):
+        record[f"feedback_{n + 1}"] = feedback[n] if n < len(feedback) else None
+    return record
+
+
+def open_read_only(db_path: str) -> sqlite3.Connection:
+    """Read-only connection; usable from whichever worker thread pulls the next chunk"""
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+
+
+def iter_attempt_chunks(db_path: str, filters: Dict[str, Any],
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of expanded rows, at most `chunk_size` at a time"""
+    feedback_codec = FeedbackCodec(db_path)
+    conn = open_read_only(db_path)
+    try:
+        archives = list_archives(conn, db_path, since=normalize_timestamp(filters.get("since")),
+                                 until=normalize_timestamp(filters.get("until")))
+        for archive in archives:
+            with attached(conn, archive.path, uri=True) as alias:
+                sql, params = build_export_query(**filters, table=f"{alias}.attempts", through=archive.through)
+                yield from _read_chunks(conn, sql, params, chunk_size, feedback_codec)
+        sql, params = build_export_query(**filters)
+        yield from _read_chunks(conn, sql, params, chunk_size, feedback_codec)
+    finally:
+        conn.close()
+
+
+def _read_chunks(conn: sqlite3.Connection, sql: str, params: List[Any], chunk_size: int,
+                 feedback_codec: FeedbackCodec) -> Iterator[List[Dict[str, Any]]]:
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [expand_row(row, feedback_codec) for row in rows]
+    finally:
+        cursor.close()
+
+
+def iter_async_chunks(chunks: AsyncIterator[List[Dict[str, Any]]],
+                      loop: asyncio.AbstractEventLoop) -> Iterator[List[Dict[str, Any]]]:
+    """Pull chunks from an async iterator running on `loop`, from a worker thread.
+    Lets the sync streamers below serve backends whose driver is async."""
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        # Never wait here: the generator may be finalized on the event loop thread itself
+        asyncio.run_coroutine_threadsafe(chunks.aclose(), loop)
+
+
+def stream_csv(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_ndjson(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def stream_parquet(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """One Parquet row group per chunk; bytes are yielded as soon as each group is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()), ("user_id", pa.int64()), ("username", pa.string()),
+            ("challenge_id", pa.string()), ("model_name", pa.string()), ("prompt", pa.string()),
+            ("ai_response", pa.string()), ("semantic_accuracy", pa.float64()),
+            ("task_compliance", pa.float64()), ("style_match", pa.float64()),
+            ("efficiency_score", pa.float64()), ("total_score", pa.float64()),
+            ("time_taken", pa.int64()), ("created_at", pa.string()),
+            ("metric_response_length", pa.int64()), ("metric_prompt_length", pa.int64()),
+            ("metric_readability_grade", pa.float64()), ("metric_complexity_score", pa.float64()),
+            ("feedback_count", pa.int64()),
+        ]
+        + [(f"feedback_{n}", pa.string()) for n in range(1, MAX_FEEDBACK_ITEMS + 1)]
+    )
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for chunk in chunks:
+            for record in chunk:
+                if record["created_at"] is not None:
+                    record["created_at"] = str(record["created_at"])
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+STREAMERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "parquet": stream_parquet,
+}
+
+
+def stream_chunks(export_format: str, chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """Encode expanded row chunks in the requested format"""
+    if export_format not in STREAMERS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    return STREAMERS[export_format](chunks)
+
+
+def export_attempts(db_path: str, export_format: str, filters: Dict[str, Any],
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Byte stream of the filtered attempts in the requested format"""
+    return stream_chunks(export_format, iter_attempt_chunks(db_path, filters, chunk_size))
@@ -0,0 +1,47 @@
+# backfill_achievements.py - Rebuild achievements from the attempts history
+# Replays every original attempt through the achievements engine in one streaming pass
+# (per user, oldest first) and rewrites all achievement state and engine-awarded badges.
+# Run it once after upgrading to the achievements engine, or after changing a badge rule.
+# Stop the API first: attempts recorded during the pass would be applied twice.
+#
+#   python backfill_achievements.py --db prompt_trainer.db
+#   python backfill_achievements.py --db postgresql://localhost/prompt_trainer
+
+import argparse
+import asyncio
+import os
+import time
+
+from achievements import BACKFILL_BATCH_SIZE, backfill_achievements
+from storage import create_storage
+
+DATABASE_PATH = "prompt_trainer.db"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute achievements from the attempts history")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL", DATABASE_PATH),
+                        help="SQLite database file or postgresql:// URL (default: $DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    return parser.parse_args()
+
+async def run(db: str, batch_size: int):
+    storage = create_storage(db, pool_min_size=1, pool_max_size=2)
+    await storage.connect()
+    try:
+        await storage.init_schema()
+        return await backfill_achievements(
+            storage, batch_size, progress=lambda attempts: print(f"   ... replayed {attempts:,} attempts")
+        )
+    finally:
+        await storage.close()
+
+def main():
+    args = parse_args()
+    print("🏆 Rebuilding achievements from attempt history...")
+    started = time.perf_counter()
+    totals = asyncio.run(run(args.db, args.batch_size))
+    print(f"✅ Replayed {totals['attempts']:,} attempts for {totals['users']:,} users "
+          f"and awarded {totals['awarded']:,} achievements in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
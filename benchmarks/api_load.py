@@ -0,0 +1,289 @@
+# benchmarks/api_load.py - End-to-end load test for the FastAPI backend
+# Boots `main.app` in-process (no network), swaps the AI providers for a deterministic
+# mock with configurable latency, seeds a database of the chosen size and drives a
+# mixed workload at fixed concurrency. Results are written as a JSON baseline.
+#
+#   python benchmarks/api_load.py --users 2000 --attempts-per-user 20 --concurrency 32 \
+#       --duration 30 --model-latency 0.05 --output api_baseline.json
+#   python benchmarks/api_load.py ... --compare api_baseline.json
+#
+# Backends are compared with the same workload: --database-url postgresql://... copies
+# the seeded dataset into PostgreSQL and runs the API against it instead of SQLite.
+#   python benchmarks/api_load.py --seed 42 --output sqlite.json
+#   python benchmarks/api_load.py --seed 42 --database-url postgresql://localhost/bench \
+#       --output postgres.json --compare sqlite.json
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from common import (
+    MockAIModelManager, HashingSentenceModel, summarize_latencies,
+    baseline_metadata, write_baseline, compare_baselines
+)
+
+import httpx
+import database_setup
+
+# (operation, relative weight) - roughly the production request mix
+WORKLOAD = [
+    ("POST /api/auth/login", 4),
+    ("POST /api/auth/register", 1),
+    ("GET /api/challenges", 15),
+    ("GET /api/challenges/{challenge_id}", 10),
+    ("POST /api/evaluate", 20),
+    ("GET /api/leaderboard/{challenge_id}", 20),
+    ("GET /api/user/progress", 15),
+    ("GET /api/user/stats", 15),
+]
+
+PROMPT_SUFFIXES = [
+    "",
+    " Keep it under 120 words.",
+    " Use a professional tone.",
+    " Write casually and keep it friendly.",
+    " Include the required keywords and a clear call to action.",
+]
+
+
+class Worker:
+    """One simulated client: logs in once, then issues requests from the weighted mix"""
+
+    def __init__(self, worker_id: int, client: httpx.AsyncClient, username: str,
+                 challenge_ids: List[str], seed: int, run_id: str):
+        self.worker_id = worker_id
+        self.client = client
+        self.username = username
+        self.challenge_ids = challenge_ids
+        self.rng = random.Random(seed * 1000 + worker_id)
+        self.run_id = run_id
+        self.token = None
+        self.registered = 0
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post(
+            "/api/auth/login", json={"username": self.username, "password": "password123"}
+        )
+        if response.status_code == 200:
+            self.token = response.json()["token"]
+        return response
+
+    async def perform(self, operation: str) -> httpx.Response:
+        challenge_id = self.rng.choice(self.challenge_ids)
+        if operation == "POST /api/auth/login":
+            return await self.login()
+        if operation == "POST /api/auth/register":
+            self.registered += 1
+            name = f"bench_{self.run_id}_{self.worker_id}_{self.registered}"
+            return await self.client.post("/api/auth/register", json={
+                "username": name, "email": f"{name}@bench.local", "password": "password123"
+            })
+        if operation == "GET /api/challenges":
+            return await self.client.get("/api/challenges")
+        if operation == "GET /api/challenges/{challenge_id}":
+            return await self.client.get(f"/api/challenges/{challenge_id}")
+        if operation == "POST /api/evaluate":
+            prompts = database_setup.SAMPLE_PROMPTS.get(challenge_id) or [
+                f"Create a response for the {challenge_id} challenge following all the requirements."
+            ]
+            prompt = self.rng.choice(prompts) + self.rng.choice(PROMPT_SUFFIXES)
+            return await self.client.post("/api/evaluate", headers=self.headers, json={
+                "challenge_id": challenge_id,
+                "prompt": prompt,
+                "model_name": self.rng.choice(database_setup.MODELS)
+            })
+        if operation == "GET /api/leaderboard/{challenge_id}":
+            return await self.client.get(f"/api/leaderboard/{challenge_id}")
+        if operation == "GET /api/user/progress":
+            return await self.client.get("/api/user/progress", headers=self.headers)
+        if operation == "GET /api/user/stats":
+            return await self.client.get("/api/user/stats", headers=self.headers)
+        raise ValueError(f"Unknown operation {operation}")
+
+
+async def run_workload(app, usernames: List[str], challenge_ids: List[str], args) -> Tuple[Dict, float]:
+    """Drive the app with `args.concurrency` workers; returns per-operation samples and wall time"""
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    operations = [op for op, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    run_id = str(int(time.time()))
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+        workers = [
+            Worker(i, client, usernames[i % len(usernames)], challenge_ids, args.seed, run_id)
+            for i in range(args.concurrency)
+        ]
+        for worker in workers:
+            response = await worker.login()
+            if response.status_code != 200:
+                raise RuntimeError(f"Login failed for {worker.username}: {response.text}")
+
+        deadline = time.perf_counter() + args.duration
+        budget = {"remaining": args.requests}
+
+        async def drive(worker: Worker):
+            while True:
+                if args.requests:
+                    if budget["remaining"] <= 0:
+                        return
+                    budget["remaining"] -= 1
+                elif time.perf_counter() >= deadline:
+                    return
+                operation = worker.rng.choices(operations, weights=weights)[0]
+                started = time.perf_counter()
+                try:
+                    response = await worker.perform(operation)
+                    status_code = response.status_code
+                except Exception:
+                    status_code = 599
+                samples[operation].append((time.perf_counter() - started, status_code))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(drive(worker) for worker in workers))
+        wall_time = time.perf_counter() - started
+
+    return samples, wall_time
+
+
+def build_results(samples: Dict[str, List[Tuple[float, int]]], wall_time: float) -> Dict:
+    results = {}
+    all_latencies = []
+    for operation, entries in sorted(samples.items()):
+        latencies = [latency for latency, _ in entries]
+        errors = sum(1 for _, status_code in entries if status_code >= 400)
+        all_latencies.extend(latencies)
+        results[operation] = {
+            "requests": len(entries),
+            "errors": errors,
+            "throughput_rps": round(len(entries) / wall_time, 3),
+            "latency_ms": summarize_latencies(latencies),
+        }
+    results["ALL"] = {
+        "requests": len(all_latencies),
+        "errors": sum(entry["errors"] for entry in results.values()),
+        "throughput_rps": round(len(all_latencies) / wall_time, 3),
+        "latency_ms": summarize_latencies(all_latencies),
+    }
+    return results
+
+
+def print_results(results: Dict, wall_time: float):
+    print(f"\n📊 Results ({wall_time:.1f}s wall time)")
+    print(f"{'operation':40s} {'reqs':>7s} {'err':>5s} {'rps':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for operation, entry in results.items():
+        latency = entry["latency_ms"]
+        print(f"{operation:40s} {entry['requests']:7d} {entry['errors']:5d} {entry['throughput_rps']:9.1f} "
+              f"{latency['p50']:9.2f} {latency['p95']:9.2f} {latency['p99']:9.2f}")
+
+
+def prepare_app(database_url: str, args):
+    """Import main.py and point it at the benchmark database and mock providers"""
+    # A handful of simulated users generate all the load; the per-user and per-model
+    # evaluation rate limits would reject most of it (set the variables to measure them)
+    os.environ.setdefault("EVALUATE_USER_RATE", "0")
+    os.environ.setdefault("EVALUATE_MODEL_RATE", "0")
+    import main
+
+    main.use_storage(database_url)
+    main.ai_manager = MockAIModelManager(latency=args.model_latency, jitter=args.model_jitter, seed=args.seed)
+    if args.hash_embeddings:
+        main.sentence_model = HashingSentenceModel()
+        main.evaluator.sentence_model = main.sentence_model
+    main.warm_up_models()
+    return main
+
+
+async def run_benchmark(main_module, usernames: List[str], challenge_ids: List[str], args):
+    """Open the storage backend on this event loop (its pool lives here), then run the workload"""
+    await main_module.init_database()
+    try:
+        return await run_workload(main_module.app, usernames, challenge_ids, args)
+    finally:
+        await main_module.storage.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end API load benchmark")
+    parser.add_argument("--db", default=None, help="Reuse an existing database instead of seeding a fresh one")
+    parser.add_argument("--database-url", default=None,
+                        help="postgresql:// URL: load the dataset there and benchmark the PostgreSQL backend")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--challenges", type=int, default=8)
+    parser.add_argument("--attempts-per-user", type=float, default=20)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests in total")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Mock provider latency in seconds")
+    parser.add_argument("--model-jitter", type=float, default=0.0, help="± uniform jitter on the latency")
+    parser.add_argument("--hash-embeddings", action="store_true",
+                        help="Replace the sentence transformer with a hashing encoder")
+    parser.add_argument("--output", default="api_baseline.json")
+    parser.add_argument("--compare", default=None, help="Previous baseline to compare p95 latency against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p95 regression (0.10 = 10%%)")
+    return parser.parse_args()
+
+
+def main_cli():
+    args = parse_args()
+
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="prompt_bench_"), "bench.db")
+        database_setup.setup_complete_database(
+            db_path=db_path, users=args.users, challenges=args.challenges,
+            attempts_per_user=args.attempts_per_user, days=args.days, seed=args.seed
+        )
+
+    conn = sqlite3.connect(db_path)
+    usernames = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY id LIMIT ?", (args.concurrency,))]
+    challenge_ids = [row[0] for row in conn.execute("SELECT id FROM challenges ORDER BY id")]
+    conn.close()
+
+    database_url = db_path
+    if args.database_url:
+        print(f"🐘 Loading the dataset into {args.database_url.split('@')[-1]}...")
+        asyncio.run(database_setup.load_into_postgres(db_path, args.database_url))
+        database_url = args.database_url
+
+    main_module = prepare_app(database_url, args)
+    print(f"\n🏁 Running mixed workload on {main_module.storage.backend}: concurrency={args.concurrency}, "
+          f"{'requests=' + str(args.requests) if args.requests else 'duration=' + str(args.duration) + 's'}")
+    samples, wall_time = asyncio.run(run_benchmark(main_module, usernames, challenge_ids, args))
+
+    results = build_results(samples, wall_time)
+    print_results(results, wall_time)
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "database_url")}
+    parameters["backend"] = main_module.storage.backend
+    baseline = {"meta": baseline_metadata("api_load", parameters), "wall_time_s": round(wall_time, 3),
+                "results": results}
+    write_baseline(args.output, baseline)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\n🔍 Comparing against {args.compare}")
+        regressions = compare_baselines(previous, baseline, ["latency_ms", "p95"], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} operation(s) regressed beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,146 @@
+# benchmarks/common.py - Shared helpers for the benchmark scripts
+# Deterministic stand-ins for the AI providers and the embedding model, plus
+# percentile/summary helpers and the JSON baseline format.
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Sentences the mock providers assemble responses from
+RESPONSE_SENTENCES = [
+    "Thank you for taking the time to meet with me to discuss the proposal.",
+    "The lighthouse keeper hadn't been seen for three days.",
+    "Imagine you and your friends share a special notebook to track trading cards.",
+    "Our innovative solution addresses a critical market gap with strong revenue potential.",
+    "Please let me know if you need any additional information or clarification.",
+    "Here are the key action items we identified during the meeting.",
+    "The detective pulled her coat tighter as she approached the weathered door.",
+    "It's a simple and easy way to keep track of things that is hard to cheat on.",
+    "We project significant market share growth driven by proprietary technology.",
+    "I sincerely apologize for the confusion and have processed a full refund to your account.",
+    "Preheat the oven, mix the ingredients, and bake until the edges are golden brown.",
+    "This API endpoint accepts the following parameters and returns a JSON response.",
+]
+
+
+class MockAIModelManager:
+    """Drop-in replacement for AIModelManager with deterministic output and configurable latency"""
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+
+    def _rng(self, prompt: str, model_name: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{model_name}:{prompt}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    async def get_response(self, prompt: str, model_name: str) -> str:
+        rng = self._rng(prompt, model_name)
+        delay = self.latency + (rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        count = rng.randint(2, 8)
+        return f"{model_name} response: " + " ".join(rng.choice(RESPONSE_SENTENCES) for _ in range(count))
+
+
+class HashingSentenceModel:
+    """Deterministic embedding stand-in (bag of hashed words) that needs no model download"""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def encode(self, sentences, **kwargs):
+        import numpy as np
+
+        vectors = np.zeros((len(sentences), self.dimensions), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for word in sentence.lower().split():
+                bucket = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "big")
+                vectors[row, bucket % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    values = sorted(latencies)
+    return {
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p90": round(percentile(values, 90) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def baseline_metadata(benchmark: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "benchmark": benchmark,
+        "git_revision": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+    }
+
+
+def write_baseline(path: str, baseline: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"💾 Baseline written to {path}")
+
+
+def compare_baselines(previous: Dict[str, Any], current: Dict[str, Any], metric_path: List[str],
+                      threshold: float) -> List[str]:
+    """
+    Compare one metric (e.g. ["latency_ms", "p95"]) for every entry under "results".
+    Returns a list of regressions that got slower by more than `threshold` (0.1 = 10%).
+    """
+    regressions = []
+    for name, entry in current.get("results", {}).items():
+        before = previous.get("results", {}).get(name)
+        if before is None:
+            continue
+        old, new = before, entry
+        for key in metric_path:
+            old, new = old.get(key, {}), new.get(key, {})
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+            continue
+        change = (new - old) / old
+        marker = "🔺" if change > threshold else "  "
+        print(f"{marker} {name:45s} {'.'.join(metric_path)}: {old:10.3f} -> {new:10.3f} ({change:+.1%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
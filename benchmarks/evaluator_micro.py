@@ -0,0 +1,223 @@
+# benchmarks/evaluator_micro.py - Micro-benchmarks for the PromptEvaluator scoring stages
+# Times every scoring component on its own over short, medium and very long responses,
+# and records peak traced memory and allocated blocks per call, so we know which stage
+# to optimize and can catch regressions when one is reworked. Metrics read a prebuilt
+# TextAnalysis; text_analysis times building one (_cold: with an empty syllable cache).
+# semantic_references scores against REFERENCE_COUNT reference answers with the cached
+# reference matrix; _uncached re-encodes the references on every call, for comparison.
+#
+#   python benchmarks/evaluator_micro.py --output evaluator_baseline.json
+#   python benchmarks/evaluator_micro.py --hash-embeddings --compare evaluator_baseline.json
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from common import (
+    RESPONSE_SENTENCES, HashingSentenceModel, baseline_metadata, write_baseline, compare_baselines
+)
+
+import database_setup
+from prompt_index import normalize
+from text_analysis import word_syllables
+
+# Approximate word counts of each corpus
+CORPORA = {
+    "short": 25,
+    "medium": 250,
+    "long": 5000,
+}
+
+# Reference answers per challenge in the semantic_references stages
+REFERENCE_COUNT = 8
+
+PROMPT_EXTRAS = [
+    "Use a professional tone.",
+    "Keep it under 120 words (strictly).",
+    "Include the keywords \"meeting\" and 'action items'.",
+    "Write it as a numbered list: 1. intro 2. details 3. next steps.",
+]
+
+
+def build_text(rng: random.Random, words: int, extras=()) -> str:
+    """Assemble roughly `words` words of prose from the shared sentence pool"""
+    parts = []
+    count = 0
+    pool = list(RESPONSE_SENTENCES) + list(extras)
+    while count < words:
+        sentence = rng.choice(pool)
+        parts.append(sentence)
+        count += len(sentence.split())
+    return " ".join(parts)
+
+
+def build_corpus(seed: int) -> Dict[str, Dict[str, str]]:
+    rng = random.Random(seed)
+    corpus = {}
+    for name, words in CORPORA.items():
+        corpus[name] = {
+            "response": build_text(rng, words),
+            "prompt": build_text(rng, max(10, words // 5), PROMPT_EXTRAS),
+        }
+    return corpus
+
+
+def profile_memory(func: Callable[[], object]):
+    """Peak traced bytes, blocks still held by the result, and net allocated blocks for one call"""
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    snapshot_before = tracemalloc.take_snapshot()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    retained = snapshot_after.compare_to(snapshot_before, "filename")
+    del result
+    return peak, sum(stat.count_diff for stat in retained), blocks_after - blocks_before
+
+
+def measure(func: Callable[[], object], min_time: float, repeats: int) -> Dict:
+    """Time `func` timeit-style (auto-calibrated loop count), then profile one call's memory"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 5 or number >= 1_000_000:
+            break
+        number *= 2
+    number = max(1, int(number * (min_time / 5) / max(elapsed, 1e-9)))
+
+    per_call = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - started) / number)
+
+    peak, retained_blocks, blocks_delta = profile_memory(func)
+    _, _, overhead = profile_memory(lambda: None)
+
+    return {
+        "loops": number,
+        "per_call_us": {
+            "min": round(min(per_call) * 1e6, 3),
+            "median": round(statistics.median(per_call) * 1e6, 3),
+        },
+        "memory": {
+            "peak_kib": round(peak / 1024, 3),
+            "retained_blocks": retained_blocks,
+            "allocated_blocks_delta": blocks_delta - overhead,
+        },
+    }
+
+
+def build_stages(main, evaluator, texts: Dict[str, str], challenge: Dict) -> Dict[str, Callable[[], object]]:
+    """One zero-argument callable per scoring stage"""
+    response = texts["response"]
+    prompt = texts["prompt"]
+    target = challenge["target_response"]
+    constraints = challenge["constraints"]
+    target_style = constraints.get("target_style", {})
+    response_text = main.TextAnalysis(response)
+    prompt_text = main.TextAnalysis(prompt)
+    alternatives = list(challenge.get("reference_responses", []))
+    alternatives += [" ".join(RESPONSE_SENTENCES[n::REFERENCE_COUNT])
+                     for n in range(REFERENCE_COUNT - 1 - len(alternatives))]
+
+    def uncached_references():
+        references = normalize(evaluator.sentence_model.encode([target] + alternatives))
+        responses = normalize(evaluator.sentence_model.encode([response]))
+        return (responses @ references.T).max(axis=1)
+
+    def cold_text_analysis():
+        word_syllables.cache_clear()
+        return main.TextAnalysis(response)
+
+    return {
+        "text_analysis": lambda: main.TextAnalysis(response),
+        "text_analysis_cold": cold_text_analysis,
+        "semantic_accuracy": lambda: evaluator._calculate_semantic_accuracy(response, target),
+        "semantic_references": lambda: evaluator._calculate_semantic_accuracy(response, target, alternatives),
+        "semantic_references_uncached": uncached_references,
+        "task_compliance": lambda: evaluator._calculate_task_compliance(response_text, constraints),
+        "style_match": lambda: evaluator._calculate_style_match(response_text, target_style),
+        "efficiency": lambda: evaluator._calculate_efficiency(prompt_text, 82.5),
+        "complexity": lambda: evaluator._calculate_complexity(response_text),
+        "flesch_kincaid_grade": lambda: response_text.flesch_kincaid_grade(),
+        "generate_feedback": lambda: evaluator._generate_feedback(
+            82.5, 75.0, 90.0, 55.0, prompt, response, target
+        ),
+        "evaluate_prompt": lambda: evaluator.evaluate_prompt(
+            ai_response=response, target_response=target, prompt=prompt, constraints=constraints
+        ),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="PromptEvaluator micro-benchmarks")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Target seconds per measurement")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--stage", action="append", default=None, help="Only run these stages")
+    parser.add_argument("--corpus", action="append", default=None, choices=list(CORPORA))
+    parser.add_argument("--challenge", default="professional_email")
+    parser.add_argument("--hash-embeddings", action="store_true",
+                        help="Replace the sentence transformer with a hashing encoder")
+    parser.add_argument("--output", default="evaluator_baseline.json")
+    parser.add_argument("--compare", default=None, help="Previous baseline to compare median per-call time against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    return parser.parse_args()
+
+
+def main_cli():
+    args = parse_args()
+
+    import main
+    if args.hash_embeddings:
+        main.sentence_model = HashingSentenceModel()
+        main.evaluator.sentence_model = main.sentence_model
+    evaluator = main.evaluator
+    challenge = next(c for c in database_setup.CHALLENGES if c["id"] == args.challenge)
+    corpus = build_corpus(args.seed)
+
+    results = {}
+    print(f"{'stage':28s} {'corpus':8s} {'median µs':>12s} {'min µs':>12s} {'peak KiB':>10s} {'blocks':>8s}")
+    for corpus_name, texts in corpus.items():
+        if args.corpus and corpus_name not in args.corpus:
+            continue
+        for stage, func in build_stages(main, evaluator, texts, challenge).items():
+            if args.stage and stage not in args.stage:
+                continue
+            entry = measure(func, args.min_time, args.repeats)
+            entry["words"] = len(texts["response"].split())
+            results[f"{stage}[{corpus_name}]"] = entry
+            print(f"{stage:28s} {corpus_name:8s} {entry['per_call_us']['median']:12.2f} "
+                  f"{entry['per_call_us']['min']:12.2f} {entry['memory']['peak_kib']:10.1f} "
+                  f"{entry['memory']['allocated_blocks_delta']:8d}")
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    baseline = {"meta": baseline_metadata("evaluator_micro", parameters), "results": results}
+    write_baseline(args.output, baseline)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\n🔍 Comparing against {args.compare}")
+        regressions = compare_baselines(previous, baseline, ["per_call_us", "median"], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} stage(s) regressed beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,107 @@
+# benchmarks/import_budget.py - Import-time and memory budget for the API module
+# Imports main.py in fresh interpreters with `python -X importtime` and checks that:
+# - the heavy dependencies stay lazy (sentence-transformers/torch load on warm-up,
+#   pyphen on first readability grade, asyncpg on PostgreSQL connect, pyarrow on Parquet
+#   export; scikit-learn and textstat are not used at all),
+# - the best-of-N import time of main stays under --max-import-ms,
+# - peak RSS right after the import stays under --max-rss-mb.
+# Prints the slowest imports to show where a regression came from. Exits 1 on any violation.
+# tests/test_import_budget.py asserts the same budgets under pytest.
+#
+#   python benchmarks/import_budget.py --repeat 5 --max-import-ms 1000 --max-rss-mb 150
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from common import REPO_ROOT
+
+# Must not be imported by `import main`. NumPy stays eager on purpose: the prompt index
+# and the score sketches are built from it at import time.
+LAZY_MODULES = ["sentence_transformers", "torch", "transformers", "sklearn", "textstat", "pyphen",
+                "asyncpg", "pyarrow"]
+
+MAX_IMPORT_MS = 1000.0
+MAX_RSS_MB = 150.0
+
+PROBE = f'''
+import resource, sys
+import main
+print("rss", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print("loaded", *(name for name in {LAZY_MODULES!r} if name in sys.modules))
+'''
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """module -> (self us, cumulative us) from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure() -> Tuple[Dict[str, Tuple[int, int]], float, List[str]]:
+    """One cold import of main: per-module import times, peak RSS in MB, lazy modules loaded"""
+    with tempfile.TemporaryDirectory() as workdir:
+        # main only records these paths at import time; keep any file it creates out of the repo
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+            "DATABASE_URL": os.path.join(workdir, "prompt_trainer.db"),
+            "PROMPT_INDEX_PATH": os.path.join(workdir, "prompt_index.npz"),
+        }
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=workdir, env=env,
+                                capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"❌ import main failed:\n{result.stderr[-2000:]}")
+    # main prints its own startup lines too: take the probe's two
+    rss, loaded = result.stdout.splitlines()[-2:]
+    rss_kb = int(rss.split()[1]) / (1024 if sys.platform == "darwin" else 1)   # macOS reports bytes
+    return parse_importtime(result.stderr), rss_kb / 1024, loaded.split()[1:]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check the import-time and RSS budget of main.py")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters to take the best run of")
+    parser.add_argument("--max-import-ms", type=float, default=MAX_IMPORT_MS)
+    parser.add_argument("--max-rss-mb", type=float, default=MAX_RSS_MB)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    runs = [measure() for _ in range(args.repeat)]
+    modules, _, _ = min(runs, key=lambda run: run[0]["main"][1])
+    import_ms = modules["main"][1] / 1000
+    rss_mb = min(run[1] for run in runs)
+    loaded = sorted({name for run in runs for name in run[2]})
+
+    print(f"⏱️ import main: {import_ms:.0f} ms (best of {args.repeat}), peak RSS {rss_mb:.0f} MB")
+    print(f"{'module':40s} {'self ms':>9s} {'cumulative ms':>14s}")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{name:40s} {self_us / 1000:9.1f} {cumulative_us / 1000:14.1f}")
+
+    failures = []
+    if loaded:
+        failures.append(f"heavy modules imported eagerly: {', '.join(loaded)}")
+    if import_ms > args.max_import_ms:
+        failures.append(f"import time {import_ms:.0f} ms is over the {args.max_import_ms:.0f} ms budget")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"peak RSS {rss_mb:.0f} MB is over the {args.max_rss_mb:.0f} MB budget")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        return 1
+    print("✅ Within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
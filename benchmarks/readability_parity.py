@@ -0,0 +1,150 @@
+# benchmarks/readability_parity.py - TextAnalysis vs textstat and the old per-metric counts
+# Checks that the shared TextAnalysis gives exactly the numbers the evaluator used to get:
+# textstat.flesch_kincaid_grade for the readability grade, and str.split()/re.findall for the
+# word, sentence-mark, bracket and quote counts. Runs over the challenge targets, the sample
+# prompts, the micro-benchmark corpora, hand-written edge cases and random mutations, then
+# times textstat against TextAnalysis on fresh texts. Exits 1 on any mismatch.
+# tests/test_readability_parity.py runs the same check under pytest.
+#
+#   python benchmarks/readability_parity.py --fuzz 5000
+
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from typing import List, Tuple
+
+from common import RESPONSE_SENTENCES
+from evaluator_micro import build_corpus, build_text
+
+import textstat
+
+import database_setup
+from text_analysis import TextAnalysis, word_syllables
+
+EDGE_CASES = [
+    "",
+    " ",
+    "...",
+    "?!",
+    "Hi.",
+    "One two. Three four five.",
+    "e.g. this, i.e. that; etc.",
+    "Don't stop-believing: it's a singer-songwriter's world!!",
+    "'Quoted' and \"double quoted\" (with brackets) [and more] {even these}.",
+    "Numbers 1. 2. 3. and 3.14159 or 1,000,000 dollars",
+    "• bullet one\n- bullet two\n* bullet three",
+    "Ünïcödé wörds, naïve café résumé — façade.",
+    "ALL CAPS SHOUTING ABOUT SYNERGY AND ORGANIZATIONAL TRANSFORMATION",
+    "no punctuation at all just a long run of words that never ends",
+    "Tabs\tand\nnewlines\r\nmixed   with  spaces.",
+    "Emoji 🎉 in the 🧠 middle 🚀.",
+    "_under_scores_ and CamelCaseWords and snake_case_words.",
+    "Mr. Smith went to Washington. He didn't return until 5 p.m. on Tuesday.",
+    "Control\x1fseparated\x1fwords. And\x1c more\x1f here!",
+]
+
+MUTATIONS = list(".,;:!?'\"()[]{}-–—•*/\\\n\t \x1f") + ["...", "?!", " e.g. ", " 42 ", "3.5", "don't", "'s", "É"]
+
+
+def mutate(rng: random.Random, text: str) -> str:
+    """Sprinkle punctuation, digits and odd characters into `text`"""
+    chars = list(text)
+    for _ in range(rng.randint(0, max(1, len(chars) // 10))):
+        position = rng.randrange(len(chars) + 1)
+        if chars and rng.random() < 0.3:
+            del chars[min(position, len(chars) - 1)]
+        else:
+            chars.insert(position, rng.choice(MUTATIONS + [rng.choice(string.printable)]))
+    return "".join(chars)
+
+
+def build_texts(fuzz: int, seed: int) -> List[str]:
+    texts = list(EDGE_CASES) + list(RESPONSE_SENTENCES)
+    for challenge in database_setup.CHALLENGES:
+        texts += [challenge["target_response"], challenge["description"]]
+    for prompts in database_setup.SAMPLE_PROMPTS.values():
+        texts += prompts
+    for corpus in build_corpus(seed).values():
+        texts += [corpus["response"], corpus["prompt"]]
+    rng = random.Random(seed)
+    for _ in range(fuzz):
+        texts.append(mutate(rng, build_text(rng, rng.choice([3, 20, 120, 600]))))
+    return texts
+
+
+def old_counts(text: str) -> tuple:
+    """The counts the evaluator computed before TextAnalysis"""
+    return (
+        len(text.split()),
+        len(re.findall(r'[.!?]', text)),
+        len(re.findall(r'[(){}[\]]', text)),
+        len(re.findall(r'["\']', text)),
+    )
+
+
+def find_mismatches(texts: List[str]) -> List[Tuple[str, tuple, tuple]]:
+    """(text, textstat grade + old counts, TextAnalysis values) of every text that differs"""
+    mismatches = []
+    for text in texts:
+        analysis = TextAnalysis(text)
+        expected = (textstat.flesch_kincaid_grade(text),) + old_counts(text)
+        actual = (analysis.flesch_kincaid_grade(), analysis.word_count, analysis.sentence_marks,
+                  analysis.brackets, analysis.quotes)
+        if expected != actual:
+            mismatches.append((text, expected, actual))
+    return mismatches
+
+
+def check(texts: List[str]) -> int:
+    mismatches = find_mismatches(texts)
+    for text, expected, actual in mismatches[:10]:
+        print(f"❌ {text[:60]!r}: textstat/old {expected} != {actual}")
+    return len(mismatches)
+
+
+def time_per_text(func, texts: List[str]) -> float:
+    started = time.perf_counter()
+    for text in texts:
+        func(text)
+    return (time.perf_counter() - started) / len(texts) * 1e6
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check TextAnalysis against textstat")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random mutated texts to add")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def main_cli():
+    args = parse_args()
+    texts = build_texts(args.fuzz, args.seed)
+    print(f"🔍 Comparing {len(texts):,} texts against textstat")
+    mismatches = check(texts)
+
+    # Distinct texts, as in production, so textstat's per-text lru_caches never hit
+    rng = random.Random(args.seed + 1)
+    print(f"\n{'words':>6s} {'textstat µs':>12s} {'TextAnalysis µs':>16s} {'(cold cache)':>13s}")
+    for words in (25, 250, 5000):
+        sample = [build_text(rng, words) for _ in range(max(5, 2000 // words))]
+
+        def cold_grade(text):
+            word_syllables.cache_clear()
+            return TextAnalysis(text).flesch_kincaid_grade()
+
+        before = time_per_text(textstat.flesch_kincaid_grade, sample)
+        cold = time_per_text(cold_grade, sample)
+        after = time_per_text(lambda text: TextAnalysis(text).flesch_kincaid_grade(), sample)
+        print(f"{words:6d} {before:12.1f} {after:16.1f} {cold:13.1f}")
+
+    if mismatches:
+        print(f"\n❌ {mismatches} of {len(texts):,} texts differ")
+        sys.exit(1)
+    print(f"\n✅ All {len(texts):,} texts match")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,265 @@
+# benchmarks/replay_traffic.py - Replay captured production traffic against a local instance
+# Reads the files written with TRAFFIC_CAPTURE_PATH set (see traffic_capture.py), merges
+# the workers' files by arrival time and sends every request again at its recorded offset,
+# in-process like api_load.py. --speed 2 replays twice as fast, --speed 0 as fast as
+# --concurrency allows; idle gaps longer than --max-gap are cut short.
+# The AI providers are replaced by ReplayModelManager, which answers each (model, prompt)
+# with the responses and latencies recorded for it, in order, so provider behaviour is
+# the production one and every run sees the same inputs. Each user pseudonym becomes a
+# registered replay user, so per-user reads and history grow as they did (the evaluation
+# rate limits are off unless EVALUATE_USER_RATE/EVALUATE_MODEL_RATE are set).
+# Prints recorded vs. replayed latency per route and writes a JSON baseline.
+#
+#   TRAFFIC_CAPTURE_PATH=captures/traffic.ndjson.gz python serve.py   # production, then:
+#   python benchmarks/replay_traffic.py captures/traffic-*.ndjson.gz --speed 1 --output replay.json
+#   python benchmarks/replay_traffic.py captures/traffic-*.ndjson.gz --speed 10 --compare replay.json
+#
+# Captures made with scrubbed text replay the original lengths, repeats and provider
+# timings, not the wording: keyword and readability scores differ from production.
+
+import argparse
+import asyncio
+import glob
+import heapq
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Tuple
+
+from common import (
+    MockAIModelManager, HashingSentenceModel, baseline_metadata, write_baseline, compare_baselines
+)
+from api_load import build_results, print_results
+
+import httpx
+import database_setup
+from traffic_capture import read_capture
+
+REPLAY_PASSWORD = "replay-password"
+
+
+class ReplayModelManager:
+    """Answers with the recorded responses of each (model, prompt), cycling through them;
+    prompts never recorded get a mock answer at the median recorded latency"""
+
+    def __init__(self, records: List[Dict[str, Any]], latency_scale: float = 1.0):
+        self.recorded: Dict[Tuple[str, str], deque] = defaultdict(deque)
+        latencies = []
+        for record in records:
+            prompt = (record.get("b") or {}).get("prompt")
+            for model_name, latency_ms, response in record.get("c", []):
+                self.recorded[(model_name, prompt)].append((latency_ms / 1000, response))
+                latencies.append(latency_ms / 1000)
+        self.latency_scale = latency_scale
+        self.fallback = MockAIModelManager(latency=(statistics.median(latencies) if latencies else 0.5) * latency_scale)
+        self.replayed = 0
+        self.unmatched = 0
+
+    async def get_response(self, prompt: str, model_name: str) -> str:
+        calls = self.recorded.get((model_name, prompt))
+        if not calls:
+            self.unmatched += 1
+            return await self.fallback.get_response(prompt, model_name)
+        latency, response = calls[0]
+        calls.rotate(-1)
+        self.replayed += 1
+        if latency > 0:
+            await asyncio.sleep(latency * self.latency_scale)
+        return response
+
+
+def load_records(patterns: List[str]) -> List[Dict[str, Any]]:
+    """All records of the matching capture files, in arrival order"""
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    if not paths:
+        sys.exit(f"❌ No capture files match {' '.join(patterns)}")
+    # Each file is already in (roughly) arrival order: merge them by timestamp
+    records = list(heapq.merge(*(read_capture(path) for path in paths), key=lambda record: record["t"]))
+    print(f"📼 {len(records)} requests from {len(paths)} file(s)")
+    return records
+
+
+def schedule(records: List[Dict[str, Any]], speed: float, max_gap: float) -> List[float]:
+    """Replay offset in seconds of each record"""
+    offsets = []
+    offset = 0.0
+    for previous, record in zip([None] + records[:-1], records):
+        if previous is not None:
+            offset += min(max(record["t"] - previous["t"], 0.0), max_gap)
+        offsets.append(offset / speed if speed > 0 else 0.0)
+    return offsets
+
+
+def route_of(app, method: str, path: str) -> str:
+    """`METHOD /route/{param}` as declared in main.py, for grouping the results"""
+    for route in app.routes:
+        if getattr(route, "methods", None) and method in route.methods and route.path_regex.match(path):
+            return f"{method} {route.path}"
+    return f"{method} {path}"
+
+
+async def register_users(client: httpx.AsyncClient, pseudonyms: List[str]) -> Dict[str, str]:
+    """A token for each user pseudonym (registered on first use of the database)"""
+    tokens = {}
+    for pseudonym in pseudonyms:
+        username = f"replay_{pseudonym}"
+        await client.post("/api/auth/register", json={
+            "username": username, "email": f"{username}@replay.local", "password": REPLAY_PASSWORD
+        })
+        response = await client.post("/api/auth/login", json={"username": username, "password": REPLAY_PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f"Login failed for {username}: {response.text}")
+        tokens[pseudonym] = response.json()["token"]
+    return tokens
+
+
+async def replay(app, records: List[Dict[str, Any]], args) -> Tuple[Dict, Dict, float, float]:
+    """Send every record at its offset; returns replayed and recorded samples per route,
+    the wall time and the worst lag behind the schedule"""
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    recorded: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    offsets = schedule(records, args.speed, args.max_gap)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    lag = {"max": 0.0}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=120) as client:
+        tokens = await register_users(client, sorted({record["u"] for record in records if "u" in record}))
+
+        async def send(record: Dict[str, Any]) -> int:
+            headers = {"Authorization": f"Bearer {tokens[record['u']]}"} if "u" in record else {}
+            url = record["p"] + (f"?{record['q']}" if record.get("q") else "")
+            if record["m"] == "GET":
+                response = await client.get(url, headers=headers)
+            else:
+                response = await client.request(record["m"], url, headers=headers, json=record.get("b"))
+            return response.status_code
+
+        async def fire(record: Dict[str, Any], offset: float, started: float):
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                lag["max"] = max(lag["max"], time.perf_counter() - started - offset)
+                operation = route_of(app, record["m"], record["p"])
+                request_started = time.perf_counter()
+                try:
+                    status_code = await send(record)
+                except Exception:
+                    status_code = 599
+                samples[operation].append((time.perf_counter() - request_started, status_code))
+                recorded[operation].append((record["d"] / 1000, record["s"]))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fire(record, offset, started) for record, offset in zip(records, offsets)))
+        wall_time = time.perf_counter() - started
+
+    return samples, recorded, wall_time, lag["max"]
+
+
+def print_comparison(results: Dict, recorded_results: Dict):
+    print("\n🎞️ Recorded vs replayed (latency in ms)")
+    print(f"{'operation':40s} {'rec err':>7s} {'err':>5s} {'rec p50':>9s} {'p50':>9s} {'rec p95':>9s} {'p95':>9s}")
+    for operation, entry in results.items():
+        before = recorded_results[operation]
+        print(f"{operation:40s} {before['errors']:7d} {entry['errors']:5d} {before['latency_ms']['p50']:9.2f} {entry['latency_ms']['p50']:9.2f} "
+              f"{before['latency_ms']['p95']:9.2f} {entry['latency_ms']['p95']:9.2f}")
+
+
+def prepare_app(database_url: str, records: List[Dict[str, Any]], args):
+    """Import main.py and point it at the replay database and the recorded providers"""
+    import main   # the lifespan doesn't run here, so the replay is never captured itself
+
+    main.use_storage(database_url)
+    main.ai_manager = ReplayModelManager(records, args.latency_scale)
+    if args.hash_embeddings:
+        main.sentence_model = HashingSentenceModel()
+        main.evaluator.sentence_model = main.sentence_model
+    main.warm_up_models()
+    return main
+
+
+async def run_replay(main_module, records: List[Dict[str, Any]], args):
+    await main_module.init_database()
+    try:
+        return await replay(main_module.app, records, args)
+    finally:
+        await main_module.storage.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay captured production traffic")
+    parser.add_argument("captures", nargs="+", help="Capture files or glob patterns")
+    parser.add_argument("--db", default=None, help="Replay against a copy of production data instead of a seeded one")
+    parser.add_argument("--database-url", default=None, help="postgresql:// URL to replay against instead of SQLite")
+    parser.add_argument("--users", type=int, default=1000, help="Seeded database size (without --db)")
+    parser.add_argument("--attempts-per-user", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing multiplier (0: no pacing)")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="Longest idle gap replayed, in recorded seconds")
+    parser.add_argument("--concurrency", type=int, default=256, help="Most requests in flight at once")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier on recorded provider latency")
+    parser.add_argument("--hash-embeddings", action="store_true",
+                        help="Replace the sentence transformer with a hashing encoder")
+    parser.add_argument("--output", default="replay_baseline.json")
+    parser.add_argument("--compare", default=None, help="Previous baseline to compare p95 latency against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p95 regression (0.10 = 10%%)")
+    return parser.parse_args()
+
+
+def main_cli():
+    args = parse_args()
+    # Rate limiting was applied in production already: what got through is what is replayed
+    os.environ.setdefault("EVALUATE_USER_RATE", "0")
+    os.environ.setdefault("EVALUATE_MODEL_RATE", "0")
+    records = load_records(args.captures)
+
+    database_url = args.db
+    if database_url is None:
+        database_url = os.path.join(tempfile.mkdtemp(prefix="prompt_replay_"), "replay.db")
+        database_setup.setup_complete_database(
+            db_path=database_url, users=args.users, attempts_per_user=args.attempts_per_user, seed=args.seed
+        )
+    if args.database_url:
+        print(f"🐘 Loading the dataset into {args.database_url.split('@')[-1]}...")
+        asyncio.run(database_setup.load_into_postgres(database_url, args.database_url))
+        database_url = args.database_url
+
+    main_module = prepare_app(database_url, records, args)
+    span = records[-1]["t"] - records[0]["t"] if records else 0.0
+    print(f"\n▶️ Replaying {span:.0f}s of traffic on {main_module.storage.backend} at "
+          f"{'full speed' if args.speed <= 0 else str(args.speed) + 'x'}")
+    samples, recorded, wall_time, max_lag = asyncio.run(run_replay(main_module, records, args))
+
+    results = build_results(samples, wall_time)
+    print_results(results, wall_time)
+    print_comparison(results, build_results(recorded, wall_time))
+    manager = main_module.ai_manager
+    print(f"\n🤖 Provider calls: {manager.replayed} replayed, {manager.unmatched} not in the capture; "
+          f"worst lag behind schedule {max_lag * 1000:.0f} ms")
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key not in ("output", "compare", "database_url", "captures")}
+    parameters["backend"] = main_module.storage.backend
+    parameters["requests"] = len(records)
+    baseline = {"meta": baseline_metadata("replay_traffic", parameters), "wall_time_s": round(wall_time, 3),
+                "max_lag_ms": round(max_lag * 1000, 1), "results": results}
+    write_baseline(args.output, baseline)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\n🔍 Comparing against {args.compare}")
+        regressions = compare_baselines(previous, baseline, ["latency_ms", "p95"], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} operation(s) regressed beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,127 @@
+# benchmarks/serialization_micro.py - JSON response rendering, before and after
+# Renders the payloads of the list endpoints (challenge catalog, leaderboard, attempt
+# history, progress, stats) and an EvaluationResult three ways:
+# - default: what FastAPI does for a plain return value (jsonable_encoder + JSONResponse)
+# - fast:    FastJSONResponse (orjson, or stdlib json when orjson is missing)
+# - cached:  the catalog's pre-rendered bytes, as served by /api/challenges
+# Payloads come from a seeded database through the real storage layer.
+#
+#   python benchmarks/serialization_micro.py --output serialization_baseline.json
+#   python benchmarks/serialization_micro.py --compare serialization_baseline.json
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Callable, Dict
+
+from common import baseline_metadata, write_baseline, compare_baselines
+from evaluator_micro import measure
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import database_setup
+import json_response
+from json_response import FastJSONResponse, dumps
+from storage import ATTEMPT_FIELDS, SQLiteStorage
+
+
+async def load_payloads(db_path: str, page_size: int) -> Dict[str, Any]:
+    """One realistic payload per endpoint, read through the storage layer"""
+    storage = SQLiteStorage(db_path)
+    await storage.init_schema()
+    challenges = await storage.list_challenges()
+    challenge_id = challenges[0]["id"]
+    attempts, _ = await storage.list_user_attempts(1, list(ATTEMPT_FIELDS), page_size)
+    attempt_id = await storage.max_attempt_id()
+    return {
+        "challenges": challenges,
+        "challenge_detail": await storage.get_challenge(challenge_id),
+        "leaderboard": await storage.get_leaderboard(challenge_id, page_size),
+        "user_attempts": {"attempts": attempts, "next_cursor": "WyIyMDI0LTAxLTAxIDAwOjAwOjAwIiwgMTIzXQ"},
+        "user_progress": await storage.get_user_progress(1),
+        "user_stats": await storage.get_user_stats(1),
+        "evaluation_result": await storage.get_stored_result(attempt_id),
+    }
+
+
+def build_cases(payloads: Dict[str, Any]) -> Dict[str, Callable[[], object]]:
+    import main
+
+    evaluation = main.EvaluationResult(**payloads.pop("evaluation_result"))
+    cases = {
+        "evaluation_result[default]": lambda: JSONResponse(jsonable_encoder(evaluation)).body,
+        "evaluation_result[fast]": lambda: FastJSONResponse(evaluation).body,
+    }
+    for name, payload in payloads.items():
+        cases[f"{name}[default]"] = lambda payload=payload: JSONResponse(jsonable_encoder(payload)).body
+        cases[f"{name}[fast]"] = lambda payload=payload: FastJSONResponse(payload).body
+        if name in ("challenges", "challenge_detail"):
+            rendered = dumps(payload)
+            cases[f"{name}[cached]"] = lambda rendered=rendered: FastJSONResponse(rendered).body
+    return cases
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="JSON response rendering micro-benchmarks")
+    parser.add_argument("--db", default=None, help="Reuse an existing database instead of seeding one")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--challenges", type=int, default=40)
+    parser.add_argument("--attempts-per-user", type=float, default=200)
+    parser.add_argument("--page-size", type=int, default=100, help="Rows in leaderboard/history payloads")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-time", type=float, default=0.3, help="Target seconds per measurement")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="serialization_baseline.json")
+    parser.add_argument("--compare", default=None, help="Previous baseline to compare median per-call time against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    return parser.parse_args()
+
+
+def main_cli():
+    args = parse_args()
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="prompt_bench_"), "bench.db")
+        database_setup.setup_complete_database(
+            db_path=db_path, users=args.users, challenges=args.challenges,
+            attempts_per_user=args.attempts_per_user, seed=args.seed
+        )
+
+    payloads = asyncio.run(load_payloads(db_path, args.page_size))
+    sizes = {name: len(dumps(payload)) for name, payload in payloads.items()}
+    encoder = "orjson" if json_response.orjson is not None else "json"
+    print(f"\n🧾 Rendering with {encoder}")
+
+    results = {}
+    print(f"{'payload':36s} {'bytes':>8s} {'median µs':>12s} {'speedup':>8s}")
+    for name, func in build_cases(payloads).items():
+        entry = measure(func, args.min_time, args.repeats)
+        payload_name = name.split("[")[0]
+        entry["bytes"] = sizes[payload_name]
+        results[name] = entry
+        default = results.get(f"{payload_name}[default]")
+        speedup = default["per_call_us"]["median"] / max(entry["per_call_us"]["median"], 1e-9)
+        print(f"{name:36s} {entry['bytes']:8d} {entry['per_call_us']['median']:12.2f} {speedup:7.1f}x")
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    parameters["encoder"] = encoder
+    baseline = {"meta": baseline_metadata("serialization_micro", parameters), "results": results}
+    write_baseline(args.output, baseline)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\n🔍 Comparing against {args.compare}")
+        regressions = compare_baselines(previous, baseline, ["per_call_us", "median"], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} payload(s) regressed beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main_cli()
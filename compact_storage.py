@@ -0,0 +1,171 @@
+# compact_storage.py - Compact encodings for the bulky columns of the attempts table
+# - feedback: comma-separated integer codes into the feedback_messages table
+#   (the evaluator only ever emits a handful of canned messages)
+# - detailed_metrics: the standard metrics live in typed metric_* columns; anything
+#   else stays as (usually empty) JSON in detailed_metrics
+# - ai_response: long responses are stored as a compressed BLOB with a one-byte codec tag
+# Legacy rows (JSON feedback/metrics, plain-text responses) decode transparently.
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+# Standard detailed_metrics keys and the typed columns that hold them
+METRIC_COLUMNS = [
+    ("response_length", "metric_response_length", "INTEGER"),
+    ("prompt_length", "metric_prompt_length", "INTEGER"),
+    ("readability_grade", "metric_readability_grade", "REAL"),
+    ("complexity_score", "metric_complexity_score", "REAL"),
+]
+METRIC_KEYS = [key for key, _, _ in METRIC_COLUMNS]
+
+COMPRESS_MIN_BYTES = 200
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+RESPONSE_CODEC = os.getenv("RESPONSE_COMPRESSION", "zlib").lower()
+
+
+def ensure_compact_schema(cursor):
+    """Create the feedback message table and add the typed metric columns if missing"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feedback_messages (
+            id INTEGER PRIMARY KEY,
+            message TEXT UNIQUE NOT NULL
+        )
+    ''')
+    cursor.execute("PRAGMA table_info(attempts)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for _, column, column_type in METRIC_COLUMNS:
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE attempts ADD COLUMN {column} {column_type}")
+
+
+# 📝 Feedback codes
+class FeedbackCodec:
+    """Maps feedback messages to small integer codes, adding unseen messages on demand.
+    Without a db_path the codec only knows the pairs it was given through remember()."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._by_message: Dict[str, int] = {}
+        self._by_code: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, conn: sqlite3.Connection):
+        for code, message in conn.execute("SELECT id, message FROM feedback_messages"):
+            self._by_message[message] = code
+            self._by_code[code] = message
+
+    def remember(self, pairs):
+        """Add (code, message) pairs loaded by the caller (used by non-SQLite backends)"""
+        with self._lock:
+            for code, message in pairs:
+                self._by_message[message] = code
+                self._by_code[code] = message
+
+    def unknown_messages(self, messages: List[str]) -> List[str]:
+        return [message for message in dict.fromkeys(messages) if message not in self._by_message]
+
+    def has_unknown_codes(self, value: Optional[str]) -> bool:
+        if not value or value.startswith("["):
+            return False
+        return any(int(code) not in self._by_code for code in value.split(","))
+
+    def _code_for(self, message: str) -> int:
+        code = self._by_message.get(message)
+        if code is not None:
+            return code
+        if self.db_path is None:
+            raise KeyError(f"No code registered for feedback message {message!r}")
+        # New messages are committed on their own connection straight away, so a code is
+        # never cached for a row that a rolled-back caller transaction would take with it
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("INSERT OR IGNORE INTO feedback_messages (message) VALUES (?)", (message,))
+            conn.commit()
+            # Another worker may have inserted it first - always read back the stored id
+            code = conn.execute("SELECT id FROM feedback_messages WHERE message = ?", (message,)).fetchone()[0]
+        finally:
+            conn.close()
+        self._by_message[message] = code
+        self._by_code[code] = message
+        return code
+
+    def encode(self, messages: List[str]) -> str:
+        """'3,1,7' for a list of messages"""
+        with self._lock:
+            return ",".join(str(self._code_for(message)) for message in messages)
+
+    def decode(self, value: Optional[str]) -> List[str]:
+        """Feedback list from either the code string or a legacy JSON array"""
+        if not value:
+            return []
+        if value.startswith("["):
+            return json.loads(value)
+        codes = [int(code) for code in value.split(",")]
+        with self._lock:
+            if self.db_path is not None and any(code not in self._by_code for code in codes):
+                conn = sqlite3.connect(self.db_path)
+                try:
+                    self._load(conn)
+                finally:
+                    conn.close()
+            return [self._by_code.get(code, "") for code in codes]
+
+
+# 📊 Detailed metrics
+def split_metrics(metrics: Dict[str, Any]) -> Tuple[tuple, str]:
+    """(typed column values, JSON of the remaining keys or '' when there are none)"""
+    typed = tuple(metrics.get(key) for key in METRIC_KEYS)
+    extras = {key: value for key, value in metrics.items() if key not in METRIC_KEYS}
+    return typed, json.dumps(extras, separators=(",", ":")) if extras else ""
+
+
+def join_metrics(typed: tuple, extras: Optional[str]) -> Dict[str, Any]:
+    """Inverse of split_metrics(); also accepts legacy full-JSON detailed_metrics"""
+    metrics: Dict[str, Any] = {}
+    legacy = json.loads(extras) if extras else {}
+    for key, value in zip(METRIC_KEYS, typed):
+        if value is not None:
+            metrics[key] = value
+        elif key in legacy:
+            metrics[key] = legacy[key]
+    for key, value in legacy.items():
+        if key not in metrics:
+            metrics[key] = value
+    return metrics
+
+
+# 🗜️ Response compression
+def compress_text(text: str):
+    """Plain str for short responses, tagged compressed bytes for long ones"""
+    raw = text.encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return text
+    if RESPONSE_CODEC == "zstd" and zstandard is not None:
+        packed = bytes([CODEC_ZSTD]) + zstandard.ZstdCompressor(level=6).compress(raw)
+    else:
+        packed = bytes([CODEC_ZLIB]) + zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_text(value) -> str:
+    """Transparent read of a value written by compress_text() (or a legacy plain string)"""
+    if value is None or isinstance(value, str):
+        return value
+    codec, payload = value[0], value[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload).decode()
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Response was stored with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload).decode()
+    raise ValueError(f"Unknown response codec {codec}")
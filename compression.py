@@ -0,0 +1,183 @@
+# compression.py - Accept-Encoding negotiated gzip/brotli compression
+# CompressionMiddleware compresses JSON/text responses on the fly once they reach a minimum
+# size; below it the CPU and the extra header cost more than the bytes saved. Payloads that
+# only change with the catalog are compressed once, at the highest levels, by precompress()
+# and served by encoded_response(); the middleware leaves anything already encoded alone.
+# brotli is optional: without it only gzip is offered.
+
+import zlib
+from typing import Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+DEFAULT_MINIMUM_SIZE = 1024
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+
+# On-the-fly levels favour speed; precompressed payloads pay for the best ratio once
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+
+def available_encodings() -> list:
+    """Encodings this server can produce, in order of preference"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str, offered: Iterable[str]) -> Optional[str]:
+    """Best offered encoding the client accepts (highest q, then our preference); None for identity"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class StreamCompressor:
+    """Incremental gzip or brotli encoder for streamed bodies"""
+
+    def __init__(self, encoding: str, precompressed: bool = False):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=PRECOMPRESS_BROTLI_QUALITY if precompressed else BROTLI_QUALITY)
+        else:
+            # wbits 31 = gzip container
+            self._zlib = zlib.compressobj(PRECOMPRESS_GZIP_LEVEL if precompressed else GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compressed bytes for this chunk, flushed so the client can decode them right away"""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def compress(data: bytes, encoding: str, precompressed: bool = False) -> bytes:
+    return StreamCompressor(encoding, precompressed).finish(data)
+
+
+def precompress(body: bytes, minimum_size: int = DEFAULT_MINIMUM_SIZE) -> Dict[str, bytes]:
+    """{encoding: body} for every available encoding, plus "identity"; small bodies stay identity only"""
+    variants = {"identity": body}
+    if minimum_size >= 0 and len(body) >= minimum_size:
+        for encoding in available_encodings():
+            variants[encoding] = compress(body, encoding, precompressed=True)
+    return variants
+
+
+def encoded_response(request: Request, variants: Dict[str, bytes], media_type: str = "application/json") -> Response:
+    """Serve the best precompressed variant for this request's Accept-Encoding"""
+    offered = [encoding for encoding in variants if encoding != "identity"]
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), offered)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(variants[encoding or "identity"], media_type=media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """Compress responses of compressible types at or above `minimum_size` bytes
+    (negative disables). Streamed responses are compressed chunk by chunk."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.minimum_size < 0:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), available_encodings())
+        await CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class CompressionResponder:
+    """Per-request state: holds back the response start until the first body chunk is seen"""
+
+    def __init__(self, app: ASGIApp, encoding: Optional[str], minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if self._compressible(headers):
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                self.start_message = message
+            else:
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if self.encoding is None or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            self.compressor = StreamCompressor(self.encoding)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start)
+
+        if more_body:
+            chunk = self.compressor.compress(body)
+        else:
+            chunk = self.compressor.finish(body)
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,30 +1,222 @@
 # database_setup.py - Complete database initialization with sample data
 # This creates the entire database structure and populates it with realistic sample data!
+#
+# Capacity-testing datasets can be generated with the same script, e.g.
+#   python database_setup.py --users 100000 --attempts-per-user 100 --challenges 40 --days 365 --seed 42
+# Pass a postgresql:// URL as --db to load the same dataset into PostgreSQL. Timestamps are
+# UTC and end at the current time; add --now 2026-01-31T12:00 to get the same rows on any day.
 
 import sqlite3
 import json
 import hashlib
+import argparse
+import asyncio
+import glob
+import math
+import os
+import tempfile
+import time
 from datetime import datetime, timedelta
+from itertools import islice
 import random
+from typing import Optional
+
+from compact_storage import compress_text
+from achievements import backfill_achievements
+from attempt_archive import ARCHIVE_DIR, resolve_archive_path
+
+DATABASE_PATH = "prompt_trainer.db"
+
+# The API's prompt index (main.PROMPT_INDEX_PATH) is derived from the attempts table and
+# is stale once the database is rebuilt; by default it sits next to the database file
+PROMPT_INDEX_FILE = "prompt_index.npz"
+
+MODELS = ["openai", "claude", "gemini"]
+MODEL_WEIGHTS = [0.5, 0.3, 0.2]
+
+# Score offset by challenge difficulty - harder challenges score lower on average
+DIFFICULTY_OFFSET = {"beginner": 6.0, "intermediate": 0.0, "advanced": -8.0}
+
+# Rows per executemany() call / per commit during bulk loads
+BATCH_SIZE = 50_000
+COMMIT_EVERY_BATCHES = 20
+
+# Secondary indexes, built after the bulk load so inserts don't maintain them row by row
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_attempts_user_created ON attempts (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_challenge_score ON attempts (challenge_id, total_score)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_user_challenge_created ON attempts (user_id, challenge_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_achievements_user ON achievements (user_id)",
+]
+
+SAMPLE_USERS = [
+    ("demo_user", "demo@prompttrainer.com", "password123"),
+    ("alice_ai", "alice@example.com", "password123"),
+    ("bob_prompter", "bob@example.com", "password123"),
+    ("carol_creative", "carol@example.com", "password123"),
+    ("david_dev", "david@example.com", "password123"),
+    ("emma_expert", "emma@example.com", "password123"),
+    ("frank_beginner", "frank@example.com", "password123"),
+    ("grace_guru", "grace@example.com", "password123")
+]
+
+CHALLENGES = [
+    {
+        "id": "professional_email",
+        "title": "Professional Follow-up Email",
+        "description": "Create a prompt that generates a professional follow-up email after a business meeting. The email should be courteous, specific, and action-oriented.",
+        "difficulty": "beginner",
+        "target_response": "Thank you for taking the time to meet with me yesterday to discuss the marketing campaign proposal. I wanted to follow up on the key action items we identified: 1) Finalizing the budget allocation by Friday, 2) Scheduling the creative review session for next week, and 3) Confirming the launch timeline for Q2. I've attached the revised proposal document with the changes we discussed. Please let me know if you need any additional information or clarification on any of these points. I look forward to moving forward with this exciting project.",
+        "reference_responses": [
+            "Hi Jordan, thanks again for meeting with me this morning about the product launch. As promised, here is a quick summary of the action items from our meeting: I will send the updated vendor quotes by Wednesday, your team will review the draft timeline, and we will reconvene on Monday to confirm the final plan. Please let me know if I missed anything or if you have any questions in the meantime. Best regards.",
+        ],
+        "constraints": {
+            "max_words": 120,
+            "required_keywords": ["follow-up", "action items", "meeting"],
+            "target_style": {"formality": "formal", "tone": "professional"},
+            "format": "email"
+        },
+        "time_limit": 300
+    },
+    {
+        "id": "creative_story",
+        "title": "Mystery Story Opening",
+        "description": "Write a prompt for creating a compelling 150-word mystery story opening that hooks the reader and establishes intrigue.",
+        "difficulty": "intermediate",
+        "target_response": "The lighthouse keeper hadn't been seen for three days. Detective Sarah Martinez pulled her coat tighter as she approached the weathered door, the beam above cutting through the morning fog in mechanical sweeps. The townspeople whispered about strange lights and voices from the tower at night, but whispers were all they offered. As she knocked, the sound echoed hollow and wrong. No answer. The door creaked open at her touch, revealing a staircase that spiraled into darkness. On the first step lay a compass, its needle spinning wildly, pointing everywhere and nowhere at once. Sarah picked it up, noting the fresh scratches on its brass surface. Above, something metallic scraped against stone. She drew her flashlight and began to climb, each step creaking a warning she chose to ignore.",
+        "constraints": {
+            "max_words": 150,
+            "required_keywords": ["mystery", "opening", "detective"],
+            "target_style": {"tone": "suspenseful", "pacing": "engaging"},
+            "format": "narrative"
+        },
+        "time_limit": 600
+    },
+    {
+        "id": "technical_explanation",
+        "title": "Explain Blockchain Simply",
+        "description": "Create a prompt that explains blockchain technology to a 10-year-old using simple language and relatable analogies.",
+        "difficulty": "intermediate",
+        "target_response": "Imagine you and your friends have a special notebook that everyone shares to keep track of trading cards. Whenever someone gives someone else a card, you write it down in the notebook. But here's the cool part - everyone has their own copy of the same notebook, and they all have to match perfectly! If someone tries to cheat and change their notebook to say they have more cards, everyone else will notice because their notebooks are different. That's like blockchain - it's a way to keep track of things (like digital money) that's really hard to cheat on because lots of computers all have the same information. It's like having thousands of friends all watching to make sure nobody cheats with the notebook!",
+        "reference_responses": [
+            "Think of blockchain like a class diary that every student keeps an exact copy of. Each time something happens, like someone trading a sticker, everyone writes the same line in their own diary. Because all the diaries have to match, nobody can secretly change what happened - the others would spot it right away. Computers do the same thing with digital money, which is why blockchain is so hard to cheat. It's a simple, easy way to keep everyone honest!",
+        ],
+        "constraints": {
+            "max_words": 120,
+            "target_style": {"formality": "informal", "tone": "friendly", "reading_level": 5},
+            "required_keywords": ["simple", "easy", "notebook"],
+            "format": "explanation"
+        },
+        "time_limit": 450
+    },
+    {
+        "id": "business_proposal",
+        "title": "Investment Proposal Pitch",
+        "description": "Craft a prompt for a persuasive business proposal presentation that includes key metrics and compelling arguments for investment.",
+        "difficulty": "advanced",
+        "target_response": "Our innovative EcoPackaging solution addresses the critical $12B market gap in sustainable packaging, offering 40% cost reduction while achieving complete carbon neutrality by 2026. With strategic $2M Series A investment, we project $15M revenue by year three, capturing 5% market share in the rapidly growing $50B sustainable packaging industry. Our proprietary bio-degradable material technology, protected by three pending patents, provides significant competitive advantages over traditional plastic alternatives. The experienced founding team combines 50+ years industry expertise across packaging, sustainability, and supply chain management. Major retailers including Target and Whole Foods have expressed preliminary interest pending pilot program results. We seek strategic partnership to accelerate market penetration, scale manufacturing operations globally, and establish dominant position before larger competitors enter this emerging market segment.",
+        "constraints": {
+            "max_words": 200,
+            "required_keywords": ["investment", "revenue", "market share", "technology"],
+            "target_style": {"formality": "formal", "tone": "confident"},
+            "format": "business_proposal"
+        },
+        "time_limit": 900
+    },
+    {
+        "id": "social_media_post",
+        "title": "Engaging Social Media Content",
+        "description": "Create a prompt for an engaging social media post that promotes environmental awareness with a clear call to action.",
+        "difficulty": "beginner",
+        "target_response": "🌍 Small changes, BIG impact! Did you know that switching to a reusable water bottle can save 1,460 plastic bottles per year? That's just ONE simple swap! ♻️ This Earth Day, let's challenge ourselves to make sustainable choices that matter. Here are 3 easy ways to start: 1️⃣ Use reusable bags when shopping 2️⃣ Choose digital receipts over paper 3️⃣ Walk or bike for short trips What's YOUR sustainable swap this week? Share in the comments and tag a friend to join the movement! 🌱 Together, we can create a cleaner, greener future for generations to come. #EarthDay #Sustainability #EcoFriendly #ClimateAction #GoGreen",
+        "constraints": {
+            "max_words": 100,
+            "required_keywords": ["Earth Day", "sustainable", "environment"],
+            "target_style": {"tone": "enthusiastic", "formality": "casual"},
+            "format": "social_media"
+        },
+        "time_limit": 240
+    },
+    {
+        "id": "customer_service",
+        "title": "Customer Service Response",
+        "description": "Create a helpful and empathetic customer service response to resolve a billing dispute while maintaining a positive relationship.",
+        "difficulty": "beginner",
+        "target_response": "Dear valued customer, Thank you for contacting us regarding the billing concern on your account. I sincerely apologize for any confusion this may have caused. I've thoroughly reviewed your account and can see that there was indeed an error in our billing system that resulted in the duplicate charge you mentioned. I've immediately processed a full refund of $49.99, which should appear in your account within 2-3 business days. To prevent this from happening again, I've also added a note to your account and updated our billing system. As a gesture of goodwill for this inconvenience, I've applied a 10% discount to your next billing cycle. If you have any other questions or concerns, please don't hesitate to reach out. We truly value your business and appreciate your patience.",
+        "constraints": {
+            "max_words": 140,
+            "required_keywords": ["apologize", "refund", "account"],
+            "target_style": {"formality": "polite", "tone": "helpful"},
+            "format": "customer_service"
+        },
+        "time_limit": 360
+    },
+    {
+        "id": "recipe_instructions",
+        "title": "Clear Recipe Instructions",
+        "description": "Write clear, easy-to-follow instructions for making chocolate chip cookies that a beginner cook could successfully use.",
+        "difficulty": "beginner",
+        "target_response": "Perfect Chocolate Chip Cookies - Easy Recipe for Beginners\n\nIngredients: 1 cup butter (softened), 3/4 cup brown sugar, 1/2 cup white sugar, 2 eggs, 2 cups flour, 1 tsp vanilla, 1/2 tsp salt, 1 tsp baking soda, 1 1/2 cups chocolate chips.\n\nInstructions:\n1. Preheat oven to 350°F (175°C)\n2. Mix softened butter with both sugars until creamy (about 2 minutes)\n3. Add eggs one at a time, then vanilla\n4. In separate bowl, combine flour, salt, and baking soda\n5. Gradually mix dry ingredients into wet ingredients\n6. Stir in chocolate chips\n7. Drop rounded tablespoons of dough onto ungreased baking sheet, 2 inches apart\n8. Bake 9-11 minutes until edges are golden brown\n9. Cool on baking sheet for 5 minutes before transferring\n\nMakes about 36 cookies. Enjoy!",
+        "constraints": {
+            "max_words": 150,
+            "required_keywords": ["ingredients", "instructions", "bake"],
+            "target_style": {"tone": "clear", "formality": "instructional"},
+            "format": "recipe"
+        },
+        "time_limit": 420
+    },
+    {
+        "id": "code_documentation",
+        "title": "API Documentation",
+        "description": "Write clear, comprehensive documentation for a REST API endpoint that developers will use to integrate with your service.",
+        "difficulty": "advanced",
+        "target_response": "## POST /api/users\n\nCreates a new user account in the system.\n\n### Request Parameters\n\n**Body** (application/json):\n- `username` (string, required): Unique username, 3-50 characters, alphanumeric only\n- `email` (string, required): Valid email address\n- `password` (string, required): Minimum 8 characters with at least one number\n- `profile` (object, optional): Additional user information\n\n### Response\n\n**Success (201 Created):**\n```json\n{\n  \"id\": 12345,\n  \"username\": \"johndoe\",\n  \"email\": \"john@example.com\",\n  \"created_at\": \"2024-01-15T10:30:00Z\"\n}\n```\n\n**Error (400 Bad Request):**\n```json\n{\n  \"error\": \"validation_failed\",\n  \"message\": \"Username already exists\"\n}\n```\n\n### Example Request\n```bash\ncurl -X POST https://api.example.com/users \\\n  -H \"Content-Type: application/json\" \\\n  -d '{\"username\":\"johndoe\",\"email\":\"john@example.com\",\"password\":\"securepass123\"}'\n```",
+        "constraints": {
+            "max_words": 200,
+            "required_keywords": ["API", "endpoint", "parameters", "response"],
+            "target_style": {"formality": "technical", "tone": "clear"},
+            "format": "documentation"
+        },
+        "time_limit": 720
+    }
+]
+
+SAMPLE_PROMPTS = {
+    "professional_email": [
+        "Write a professional follow-up email after yesterday's meeting about the marketing campaign, including action items and next steps.",
+        "Create a formal business email following up on our discussion about the project timeline and deliverables.",
+        "Compose a professional follow-up message mentioning the action items we discussed in our meeting."
+    ],
+    "creative_story": [
+        "Write a compelling mystery story opening with a detective investigating something suspicious at a lighthouse.",
+        "Create a suspenseful mystery opening featuring a detective and an abandoned location with mysterious circumstances.",
+        "Generate a gripping mystery story beginning with a detective discovering something strange and unexplained."
+    ],
+    "technical_explanation": [
+        "Explain blockchain technology to a 10-year-old using simple words and easy-to-understand analogies like notebooks or trading cards.",
+        "Create a simple explanation of blockchain for children using everyday examples they can relate to.",
+        "Write an easy explanation of blockchain technology using simple language and familiar comparisons."
+    ]
+}
+
+SAMPLE_FEEDBACK = [
+    "Great semantic accuracy! Your prompt was very clear and specific.",
+    "Good task compliance - you included the required keywords effectively.",
+    "Excellent style matching! The tone was perfect for the target audience.",
+    "Consider being more specific about the desired format and structure.",
+    "Try to be more concise while maintaining all the necessary details.",
+    "Perfect efficiency! You achieved great results with a well-crafted prompt.",
+    "The AI response closely matched the target style and content.",
+    "Good use of examples and context to guide the AI's response."
+]
+
 
 def hash_password(password: str) -> str:
     """Hash password for secure storage"""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def setup_complete_database():
-    """Create and populate the complete database with sample data"""
-    print("🗄️ Setting up Prompt Engineering Trainer Database...")
-    
-    conn = sqlite3.connect("prompt_trainer.db")
-    cursor = conn.cursor()
-    
-    # Drop existing tables for fresh setup
-    tables = ["attempts", "achievements", "challenges", "users"]
-    for table in tables:
-        cursor.execute(f"DROP TABLE IF EXISTS {table}")
-    
-    print("✅ Cleaned existing database")
-    
+def create_schema(cursor):
+    """Create all tables (without secondary indexes)"""
     # 👥 Create Users table
     cursor.execute('''
         CREATE TABLE users (
@@ -48,7 +240,8 @@ def setup_complete_database():
             target_response TEXT NOT NULL,
             constraints TEXT NOT NULL,
             time_limit INTEGER DEFAULT 300,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reference_responses TEXT NOT NULL DEFAULT '[]'
         )
     ''')
     
@@ -70,11 +263,24 @@ def setup_complete_database():
             feedback TEXT NOT NULL,
             detailed_metrics TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duplicate_of INTEGER,
+            metric_response_length INTEGER,
+            metric_prompt_length INTEGER,
+            metric_readability_grade REAL,
+            metric_complexity_score REAL,
             FOREIGN KEY (user_id) REFERENCES users (id),
             FOREIGN KEY (challenge_id) REFERENCES challenges (id)
         )
     ''')
     
+    # 💬 Feedback messages referenced by attempts.feedback codes
+    cursor.execute('''
+        CREATE TABLE feedback_messages (
+            id INTEGER PRIMARY KEY,
+            message TEXT UNIQUE NOT NULL
+        )
+    ''')
+    
     # 🏆 Create Achievements table
     cursor.execute('''
         CREATE TABLE achievements (
@@ -86,331 +292,289 @@ def setup_complete_database():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+
+def apply_bulk_load_pragmas(conn):
+    """Trade durability for speed while the database is being (re)built"""
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256MB page cache
+
+def restore_runtime_pragmas(conn):
+    """Switch back to the settings the API runs with"""
+    conn.execute("PRAGMA locking_mode = NORMAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+def create_indexes(cursor):
+    """Build secondary indexes and refresh planner statistics"""
+    for statement in INDEXES:
+        cursor.execute(statement)
+    cursor.execute("ANALYZE")
+
+def bulk_insert(conn, sql: str, rows, batch_size: int = BATCH_SIZE) -> int:
+    """Stream rows through executemany() in large batches and long transactions"""
+    cursor = conn.cursor()
+    total = 0
+    batches = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        cursor.executemany(sql, batch)
+        total += len(batch)
+        batches += 1
+        if batches % COMMIT_EVERY_BATCHES == 0:
+            conn.commit()
+            print(f"   ... {total:,} rows")
+    conn.commit()
+    return total
+
+def build_challenges(count: int):
+    """Return `count` challenges: the curated library first, then synthetic variants of it"""
+    challenges = list(CHALLENGES[:count])
+    for n in range(len(challenges), count):
+        template = CHALLENGES[n % len(CHALLENGES)]
+        variant = dict(template)
+        variant["id"] = f"{template['id']}_{n:04d}"
+        variant["title"] = f"{template['title']} #{n}"
+        challenges.append(variant)
+    return challenges
+
+def generate_users(count: int):
+    """Yield user rows: the demo accounts first, then synthetic users"""
+    demo_hash = hash_password("password123")
+    for n in range(count):
+        if n < len(SAMPLE_USERS):
+            username, email, password = SAMPLE_USERS[n]
+            yield (username, email, hash_password(password))
+        else:
+            yield (f"user_{n:07d}", f"user_{n:07d}@example.com", demo_hash)
+
+def zipf_cum_weights(count: int, exponent: float):
+    """Cumulative Zipf weights - a few items are very popular, most are rarely picked"""
+    cum_weights = []
+    running = 0.0
+    for rank in range(1, count + 1):
+        running += 1.0 / rank ** exponent
+        cum_weights.append(running)
+    return cum_weights
+
+def generate_attempts(rng: random.Random, user_ids, challenges, attempts_per_user: float,
+                      days: int, user_stats, now: datetime):
+    """
+    Yield attempt rows with skewed, realistic distributions:
+    - attempts per user are lognormal (most users try a few times, a few grind)
+    - challenge popularity is Zipf-distributed
+    - each user has a skill level; scores depend on skill, difficulty and practice
+    - timestamps skew towards recent days and daytime hours, all before `now` (naive UTC,
+      like CURRENT_TIMESTAMP)
+
+    Per-user totals are accumulated into `user_stats` as rows are produced.
+    """
+    sigma = 1.0
+    mu = math.log(max(attempts_per_user, 1e-9)) - sigma ** 2 / 2
+    challenge_cum_weights = zipf_cum_weights(len(challenges), 1.1)
+    hour_weights = [1, 1, 1, 1, 1, 2, 3, 5, 8, 10, 11, 11, 10, 10, 11, 11, 10, 9, 8, 8, 7, 5, 3, 2]
+    now = now.replace(microsecond=0)
+    now_second_of_day = now.hour * 3600 + now.minute * 60 + now.second
+    day_strings = [(now - timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days + 1)]
+    
+    # Pre-render everything that only depends on (challenge, model) or is drawn from a small pool
+    responses = {
+        (c["id"], m): compress_text(f"This is a sample AI response generated for the {c['id']} challenge using {m}. The response follows the prompt instructions and meets the specified requirements for style, tone, and content structure.")
+        for c in challenges for m in MODELS
+    }
+    prompts = {}
+    for c in challenges:
+        base_id = next((t["id"] for t in CHALLENGES if c["id"].startswith(t["id"])), c["id"])
+        prompts[c["id"]] = SAMPLE_PROMPTS.get(base_id, [
+            f"Create a response for the {c['id']} challenge following all the specified requirements and constraints."
+        ])
+    # Feedback is stored as codes into feedback_messages (seeded with SAMPLE_FEEDBACK as ids 1..n)
+    feedback_codes = list(range(1, len(SAMPLE_FEEDBACK) + 1))
+    feedback_pool = [",".join(map(str, rng.sample(feedback_codes, rng.randint(2, 4)))) for _ in range(64)]
+    offsets = [DIFFICULTY_OFFSET.get(c["difficulty"], 0.0) for c in challenges]
+    clamp = lambda x: 0.0 if x < 0 else 100.0 if x > 100 else x
+    
+    for user_id in user_ids:
+        count = max(1, int(round(rng.lognormvariate(mu, sigma))))
+        skill = rng.gauss(75, 8)
+        picks = rng.choices(range(len(challenges)), cum_weights=challenge_cum_weights, k=count)
+        model_picks = rng.choices(MODELS, weights=MODEL_WEIGHTS, k=count)
+        hours = rng.choices(range(24), weights=hour_weights, k=count)
+        stats = user_stats.setdefault(user_id, [0.0, set()])
+        
+        for i in range(count):
+            challenge = challenges[picks[i]]
+            challenge_id = challenge["id"]
+            model_name = model_picks[i]
+            prompt = rng.choice(prompts[challenge_id])
+            practice = 5.0 * i / count  # users improve a little over their history
+            base_score = skill + offsets[picks[i]] + practice
+            
+            semantic_accuracy = clamp(base_score + rng.uniform(-10, 10))
+            task_compliance = clamp(base_score + rng.uniform(-15, 15))
+            style_match = clamp(base_score + rng.uniform(-10, 10))
+            efficiency_score = clamp(base_score + rng.uniform(-20, 20))
+            total_score = (
+                semantic_accuracy * 0.4 + 
+                task_compliance * 0.3 + 
+                style_match * 0.2 + 
+                efficiency_score * 0.1
+            )
+            
+            days_ago = int(days * rng.random() ** 2)
+            second_of_day = hours[i] * 3600 + rng.randrange(3600)
+            if days_ago == 0 and second_of_day > now_second_of_day:
+                second_of_day = rng.randrange(now_second_of_day + 1)  # today: only times already passed
+            hour, remainder = divmod(second_of_day, 3600)
+            created_at = f"{day_strings[days_ago]} {hour:02d}:{remainder // 60:02d}:{remainder % 60:02d}"
+            
+            stats[0] += total_score
+            stats[1].add(picks[i])
+            
+            yield (
+                user_id, challenge_id, prompt, model_name, responses[(challenge_id, model_name)],
+                semantic_accuracy, task_compliance, style_match, efficiency_score, total_score,
+                rng.randint(60, 400), rng.choice(feedback_pool), "", created_at,
+                rng.randint(50, 200), len(prompt.split()), round(rng.uniform(6.0, 12.0), 2)
+            )
+
+def setup_complete_database(db_path: str = DATABASE_PATH, users: int = len(SAMPLE_USERS),
+                            challenges: int = len(CHALLENGES), attempts_per_user: float = 10,
+                            days: int = 30, seed: Optional[int] = None, now: Optional[datetime] = None,
+                            prompt_index_path: Optional[str] = None):
+    """Create and populate the complete database with sample data; attempts end at `now`
+    (naive UTC, default the current time), so a fixed seed and `now` give the same dataset.
+    The prompt index built from the old rows (default: next to db_path) is deleted."""
+    print("🗄️ Setting up Prompt Engineering Trainer Database...")
+    started = time.perf_counter()
+    rng = random.Random(seed)
     
-    print("✅ Database tables created")
+    conn = sqlite3.connect(db_path)
+    apply_bulk_load_pragmas(conn)
+    cursor = conn.cursor()
     
-    # 🧑‍💻 Insert sample users
-    sample_users = [
-        ("demo_user", "demo@prompttrainer.com", "password123"),
-        ("alice_ai", "alice@example.com", "password123"),
-        ("bob_prompter", "bob@example.com", "password123"),
-        ("carol_creative", "carol@example.com", "password123"),
-        ("david_dev", "david@example.com", "password123"),
-        ("emma_expert", "emma@example.com", "password123"),
-        ("frank_beginner", "frank@example.com", "password123"),
-        ("grace_guru", "grace@example.com", "password123")
-    ]
+    # Drop existing tables for fresh setup
+    tables = ["attempts", "achievements", "achievement_state", "challenges", "users", "table_counters",
+              "evaluation_cache", "feedback_messages", "score_sketches", "leaderboard_buckets",
+              "attempt_archives", "archived_rollups"]
+    for table in tables:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    # Freed pages go back to the file system in steps (the API's incremental_vacuum task);
+    # VACUUM applies the setting to a file that already existed
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("VACUUM")
+    
+    index_path = prompt_index_path or resolve_archive_path(db_path, PROMPT_INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    # Archived months of the attempts table dropped above
+    for path in glob.glob(os.path.join(resolve_archive_path(db_path, ARCHIVE_DIR), "attempts_*.db")):
+        os.remove(path)
     
-    for username, email, password in sample_users:
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-            (username, email, hash_password(password))
-        )
+    print("✅ Cleaned existing database")
     
-    print(f"✅ Added {len(sample_users)} sample users")
+    create_schema(cursor)
+    conn.commit()
     
-    # 🎯 Insert comprehensive challenge library
-    challenges = [
-        {
-            "id": "professional_email",
-            "title": "Professional Follow-up Email",
-            "description": "Create a prompt that generates a professional follow-up email after a business meeting. The email should be courteous, specific, and action-oriented.",
-            "difficulty": "beginner",
-            "target_response": "Thank you for taking the time to meet with me yesterday to discuss the marketing campaign proposal. I wanted to follow up on the key action items we identified: 1) Finalizing the budget allocation by Friday, 2) Scheduling the creative review session for next week, and 3) Confirming the launch timeline for Q2. I've attached the revised proposal document with the changes we discussed. Please let me know if you need any additional information or clarification on any of these points. I look forward to moving forward with this exciting project.",
-            "constraints": {
-                "max_words": 120,
-                "required_keywords": ["follow-up", "action items", "meeting"],
-                "target_style": {"formality": "formal", "tone": "professional"},
-                "format": "email"
-            },
-            "time_limit": 300
-        },
-        {
-            "id": "creative_story",
-            "title": "Mystery Story Opening",
-            "description": "Write a prompt for creating a compelling 150-word mystery story opening that hooks the reader and establishes intrigue.",
-            "difficulty": "intermediate",
-            "target_response": "The lighthouse keeper hadn't been seen for three days. Detective Sarah Martinez pulled her coat tighter as she approached the weathered door, the beam above cutting through the morning fog in mechanical sweeps. The townspeople whispered about strange lights and voices from the tower at night, but whispers were all they offered. As she knocked, the sound echoed hollow and wrong. No answer. The door creaked open at her touch, revealing a staircase that spiraled into darkness. On the first step lay a compass, its needle spinning wildly, pointing everywhere and nowhere at once. Sarah picked it up, noting the fresh scratches on its brass surface. Above, something metallic scraped against stone. She drew her flashlight and began to climb, each step creaking a warning she chose to ignore.",
-            "constraints": {
-                "max_words": 150,
-                "required_keywords": ["mystery", "opening", "detective"],
-                "target_style": {"tone": "suspenseful", "pacing": "engaging"},
-                "format": "narrative"
-            },
-            "time_limit": 600
-        },
-        {
-            "id": "technical_explanation",
-            "title": "Explain Blockchain Simply",
-            "description": "Create a prompt that explains blockchain technology to a 10-year-old using simple language and relatable analogies.",
-            "difficulty": "intermediate",
-            "target_response": "Imagine you and your friends have a special notebook that everyone shares to keep track of trading cards. Whenever someone gives someone else a card, you write it down in the notebook. But here's the cool part - everyone has their own copy of the same notebook, and they all have to match perfectly! If someone tries to cheat and change their notebook to say they have more cards, everyone else will notice because their notebooks are different. That's like blockchain - it's a way to keep track of things (like digital money) that's really hard to cheat on because lots of computers all have the same information. It's like having thousands of friends all watching to make sure nobody cheats with the notebook!",
-            "constraints": {
-                "max_words": 120,
-                "target_style": {"formality": "informal", "tone": "friendly", "reading_level": 5},
-                "required_keywords": ["simple", "easy", "notebook"],
-                "format": "explanation"
-            },
-            "time_limit": 450
-        },
-        {
-            "id": "business_proposal",
-            "title": "Investment Proposal Pitch",
-            "description": "Craft a prompt for a persuasive business proposal presentation that includes key metrics and compelling arguments for investment.",
-            "difficulty": "advanced",
-            "target_response": "Our innovative EcoPackaging solution addresses the critical $12B market gap in sustainable packaging, offering 40% cost reduction while achieving complete carbon neutrality by 2026. With strategic $2M Series A investment, we project $15M revenue by year three, capturing 5% market share in the rapidly growing $50B sustainable packaging industry. Our proprietary bio-degradable material technology, protected by three pending patents, provides significant competitive advantages over traditional plastic alternatives. The experienced founding team combines 50+ years industry expertise across packaging, sustainability, and supply chain management. Major retailers including Target and Whole Foods have expressed preliminary interest pending pilot program results. We seek strategic partnership to accelerate market penetration, scale manufacturing operations globally, and establish dominant position before larger competitors enter this emerging market segment.",
-            "constraints": {
-                "max_words": 200,
-                "required_keywords": ["investment", "revenue", "market share", "technology"],
-                "target_style": {"formality": "formal", "tone": "confident"},
-                "format": "business_proposal"
-            },
-            "time_limit": 900
-        },
-        {
-            "id": "social_media_post",
-            "title": "Engaging Social Media Content",
-            "description": "Create a prompt for an engaging social media post that promotes environmental awareness with a clear call to action.",
-            "difficulty": "beginner",
-            "target_response": "🌍 Small changes, BIG impact! Did you know that switching to a reusable water bottle can save 1,460 plastic bottles per year? That's just ONE simple swap! ♻️ This Earth Day, let's challenge ourselves to make sustainable choices that matter. Here are 3 easy ways to start: 1️⃣ Use reusable bags when shopping 2️⃣ Choose digital receipts over paper 3️⃣ Walk or bike for short trips What's YOUR sustainable swap this week? Share in the comments and tag a friend to join the movement! 🌱 Together, we can create a cleaner, greener future for generations to come. #EarthDay #Sustainability #EcoFriendly #ClimateAction #GoGreen",
-            "constraints": {
-                "max_words": 100,
-                "required_keywords": ["Earth Day", "sustainable", "environment"],
-                "target_style": {"tone": "enthusiastic", "formality": "casual"},
-                "format": "social_media"
-            },
-            "time_limit": 240
-        },
-        {
-            "id": "customer_service",
-            "title": "Customer Service Response",
-            "description": "Create a helpful and empathetic customer service response to resolve a billing dispute while maintaining a positive relationship.",
-            "difficulty": "beginner",
-            "target_response": "Dear valued customer, Thank you for contacting us regarding the billing concern on your account. I sincerely apologize for any confusion this may have caused. I've thoroughly reviewed your account and can see that there was indeed an error in our billing system that resulted in the duplicate charge you mentioned. I've immediately processed a full refund of $49.99, which should appear in your account within 2-3 business days. To prevent this from happening again, I've also added a note to your account and updated our billing system. As a gesture of goodwill for this inconvenience, I've applied a 10% discount to your next billing cycle. If you have any other questions or concerns, please don't hesitate to reach out. We truly value your business and appreciate your patience.",
-            "constraints": {
-                "max_words": 140,
-                "required_keywords": ["apologize", "refund", "account"],
-                "target_style": {"formality": "polite", "tone": "helpful"},
-                "format": "customer_service"
-            },
-            "time_limit": 360
-        },
-        {
-            "id": "recipe_instructions",
-            "title": "Clear Recipe Instructions",
-            "description": "Write clear, easy-to-follow instructions for making chocolate chip cookies that a beginner cook could successfully use.",
-            "difficulty": "beginner",
-            "target_response": "Perfect Chocolate Chip Cookies - Easy Recipe for Beginners\n\nIngredients: 1 cup butter (softened), 3/4 cup brown sugar, 1/2 cup white sugar, 2 eggs, 2 cups flour, 1 tsp vanilla, 1/2 tsp salt, 1 tsp baking soda, 1 1/2 cups chocolate chips.\n\nInstructions:\n1. Preheat oven to 350°F (175°C)\n2. Mix softened butter with both sugars until creamy (about 2 minutes)\n3. Add eggs one at a time, then vanilla\n4. In separate bowl, combine flour, salt, and baking soda\n5. Gradually mix dry ingredients into wet ingredients\n6. Stir in chocolate chips\n7. Drop rounded tablespoons of dough onto ungreased baking sheet, 2 inches apart\n8. Bake 9-11 minutes until edges are golden brown\n9. Cool on baking sheet for 5 minutes before transferring\n\nMakes about 36 cookies. Enjoy!",
-            "constraints": {
-                "max_words": 150,
-                "required_keywords": ["ingredients", "instructions", "bake"],
-                "target_style": {"tone": "clear", "formality": "instructional"},
-                "format": "recipe"
-            },
-            "time_limit": 420
-        },
-        {
-            "id": "code_documentation",
-            "title": "API Documentation",
-            "description": "Write clear, comprehensive documentation for a REST API endpoint that developers will use to integrate with your service.",
-            "difficulty": "advanced",
-            "target_response": "## POST /api/users\n\nCreates a new user account in the system.\n\n### Request Parameters\n\n**Body** (application/json):\n- `username` (string, required): Unique username, 3-50 characters, alphanumeric only\n- `email` (string, required): Valid email address\n- `password` (string, required): Minimum 8 characters with at least one number\n- `profile` (object, optional): Additional user information\n\n### Response\n\n**Success (201 Created):**\n```json\n{\n  \"id\": 12345,\n  \"username\": \"johndoe\",\n  \"email\": \"john@example.com\",\n  \"created_at\": \"2024-01-15T10:30:00Z\"\n}\n```\n\n**Error (400 Bad Request):**\n```json\n{\n  \"error\": \"validation_failed\",\n  \"message\": \"Username already exists\"\n}\n```\n\n### Example Request\n```bash\ncurl -X POST https://api.example.com/users \\\n  -H \"Content-Type: application/json\" \\\n  -d '{\"username\":\"johndoe\",\"email\":\"john@example.com\",\"password\":\"securepass123\"}'\n```",
-            "constraints": {
-                "max_words": 200,
-                "required_keywords": ["API", "endpoint", "parameters", "response"],
-                "target_style": {"formality": "technical", "tone": "clear"},
-                "format": "documentation"
-            },
-            "time_limit": 720
-        }
-    ]
+    print("✅ Database tables created")
     
-    for challenge in challenges:
-        cursor.execute('''
-            INSERT INTO challenges (id, title, description, difficulty, target_response, constraints, time_limit)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    # 🧑‍💻 Insert users
+    user_count = bulk_insert(
+        conn,
+        "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+        generate_users(users)
+    )
+    
+    print(f"✅ Added {user_count:,} users")
+    
+    # 🎯 Insert challenge library
+    challenge_list = build_challenges(challenges)
+    cursor.executemany('''
+        INSERT INTO challenges (id, title, description, difficulty, target_response, constraints, time_limit, reference_responses)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (
             challenge["id"], 
             challenge["title"], 
             challenge["description"], 
             challenge["difficulty"], 
             challenge["target_response"], 
             json.dumps(challenge["constraints"]), 
-            challenge["time_limit"]
-        ))
-    
-    print(f"✅ Added {len(challenges)} comprehensive challenges")
-    
-    # 📝 Generate realistic sample attempts
-    print("🎲 Generating sample user attempts...")
-    
-    # Get user and challenge IDs
-    cursor.execute("SELECT id FROM users")
-    user_ids = [row[0] for row in cursor.fetchall()]
+            challenge["time_limit"],
+            json.dumps(challenge.get("reference_responses", []))
+        )
+        for challenge in challenge_list
+    ])
+    conn.commit()
     
-    cursor.execute("SELECT id FROM challenges")
-    challenge_ids = [row[0] for row in cursor.fetchall()]
+    print(f"✅ Added {len(challenge_list)} challenges")
     
-    models = ["openai", "claude", "gemini"]
+    cursor.executemany(
+        "INSERT INTO feedback_messages (id, message) VALUES (?, ?)",
+        list(enumerate(SAMPLE_FEEDBACK, 1))
+    )
+    conn.commit()
     
-    # Sample prompts for different challenges
-    sample_prompts = {
-        "professional_email": [
-            "Write a professional follow-up email after yesterday's meeting about the marketing campaign, including action items and next steps.",
-            "Create a formal business email following up on our discussion about the project timeline and deliverables.",
-            "Compose a professional follow-up message mentioning the action items we discussed in our meeting."
-        ],
-        "creative_story": [
-            "Write a compelling mystery story opening with a detective investigating something suspicious at a lighthouse.",
-            "Create a suspenseful mystery opening featuring a detective and an abandoned location with mysterious circumstances.",
-            "Generate a gripping mystery story beginning with a detective discovering something strange and unexplained."
-        ],
-        "technical_explanation": [
-            "Explain blockchain technology to a 10-year-old using simple words and easy-to-understand analogies like notebooks or trading cards.",
-            "Create a simple explanation of blockchain for children using everyday examples they can relate to.",
-            "Write an easy explanation of blockchain technology using simple language and familiar comparisons."
-        ]
-    }
+    # 📝 Generate realistic attempts
+    print("🎲 Generating user attempts...")
     
-    sample_feedback = [
-        "Great semantic accuracy! Your prompt was very clear and specific.",
-        "Good task compliance - you included the required keywords effectively.",
-        "Excellent style matching! The tone was perfect for the target audience.",
-        "Consider being more specific about the desired format and structure.",
-        "Try to be more concise while maintaining all the necessary details.",
-        "Perfect efficiency! You achieved great results with a well-crafted prompt.",
-        "The AI response closely matched the target style and content.",
-        "Good use of examples and context to guide the AI's response."
-    ]
+    cursor.execute("SELECT id FROM users ORDER BY id")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    user_stats = {}
     
-    # Generate 75 realistic attempts
-    attempts_generated = 0
-    for _ in range(75):
-        user_id = random.choice(user_ids)
-        challenge_id = random.choice(challenge_ids)
-        model_name = random.choice(models)
-        
-        # Get a relevant sample prompt or generate one
-        if challenge_id in sample_prompts:
-            prompt = random.choice(sample_prompts[challenge_id])
-        else:
-            prompt = f"Create a response for the {challenge_id} challenge following all the specified requirements and constraints."
-        
-        # Generate realistic scores with some variation
-        base_score = random.uniform(65, 95)
-        semantic_accuracy = max(0, min(100, base_score + random.uniform(-10, 10)))
-        task_compliance = max(0, min(100, base_score + random.uniform(-15, 15)))
-        style_match = max(0, min(100, base_score + random.uniform(-10, 10)))
-        efficiency_score = max(0, min(100, base_score + random.uniform(-20, 20)))
-        
-        total_score = (
-            semantic_accuracy * 0.4 + 
-            task_compliance * 0.3 + 
-            style_match * 0.2 + 
-            efficiency_score * 0.1
-        )
-        
-        ai_response = f"This is a sample AI response generated for the {challenge_id} challenge using {model_name}. The response follows the prompt instructions and meets the specified requirements for style, tone, and content structure."
-        
-        # Random time taken based on challenge difficulty
-        time_taken = random.randint(60, 400)
-        
-        # Random feedback selection
-        feedback_items = random.sample(sample_feedback, random.randint(2, 4))
-        
-        # Create timestamp within last 30 days
-        days_ago = random.randint(0, 30)
-        created_at = datetime.now() - timedelta(days=days_ago, hours=random.randint(0, 23))
-        
-        cursor.execute('''
-            INSERT INTO attempts (
-                user_id, challenge_id, prompt, model_name, ai_response,
-                semantic_accuracy, task_compliance, style_match, efficiency_score, total_score,
-                time_taken, feedback, detailed_metrics, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    load_started = time.perf_counter()
+    attempt_count = bulk_insert(conn, '''
+        INSERT INTO attempts (
             user_id, challenge_id, prompt, model_name, ai_response,
             semantic_accuracy, task_compliance, style_match, efficiency_score, total_score,
-            time_taken, json.dumps(feedback_items),
-            json.dumps({
-                "response_length": random.randint(50, 200), 
-                "prompt_length": len(prompt.split()),
-                "readability_grade": random.uniform(6.0, 12.0)
-            }),
-            created_at
-        ))
-        
-        attempts_generated += 1
-    
-    print(f"✅ Generated {attempts_generated} realistic sample attempts")
-    
-    # 🏆 Add sample achievements
-    achievements = [
-        ("first_attempt", "First Steps"),
-        ("perfect_score", "Perfectionist"),
-        ("speed_demon", "Speed Demon"),
-        ("consistency", "Consistency Master"),
-        ("multi_model", "Model Explorer")
-    ]
-    
-    # Award achievements to some users
-    for user_id in user_ids[:4]:  # First 4 users get achievements
-        for achievement_type, achievement_name in random.sample(achievements, random.randint(1, 3)):
-            days_ago = random.randint(1, 20)
-            earned_at = datetime.now() - timedelta(days=days_ago)
-            
-            cursor.execute('''
-                INSERT INTO achievements (user_id, achievement_type, achievement_name, earned_at)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, achievement_type, achievement_name, earned_at))
-    
-    print("✅ Added sample achievements")
-    
-    # 📊 Update user statistics
-    cursor.execute('''
-        UPDATE users SET 
-            challenges_completed = (
-                SELECT COUNT(DISTINCT challenge_id) 
-                FROM attempts 
-                WHERE attempts.user_id = users.id
-            ),
-            total_score = (
-                SELECT COALESCE(SUM(total_score), 0) 
-                FROM attempts 
-                WHERE attempts.user_id = users.id
-            )
-    ''')
+            time_taken, feedback, detailed_metrics, created_at,
+            metric_response_length, metric_prompt_length, metric_readability_grade
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', generate_attempts(rng, user_ids, challenge_list, attempts_per_user, days, user_stats,
+                         now or datetime.utcnow()))
+    load_seconds = time.perf_counter() - load_started
+    
+    print(f"✅ Generated {attempt_count:,} attempts in {load_seconds:.1f}s "
+          f"({attempt_count / max(load_seconds, 1e-9):,.0f} rows/s)")
+    
+    # 📊 Update user statistics (accumulated while generating, no re-scan of attempts)
+    bulk_insert(
+        conn,
+        "UPDATE users SET total_score = ?, challenges_completed = ? WHERE id = ?",
+        ((total, len(completed), user_id) for user_id, (total, completed) in user_stats.items())
+    )
     
     print("✅ Updated user statistics")
     
+    # 🗂️ Indexes last, in one sorted pass each
+    index_started = time.perf_counter()
+    create_indexes(cursor)
     conn.commit()
-    conn.close()
-    
-    # 📊 Display summary
-    conn = sqlite3.connect("prompt_trainer.db")
-    cursor = conn.cursor()
     
-    cursor.execute("SELECT COUNT(*) FROM users")
-    user_count = cursor.fetchone()[0]
+    print(f"✅ Built indexes in {time.perf_counter() - index_started:.1f}s")
     
-    cursor.execute("SELECT COUNT(*) FROM challenges")
-    challenge_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM attempts")
-    attempt_count = cursor.fetchone()[0]
+    restore_runtime_pragmas(conn)
+    conn.close()
     
-    cursor.execute("SELECT COUNT(*) FROM achievements")
-    achievement_count = cursor.fetchone()[0]
+    # 🏆 Achievements earned by the generated history, awarded by the API's own engine
+    achievement_totals = asyncio.run(award_sample_achievements(db_path))
     
-    conn.close()
+    print(f"✅ Awarded {achievement_totals['awarded']:,} achievements")
     
+    # 📊 Display summary
     print("\n" + "="*60)
     print("🎉 DATABASE SETUP COMPLETE!")
     print("="*60)
-    print(f"👥 Users created: {user_count}")
-    print(f"🎯 Challenges available: {challenge_count}")
-    print(f"📝 Sample attempts: {attempt_count}")
-    print(f"🏆 Achievements: {achievement_count}")
+    print(f"👥 Users created: {user_count:,}")
+    print(f"🎯 Challenges available: {len(challenge_list)}")
+    print(f"📝 Sample attempts: {attempt_count:,}")
+    print(f"🏆 Achievements: {achievement_totals['awarded']:,}")
+    print(f"⏱️ Total time: {time.perf_counter() - started:.1f}s")
     print("\n🔑 Demo Login Credentials:")
     print("Username: demo_user")
     print("Password: password123")
@@ -419,5 +583,64 @@ def setup_complete_database():
     print("\n🚀 Ready to start the application!")
     print("Run: uvicorn main:app --reload")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create the Prompt Engineering Trainer database")
+    parser.add_argument("--db", default=DATABASE_PATH, help="SQLite database file or postgresql:// URL")
+    parser.add_argument("--users", type=int, default=len(SAMPLE_USERS), help="Number of users")
+    parser.add_argument("--challenges", type=int, default=len(CHALLENGES), help="Number of challenges")
+    parser.add_argument("--attempts-per-user", type=float, default=10, help="Mean attempts per user")
+    parser.add_argument("--days", type=int, default=30, help="Spread attempts over this many past days")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for a reproducible dataset")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="UTC time the generated history ends at, e.g. 2026-01-31T12:00 (default: now)")
+    parser.add_argument("--prompt-index", default=os.getenv("PROMPT_INDEX_PATH"),
+                        help="Prompt index the API keeps for this database, deleted as stale (default: "
+                             "$PROMPT_INDEX_PATH, else prompt_index.npz next to a SQLite --db or, for "
+                             "PostgreSQL, in the current directory)")
+    return parser.parse_args()
+
+async def award_sample_achievements(db_path: str):
+    """Replay the generated attempts through the achievements engine"""
+    from storage import SQLiteStorage
+
+    storage = SQLiteStorage(db_path)
+    await storage.init_schema()
+    return await backfill_achievements(storage)
+
+async def load_into_postgres(sqlite_path: str, url: str):
+    """Copy a freshly generated SQLite database into PostgreSQL, replacing its contents"""
+    from storage import PostgresStorage
+
+    target = PostgresStorage(url, min_size=1, max_size=1)
+    await target.connect()
+    try:
+        await target.init_schema()
+        await target.import_sqlite(sqlite_path, replace=True)
+    finally:
+        await target.close()
+
+def setup_postgres_database(url: str, **options):
+    """Generate the dataset into a temporary SQLite file, then bulk-copy it into PostgreSQL"""
+    with tempfile.TemporaryDirectory(prefix="prompt_setup_") as workdir:
+        sqlite_path = os.path.join(workdir, "staging.db")
+        setup_complete_database(db_path=sqlite_path, **options)
+        print(f"🐘 Copying into {url.split('@')[-1]}...")
+        started = time.perf_counter()
+        asyncio.run(load_into_postgres(sqlite_path, url))
+        print(f"✅ PostgreSQL loaded in {time.perf_counter() - started:.1f}s")
+
 if __name__ == "__main__":
-    setup_complete_database()
+    args = parse_args()
+    options = dict(
+        users=args.users,
+        challenges=args.challenges,
+        attempts_per_user=args.attempts_per_user,
+        days=args.days,
+        seed=args.seed,
+        now=args.now
+    )
+    if args.db.startswith(("postgres://", "postgresql://")):
+        # The staging file is temporary: point the cleanup at the index the API would load
+        setup_postgres_database(args.db, prompt_index_path=args.prompt_index or PROMPT_INDEX_FILE, **options)
+    else:
+        setup_complete_database(db_path=args.db, prompt_index_path=args.prompt_index, **options)
@@ -0,0 +1,53 @@
+# export_attempts.py - Export attempts for offline analysis without copying the database
+# Streams the attempts table in CSV, NDJSON or Parquet through a read-only connection.
+#
+#   python export_attempts.py --format parquet --output attempts.parquet --since 2024-01-01
+#   python export_attempts.py --format ndjson --challenge-id creative_story > story.ndjson
+
+import argparse
+import sys
+
+from attempt_export import EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, export_attempts, parquet_available
+
+DATABASE_PATH = "prompt_trainer.db"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream the attempts table to CSV, NDJSON or Parquet")
+    parser.add_argument("--db", default=DATABASE_PATH, help="SQLite database file")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--output", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--challenge-id", default=None)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--model-name", default=None)
+    parser.add_argument("--since", default=None, help="Inclusive lower bound on created_at (ISO date/time)")
+    parser.add_argument("--until", default=None, help="Exclusive upper bound on created_at (ISO date/time)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.format == "parquet" and not parquet_available():
+        sys.exit("❌ Parquet export requires pyarrow (pip install pyarrow)")
+
+    filters = {
+        "challenge_id": args.challenge_id,
+        "user_id": args.user_id,
+        "model_name": args.model_name,
+        "since": args.since,
+        "until": args.until,
+    }
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    written = 0
+    try:
+        for data in export_attempts(args.db, args.format, filters, args.chunk_size):
+            out.write(data)
+            written += len(data)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    print(f"✅ Exported {written:,} bytes as {args.format}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# json_response.py - Fast JSON rendering for API responses
+# By default FastAPI walks every return value with jsonable_encoder (a recursive pure-Python
+# copy) and then calls json.dumps. Hot endpoints instead return a FastJSONResponse built
+# from plain dicts/lists or Pydantic models, which orjson renders to bytes in one call;
+# payloads that never change between catalog versions are rendered once and served as bytes.
+# Without orjson the stdlib json module produces the same output, only slower.
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles natively"""
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if hasattr(value, "tolist"):  # numpy scalars and arrays
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, matching Starlette's JSONResponse output"""
+    if isinstance(content, BaseModel):
+        content = content.dict()
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips jsonable_encoder; bytes content is sent as already rendered"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,77 @@
+# leaderboards.py - Time-windowed leaderboard buckets
+# Every original attempt upserts the user's best score for its challenge into three
+# buckets of the leaderboard_buckets table: "all", the UTC day ("day:2026-10-19") and
+# the ISO week ("week:2026-W42") it was scored in. A board is then a bounded index read
+# of one bucket instead of a GROUP BY over the attempts. Windows roll over because the
+# current bucket key is derived from the clock. Buckets older than
+# LEADERBOARD_BUCKETS_KEPT windows are deleted when a write opens a new day.
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple, Union
+
+LEADERBOARD_PERIODS = ["all", "week", "day"]
+LEADERBOARD_BUCKETS_KEPT = {"day": 2, "week": 2}   # the current and the previous window
+
+
+def as_datetime(moment: Union[str, date, datetime]) -> Union[date, datetime]:
+    """SQLite hands timestamps back as text"""
+    return datetime.fromisoformat(moment) if isinstance(moment, str) else moment
+
+
+def leaderboard_bucket(period: str, moment: Union[str, date, datetime]) -> str:
+    """Key of the bucket `moment` falls into for a period"""
+    if period == "all":
+        return "all"
+    moment = as_datetime(moment)
+    if period == "day":
+        return f"day:{moment:%Y-%m-%d}"
+    year, week, _ = moment.isocalendar()
+    return f"week:{year}-W{week:02d}"
+
+
+def attempt_buckets(moment: Union[str, datetime]) -> List[str]:
+    """Every bucket an attempt made at `moment` counts towards"""
+    return [leaderboard_bucket(period, moment) for period in LEADERBOARD_PERIODS]
+
+
+def oldest_kept_buckets(now: datetime) -> Dict[str, str]:
+    """period -> oldest bucket still kept; keys sort chronologically within a period"""
+    return {
+        "day": leaderboard_bucket("day", now - timedelta(days=LEADERBOARD_BUCKETS_KEPT["day"] - 1)),
+        "week": leaderboard_bucket("week", now - timedelta(weeks=LEADERBOARD_BUCKETS_KEPT["week"] - 1)),
+    }
+
+
+def windowed_since(now: datetime) -> datetime:
+    """Start of the oldest kept window: attempts before it only count towards "all" """
+    oldest_day = now - timedelta(days=LEADERBOARD_BUCKETS_KEPT["day"] - 1)
+    oldest_week = now - timedelta(weeks=LEADERBOARD_BUCKETS_KEPT["week"] - 1)
+    oldest_week -= timedelta(days=oldest_week.weekday())
+    return min(oldest_day, oldest_week).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate_windowed(rows: Iterable[Tuple[str, int, float, int, Union[str, datetime]]],
+                       now: datetime) -> List[tuple]:
+    """(challenge_id, bucket, user_id, best_score, best_time, achieved_at) rows of the kept day
+    and week buckets, from (challenge_id, user_id, total_score, time_taken, created_at)
+    attempts in id order"""
+    oldest = oldest_kept_buckets(now)
+    best: Dict[Tuple[str, str, int], list] = {}
+    kept_by_date: Dict[date, List[str]] = {}   # the buckets only change with the date
+    for challenge_id, user_id, score, time_taken, created_at in rows:
+        day = as_datetime(created_at).date()
+        kept = kept_by_date.get(day)
+        if kept is None:
+            kept = kept_by_date[day] = [
+                bucket for bucket in (leaderboard_bucket(period, day) for period in ("day", "week"))
+                if bucket >= oldest[bucket.split(":")[0]]
+            ]
+        for bucket in kept:
+            entry = best.get((challenge_id, bucket, user_id))
+            if entry is None:
+                best[(challenge_id, bucket, user_id)] = [score, time_taken, created_at]
+            else:
+                if score > entry[0]:
+                    entry[0], entry[2] = score, created_at
+                entry[1] = min(entry[1], time_taken)
+    return [(challenge_id, bucket, user_id, *entry) for (challenge_id, bucket, user_id), entry in best.items()]
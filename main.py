@@ -1,31 +1,164 @@
 # main.py - Complete FastAPI Backend for Prompt Engineering Trainer
 # This is the COMPLETE, PRODUCTION-READY backend that powers the app!
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
-import sqlite3
+from typing import List, Dict, Optional, Any, Sequence, Tuple
 import hashlib
+import base64
 import jwt
 import os
 from datetime import datetime, timedelta
 import asyncio
 import json
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import textstat
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
 import re
+import math
 from contextlib import asynccontextmanager
+from prompt_index import PromptIndex, normalize
+from result_cache import EvaluationCache, make_cache_key, challenge_fingerprint
+from attempt_export import EXPORT_FORMATS, parquet_available
+from storage import (
+    ATTEMPT_FIELDS, DEFAULT_ATTEMPT_FIELDS, DuplicateKeyError, create_storage
+)
+from shared_state import create_state_store
+from admission import AdmissionController, AdmissionRejected
+from json_response import FastJSONResponse, dumps
+from text_analysis import TextAnalysis
+from score_sketch import SCORE_RESOLUTION, ScoreSketch
+from leaderboards import LEADERBOARD_PERIODS, leaderboard_bucket
+from compression import CompressionMiddleware, encoded_response, precompress
+from maintenance import MaintenanceScheduler
+from profiling import ProfilerBusy, SamplingProfiler, SlowRequestLog, StageTimer, format_collapsed
+from traffic_capture import RecordingModelManager, TrafficCapture, TrafficCaptureMiddleware
 
 # 🔧 CONFIGURATION
-DATABASE_URL = "prompt_trainer.db"
+# SQLite file path, or a postgresql:// URL to share one database between workers/hosts
+DATABASE_URL = os.getenv("DATABASE_URL", "prompt_trainer.db")
+DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))   # PostgreSQL only
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-this")
 JWT_ALGORITHM = "HS256"
 
-# 🤖 Initialize ML models for evaluation
-sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+# Near-duplicate prompt detection
+PROMPT_INDEX_PATH = os.getenv("PROMPT_INDEX_PATH", "prompt_index.npz")
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.97"))
+DUPLICATE_SHORT_CIRCUIT = os.getenv("DUPLICATE_SHORT_CIRCUIT", "true").lower() == "true"
+PROMPT_INDEX_SAVE_EVERY = 500  # persist after this many new vectors
+# Fold in attempts indexed by other workers (0 disables; only useful with serve.py)
+PROMPT_INDEX_REFRESH_SECONDS = float(os.getenv("PROMPT_INDEX_REFRESH_SECONDS", "15"))
+
+# Evaluation result memoization. Bump EVALUATOR_VERSION whenever scoring changes; drop a
+# model from CACHEABLE_MODELS if its provider samples non-deterministically.
+EVALUATOR_VERSION = "1"
+CACHEABLE_MODELS = {name.strip() for name in os.getenv("CACHEABLE_MODELS", "openai,claude,gemini").split(",") if name.strip()}
+
+# Comma-separated usernames allowed to use the /api/admin endpoints
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+# Cross-worker state. serve.py exports the socket of its state store process; without it
+# (plain `uvicorn main:app`) the state stays in this process.
+STATE_STORE_SOCKET = os.getenv("STATE_STORE_SOCKET")
+STATE_STORE_AUTHKEY = os.getenv("STATE_STORE_AUTHKEY", "")
+LEADERBOARD_CACHE_SECONDS = float(os.getenv("LEADERBOARD_CACHE_SECONDS", "30"))
+LEADERBOARD_CACHE_MAX_LIMIT = 100   # larger boards are always read from the database
+# Score distribution sketches are saved to the database this often (0 saves only on shutdown)
+SCORE_SKETCH_SAVE_SECONDS = float(os.getenv("SCORE_SKETCH_SAVE_SECONDS", "60"))
+
+# 🚦 /api/evaluate admission control. The token buckets (tokens per second, burst size;
+# rate 0 disables) are shared by all workers; the concurrency cap and its wait queue
+# apply to each worker separately.
+EVALUATE_USER_RATE = float(os.getenv("EVALUATE_USER_RATE", "0.5"))
+EVALUATE_USER_BURST = float(os.getenv("EVALUATE_USER_BURST", "10"))
+EVALUATE_MODEL_RATE = float(os.getenv("EVALUATE_MODEL_RATE", "20"))
+EVALUATE_MODEL_BURST = float(os.getenv("EVALUATE_MODEL_BURST", "40"))
+EVALUATE_MAX_CONCURRENCY = int(os.getenv("EVALUATE_MAX_CONCURRENCY", "8"))
+EVALUATE_MAX_QUEUE = int(os.getenv("EVALUATE_MAX_QUEUE", "32"))
+EVALUATE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("EVALUATE_QUEUE_TIMEOUT_SECONDS", "5"))
+# /api/evaluate/compare stops waiting for a provider after this many seconds
+COMPARE_PROVIDER_TIMEOUT_SECONDS = float(os.getenv("COMPARE_PROVIDER_TIMEOUT_SECONDS", "15"))
+
+# 🧹 Background database upkeep (see maintenance.py): seconds between runs of each task
+# (0 disables it; backends skip the tasks they don't need)
+MAINTENANCE_INTERVALS = {
+    "optimize": float(os.getenv("MAINTENANCE_OPTIMIZE_SECONDS", "3600")),
+    "analyze": float(os.getenv("MAINTENANCE_ANALYZE_SECONDS", "86400")),
+    "checkpoint": float(os.getenv("MAINTENANCE_CHECKPOINT_SECONDS", "300")),
+    "incremental_vacuum": float(os.getenv("MAINTENANCE_VACUUM_SECONDS", "3600")),
+}
+MAINTENANCE_TICK_SECONDS = float(os.getenv("MAINTENANCE_TICK_SECONDS", "30"))   # 0 turns the scheduler off
+# Due tasks wait while this many evaluations are running or queued in the worker
+MAINTENANCE_BUSY_EVALUATIONS = int(os.getenv("MAINTENANCE_BUSY_EVALUATIONS", str(max(1, EVALUATE_MAX_CONCURRENCY // 2))))
+
+# 🔬 Diagnostics (see profiling.py): the slowest evaluations kept per worker, and the
+# limits of an on-demand sampling profile
+SLOW_EVALUATION_LOG_SIZE = int(os.getenv("SLOW_EVALUATION_LOG_SIZE", "50"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+
+# 📼 Opt-in traffic capture for replay (see traffic_capture.py): empty path disables it
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "")   # e.g. captures/traffic-{worker}.ndjson.gz
+TRAFFIC_CAPTURE_SAMPLE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", "1.0"))   # share of requests captured
+TRAFFIC_CAPTURE_TEXT = os.getenv("TRAFFIC_CAPTURE_TEXT", "scrub")   # "keep" stores prompts verbatim
+# Keys the user pseudonyms and scrubbed words; derived from JWT_SECRET unless set
+TRAFFIC_CAPTURE_KEY = os.getenv("TRAFFIC_CAPTURE_KEY", "")
+
+# 🗜️ gzip/brotli for responses of at least this many bytes (negative disables)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# 🎯 Semantic accuracy against several reference answers (the target plus a challenge's
+# reference_responses): "max" scores the closest valid answer, "mean" the average
+SEMANTIC_REFERENCE_AGGREGATE = os.getenv("SEMANTIC_REFERENCE_AGGREGATE", "max")
+REFERENCE_MATRIX_CACHE_SIZE = 1024   # distinct reference sets whose embeddings are kept
+
+# 🤖 ML models for evaluation
+class LazySentenceModel:
+    """SentenceTransformer that imports sentence-transformers (and torch) and loads its
+    weights on first use, so importing main stays cheap for tools and tests. The app
+    loads it during startup warm-up; serve.py loads it before forking the workers."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+    
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.name)
+        return self._model
+    
+    def encode(self, *args, **kwargs):
+        return self.load().encode(*args, **kwargs)
+
+sentence_model = LazySentenceModel('all-MiniLM-L6-v2')
+
+# Warm-up state reported by the readiness probe
+model_status = {"warmed_up": False, "warmup_seconds": None, "error": None}
+
+def warm_up_models():
+    """Load the models and run one encode so the first real evaluation doesn't pay for
+    lazy initialization"""
+    started = time.perf_counter()
+    try:
+        sentence_model.encode(["Warm-up sentence for the embedding model."])
+        TextAnalysis("Warm-up sentence for the hyphenation dictionary.")
+        model_status["warmed_up"] = True
+        model_status["error"] = None
+    except Exception as e:
+        model_status["error"] = str(e)
+    model_status["warmup_seconds"] = round(time.perf_counter() - started, 3)
 
 # 📊 Pydantic Models (API Data Structures)
 class UserCreate(BaseModel):
@@ -37,11 +170,19 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+MODEL_NAMES = ["openai", "claude", "gemini"]
+
 class PromptSubmission(BaseModel):
     challenge_id: str
     prompt: str
     model_name: str = Field(..., regex='^(openai|claude|gemini)$')
 
+class CompareSubmission(BaseModel):
+    challenge_id: str
+    prompt: str
+    model_names: List[str] = Field(default_factory=lambda: list(MODEL_NAMES), min_items=1)
+    timeout_seconds: Optional[float] = Field(None, gt=0)  # capped at COMPARE_PROVIDER_TIMEOUT_SECONDS
+
 class EvaluationResult(BaseModel):
     semantic_accuracy: float
     task_compliance: float
@@ -51,6 +192,26 @@ class EvaluationResult(BaseModel):
     feedback: List[str]
     detailed_metrics: Dict[str, Any]
     ai_response: str
+    achievements_unlocked: List[str] = []
+    percentile: Optional[float] = None        # % of the challenge's attempts that scored lower
+    model_percentile: Optional[float] = None  # the same, among attempts on this model
+
+class ModelEvaluation(BaseModel):
+    model_name: str
+    status: str                         # "ok", "cached" or "timeout"
+    latency_ms: Optional[float] = None  # time waiting for the provider
+    result: Optional[EvaluationResult] = None
+
+class ComparisonResult(BaseModel):
+    challenge_id: str
+    evaluations: List[ModelEvaluation]
+    best_model: Optional[str] = None
+    wall_ms: float
+
+class SimilarPromptQuery(BaseModel):
+    challenge_id: str
+    prompt: str
+    limit: int = Field(5, ge=1, le=50)
 
 class LeaderboardEntry(BaseModel):
     username: str
@@ -58,154 +219,129 @@ class LeaderboardEntry(BaseModel):
     time_taken: int
     timestamp: datetime
 
-# 🗄️ Database initialization
-def init_database():
-    """Initialize the complete database schema"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total_score REAL DEFAULT 0,
-            challenges_completed INTEGER DEFAULT 0
-        )
-    ''')
-    
-    # Challenges table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS challenges (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            difficulty TEXT NOT NULL,
-            target_response TEXT NOT NULL,
-            constraints TEXT NOT NULL,
-            time_limit INTEGER DEFAULT 300,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Attempts table - stores all user prompt submissions
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            challenge_id TEXT NOT NULL,
-            prompt TEXT NOT NULL,
-            model_name TEXT NOT NULL,
-            ai_response TEXT NOT NULL,
-            semantic_accuracy REAL NOT NULL,
-            task_compliance REAL NOT NULL,
-            style_match REAL NOT NULL,
-            efficiency_score REAL NOT NULL,
-            total_score REAL NOT NULL,
-            time_taken INTEGER NOT NULL,
-            feedback TEXT NOT NULL,
-            detailed_metrics TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (challenge_id) REFERENCES challenges (id)
-        )
-    ''')
-    
-    # Achievements table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS achievements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            achievement_type TEXT NOT NULL,
-            achievement_name TEXT NOT NULL,
-            earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    conn.commit()
-    
-    # 🎯 Insert sample challenges
-    sample_challenges = [
-        {
-            "id": "professional_email",
-            "title": "Professional Follow-up Email",
-            "description": "Create a prompt that generates a professional follow-up email after a business meeting. The email should be courteous, specific, and action-oriented.",
-            "difficulty": "beginner",
-            "target_response": "Thank you for taking the time to meet with me yesterday to discuss the marketing campaign proposal. I wanted to follow up on the key action items we identified: 1) Finalizing the budget allocation by Friday, 2) Scheduling the creative review session for next week, and 3) Confirming the launch timeline for Q2. I've attached the revised proposal document with the changes we discussed. Please let me know if you need any additional information or clarification on any of these points. I look forward to moving forward with this exciting project.",
-            "constraints": {
-                "max_words": 120,
-                "required_keywords": ["follow-up", "action items", "meeting"],
-                "target_style": {"formality": "formal", "tone": "professional"},
-                "format": "email"
-            },
-            "time_limit": 300
+# 🗄️ Storage backend (see storage.py)
+storage = create_storage(DATABASE_URL, DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE)
+state_store = create_state_store(STATE_STORE_SOCKET, STATE_STORE_AUTHKEY)
+
+# 🎯 Sample challenges
+SAMPLE_CHALLENGES = [
+    {
+        "id": "professional_email",
+        "title": "Professional Follow-up Email",
+        "description": "Create a prompt that generates a professional follow-up email after a business meeting. The email should be courteous, specific, and action-oriented.",
+        "difficulty": "beginner",
+        "target_response": "Thank you for taking the time to meet with me yesterday to discuss the marketing campaign proposal. I wanted to follow up on the key action items we identified: 1) Finalizing the budget allocation by Friday, 2) Scheduling the creative review session for next week, and 3) Confirming the launch timeline for Q2. I've attached the revised proposal document with the changes we discussed. Please let me know if you need any additional information or clarification on any of these points. I look forward to moving forward with this exciting project.",
+        "reference_responses": [
+            "Hi Jordan, thanks again for meeting with me this morning about the product launch. As promised, here is a quick summary of the action items from our meeting: I will send the updated vendor quotes by Wednesday, your team will review the draft timeline, and we will reconvene on Monday to confirm the final plan. Please let me know if I missed anything or if you have any questions in the meantime. Best regards.",
+        ],
+        "constraints": {
+            "max_words": 120,
+            "required_keywords": ["follow-up", "action items", "meeting"],
+            "target_style": {"formality": "formal", "tone": "professional"},
+            "format": "email"
         },
-        {
-            "id": "creative_story",
-            "title": "Mystery Story Opening",
-            "description": "Write a prompt for creating a compelling 150-word mystery story opening that hooks the reader and establishes intrigue.",
-            "difficulty": "intermediate",
-            "target_response": "The lighthouse keeper hadn't been seen for three days. Detective Sarah Martinez pulled her coat tighter as she approached the weathered door, the beam above cutting through the morning fog in mechanical sweeps. The townspeople whispered about strange lights and voices from the tower at night, but whispers were all they offered. As she knocked, the sound echoed hollow and wrong. No answer. The door creaked open at her touch, revealing a staircase that spiraled into darkness. On the first step lay a compass, its needle spinning wildly, pointing everywhere and nowhere at once. Sarah picked it up, noting the fresh scratches on its brass surface. Above, something metallic scraped against stone. She drew her flashlight and began to climb, each step creaking a warning she chose to ignore.",
-            "constraints": {
-                "max_words": 150,
-                "required_keywords": ["mystery", "opening", "detective"],
-                "target_style": {"tone": "suspenseful", "pacing": "engaging"},
-                "format": "narrative"
-            },
-            "time_limit": 600
+        "time_limit": 300
+    },
+    {
+        "id": "creative_story",
+        "title": "Mystery Story Opening",
+        "description": "Write a prompt for creating a compelling 150-word mystery story opening that hooks the reader and establishes intrigue.",
+        "difficulty": "intermediate",
+        "target_response": "The lighthouse keeper hadn't been seen for three days. Detective Sarah Martinez pulled her coat tighter as she approached the weathered door, the beam above cutting through the morning fog in mechanical sweeps. The townspeople whispered about strange lights and voices from the tower at night, but whispers were all they offered. As she knocked, the sound echoed hollow and wrong. No answer. The door creaked open at her touch, revealing a staircase that spiraled into darkness. On the first step lay a compass, its needle spinning wildly, pointing everywhere and nowhere at once. Sarah picked it up, noting the fresh scratches on its brass surface. Above, something metallic scraped against stone. She drew her flashlight and began to climb, each step creaking a warning she chose to ignore.",
+        "constraints": {
+            "max_words": 150,
+            "required_keywords": ["mystery", "opening", "detective"],
+            "target_style": {"tone": "suspenseful", "pacing": "engaging"},
+            "format": "narrative"
         },
-        {
-            "id": "technical_explanation",
-            "title": "Explain Blockchain Simply",
-            "description": "Create a prompt that explains blockchain technology to a 10-year-old using simple language and relatable analogies.",
-            "difficulty": "intermediate",
-            "target_response": "Imagine you and your friends have a special notebook that everyone shares to keep track of trading cards. Whenever someone gives someone else a card, you write it down in the notebook. But here's the cool part - everyone has their own copy of the same notebook, and they all have to match perfectly! If someone tries to cheat and change their notebook to say they have more cards, everyone else will notice because their notebooks are different. That's like blockchain - it's a way to keep track of things (like digital money) that's really hard to cheat on because lots of computers all have the same information. It's like having thousands of friends all watching to make sure nobody cheats with the notebook!",
-            "constraints": {
-                "max_words": 120,
-                "target_style": {"formality": "informal", "tone": "friendly", "reading_level": 5},
-                "required_keywords": ["simple", "easy", "notebook"],
-                "format": "explanation"
-            },
-            "time_limit": 450
+        "time_limit": 600
+    },
+    {
+        "id": "technical_explanation",
+        "title": "Explain Blockchain Simply",
+        "description": "Create a prompt that explains blockchain technology to a 10-year-old using simple language and relatable analogies.",
+        "difficulty": "intermediate",
+        "target_response": "Imagine you and your friends have a special notebook that everyone shares to keep track of trading cards. Whenever someone gives someone else a card, you write it down in the notebook. But here's the cool part - everyone has their own copy of the same notebook, and they all have to match perfectly! If someone tries to cheat and change their notebook to say they have more cards, everyone else will notice because their notebooks are different. That's like blockchain - it's a way to keep track of things (like digital money) that's really hard to cheat on because lots of computers all have the same information. It's like having thousands of friends all watching to make sure nobody cheats with the notebook!",
+        "reference_responses": [
+            "Think of blockchain like a class diary that every student keeps an exact copy of. Each time something happens, like someone trading a sticker, everyone writes the same line in their own diary. Because all the diaries have to match, nobody can secretly change what happened - the others would spot it right away. Computers do the same thing with digital money, which is why blockchain is so hard to cheat. It's a simple, easy way to keep everyone honest!",
+        ],
+        "constraints": {
+            "max_words": 120,
+            "target_style": {"formality": "informal", "tone": "friendly", "reading_level": 5},
+            "required_keywords": ["simple", "easy", "notebook"],
+            "format": "explanation"
         },
-        {
-            "id": "business_proposal",
-            "title": "Investment Proposal",
-            "description": "Craft a prompt for a persuasive business proposal presentation that includes key metrics and compelling arguments.",
-            "difficulty": "advanced",
-            "target_response": "Our innovative EcoPackaging solution addresses the critical $12B market gap in sustainable packaging, offering 40% cost reduction while achieving complete carbon neutrality by 2026. With strategic $2M Series A investment, we project $15M revenue by year three, capturing 5% market share in the rapidly growing $50B sustainable packaging industry. Our proprietary bio-degradable material technology, protected by three pending patents, provides significant competitive advantages over traditional plastic alternatives. The experienced founding team combines 50+ years industry expertise across packaging, sustainability, and supply chain management. Major retailers including Target and Whole Foods have expressed preliminary interest pending pilot program results. We seek strategic partnership to accelerate market penetration, scale manufacturing operations globally, and establish dominant position before larger competitors enter this emerging market segment.",
-            "constraints": {
-                "max_words": 200,
-                "required_keywords": ["investment", "revenue", "market share", "technology"],
-                "target_style": {"formality": "formal", "tone": "confident"},
-                "format": "business_proposal"
-            },
-            "time_limit": 900
-        }
-    ]
-    
-    for challenge in sample_challenges:
-        cursor.execute('''
-            INSERT OR IGNORE INTO challenges (id, title, description, difficulty, target_response, constraints, time_limit)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (challenge["id"], challenge["title"], challenge["description"], 
-              challenge["difficulty"], challenge["target_response"], 
-              json.dumps(challenge["constraints"]), challenge["time_limit"]))
-    
-    conn.commit()
-    conn.close()
+        "time_limit": 450
+    },
+    {
+        "id": "business_proposal",
+        "title": "Investment Proposal",
+        "description": "Craft a prompt for a persuasive business proposal presentation that includes key metrics and compelling arguments.",
+        "difficulty": "advanced",
+        "target_response": "Our innovative EcoPackaging solution addresses the critical $12B market gap in sustainable packaging, offering 40% cost reduction while achieving complete carbon neutrality by 2026. With strategic $2M Series A investment, we project $15M revenue by year three, capturing 5% market share in the rapidly growing $50B sustainable packaging industry. Our proprietary bio-degradable material technology, protected by three pending patents, provides significant competitive advantages over traditional plastic alternatives. The experienced founding team combines 50+ years industry expertise across packaging, sustainability, and supply chain management. Major retailers including Target and Whole Foods have expressed preliminary interest pending pilot program results. We seek strategic partnership to accelerate market penetration, scale manufacturing operations globally, and establish dominant position before larger competitors enter this emerging market segment.",
+        "constraints": {
+            "max_words": 200,
+            "required_keywords": ["investment", "revenue", "market share", "technology"],
+            "target_style": {"formality": "formal", "tone": "confident"},
+            "format": "business_proposal"
+        },
+        "time_limit": 900
+    }
+]
+
+async def init_database():
+    """Initialize the complete database schema and the sample challenges"""
+    await storage.connect()
+    await storage.init_schema()
+    await storage.add_challenges(SAMPLE_CHALLENGES)
+    # Every worker re-reads the challenge catalog after a (re)seed
+    state_store.incr("catalog_version")
+
+def use_storage(url: str):
+    """Point the API at another database (SQLite path or postgresql:// URL)"""
+    global storage
+    storage = create_storage(url, DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE)
+    evaluation_cache.storage = storage
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    init_database()
-    print("🚀 Database initialized and ready!")
+    await init_database()
+    print(f"🚀 Database initialized and ready! ({storage.backend})")
+    await asyncio.to_thread(warm_up_models)
+    print(f"🔥 Embedding model warmed up in {model_status['warmup_seconds']}s")
+    if model_status["warmed_up"]:
+        print(f"🎯 Reference embeddings ready for {await precompute_reference_embeddings()} challenges")
+    index_task = asyncio.create_task(sync_prompt_index())
+    sketch_task = asyncio.create_task(sync_score_sketches())
+    global maintenance_scheduler
+    maintenance_scheduler = MaintenanceScheduler(
+        storage, state_store, MAINTENANCE_INTERVALS, evaluation_traffic_high, MAINTENANCE_TICK_SECONDS
+    )
+    tasks = [index_task, sketch_task]
+    if MAINTENANCE_TICK_SECONDS > 0 and maintenance_scheduler.intervals:
+        tasks.append(asyncio.create_task(maintenance_scheduler.serve()))
+    global ai_manager
+    traffic_capture.start(os.getenv("WORKER_ID", "0"))
+    if traffic_capture.active:
+        ai_manager = RecordingModelManager(ai_manager, traffic_capture)
+        print(f"📼 Capturing traffic to {traffic_capture.file_path}")
     yield
     # Shutdown
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    maintenance_scheduler.close()
+    if isinstance(ai_manager, RecordingModelManager):
+        ai_manager = ai_manager.inner
+    traffic_capture.stop()
+    try:
+        await save_score_sketches()
+    except Exception as e:
+        print(f"⚠️ Saving score sketches failed: {e}")
+    if prompt_index_status["state"] == "ready" and prompt_index.pending_writes:
+        await asyncio.to_thread(prompt_index.save)
+    await storage.close()
     print("👋 Application shutting down...")
 
 # 🌐 FastAPI app initialization
@@ -213,7 +349,8 @@ app = FastAPI(
     title="Prompt Engineering Trainer API",
     description="Complete API for learning and practicing prompt engineering across multiple AI models",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # 🔐 CORS middleware for frontend integration
@@ -225,6 +362,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 📼 Traffic capture (inside compression, so response sizes are the uncompressed ones)
+traffic_capture = TrafficCapture(
+    TRAFFIC_CAPTURE_PATH,
+    TRAFFIC_CAPTURE_KEY.encode() or hashlib.sha256(f"traffic-capture:{JWT_SECRET}".encode()).digest(),
+    sample=TRAFFIC_CAPTURE_SAMPLE,
+    keep_text=TRAFFIC_CAPTURE_TEXT == "keep",
+)
+
+def capture_user_id(token: str) -> Optional[int]:
+    """User id of a bearer token, for the capture's pseudonyms (None if invalid)"""
+    try:
+        return verify_jwt_token(token).get("user_id")
+    except HTTPException:
+        return None
+
+app.add_middleware(TrafficCaptureMiddleware, capture=traffic_capture, identify=capture_user_id)
+
+# 🗜️ Response compression (outermost, so it also covers CORS and error responses)
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
 # 🔑 Security
 security = HTTPBearer()
 
@@ -262,6 +419,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     payload = verify_jwt_token(token)
     return payload
 
+async def get_admin_user(current_user = Depends(get_current_user)):
+    """Require an authenticated user listed in ADMIN_USERNAMES"""
+    if current_user.get("username") not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
 # 🤖 AI Model Manager (Mock implementation for demo)
 class AIModelManager:
     """Manages AI model integrations - OpenAI, Claude, Gemini"""
@@ -300,10 +463,14 @@ class PromptEvaluator:
     
     def __init__(self):
         self.sentence_model = sentence_model
+        self.reference_aggregate = np.mean if SEMANTIC_REFERENCE_AGGREGATE == "mean" else np.max
+        # (target, *reference_responses) -> unit-length embeddings, one row per reference
+        self._reference_matrices: "OrderedDict[Tuple[str, ...], np.ndarray]" = OrderedDict()
         print("🧠 Prompt Evaluator initialized with ML models")
     
     def evaluate_prompt(self, ai_response: str, target_response: str, 
-                       prompt: str, constraints: Dict[str, Any]) -> EvaluationResult:
+                       prompt: str, constraints: Dict[str, Any],
+                       reference_responses: Sequence[str] = ()) -> EvaluationResult:
         """
         Comprehensive prompt evaluation across 4 key metrics:
         1. Semantic Accuracy (40%) - How well AI output matches target meaning
@@ -311,17 +478,35 @@ class PromptEvaluator:
         3. Style Match (20%) - Appropriate tone and formality  
         4. Efficiency (10%) - Quality per unit of prompt length
         """
+        semantic_score = self._calculate_semantic_accuracy(ai_response, target_response, reference_responses)
+        return self._score_response(ai_response, semantic_score, target_response, TextAnalysis(prompt), constraints)
+    
+    def evaluate_responses(self, ai_responses: List[str], target_response: str,
+                           prompt: str, constraints: Dict[str, Any],
+                           reference_responses: Sequence[str] = ()) -> List[EvaluationResult]:
+        """Score several models' responses to one prompt, embedding them all in one batch"""
+        semantic_scores = self._calculate_semantic_accuracies(ai_responses, target_response, reference_responses)
+        prompt_text = TextAnalysis(prompt)
+        return [
+            self._score_response(ai_response, semantic_score, target_response, prompt_text, constraints)
+            for ai_response, semantic_score in zip(ai_responses, semantic_scores)
+        ]
+    
+    def _score_response(self, ai_response: str, semantic_score: float, target_response: str,
+                        prompt_text: TextAnalysis, constraints: Dict[str, Any]) -> EvaluationResult:
+        """Every metric except semantic accuracy, plus feedback and detailed metrics"""
+        # Tokenize and count the response once; every metric reads from it
+        response_text = TextAnalysis(ai_response)
         
         # Calculate individual scores
-        semantic_score = self._calculate_semantic_accuracy(ai_response, target_response)
-        compliance_score = self._calculate_task_compliance(ai_response, constraints)
-        style_score = self._calculate_style_match(ai_response, constraints.get('target_style', {}))
-        efficiency_score = self._calculate_efficiency(prompt, ai_response, semantic_score)
+        compliance_score = self._calculate_task_compliance(response_text, constraints)
+        style_score = self._calculate_style_match(response_text, constraints.get('target_style', {}))
+        efficiency_score = self._calculate_efficiency(prompt_text, semantic_score)
         
         # Generate actionable feedback
         feedback = self._generate_feedback(
             semantic_score, compliance_score, style_score, efficiency_score, 
-            prompt, ai_response, target_response
+            prompt_text.text, ai_response, target_response
         )
         
         # Calculate weighted total score
@@ -334,10 +519,10 @@ class PromptEvaluator:
         
         # Detailed metrics for analytics
         detailed_metrics = {
-            'response_length': len(ai_response.split()),
-            'prompt_length': len(prompt.split()),
-            'readability_grade': textstat.flesch_kincaid_grade(ai_response),
-            'complexity_score': self._calculate_complexity(prompt)
+            'response_length': response_text.word_count,
+            'prompt_length': prompt_text.word_count,
+            'readability_grade': response_text.flesch_kincaid_grade(),
+            'complexity_score': self._calculate_complexity(prompt_text)
         }
         
         return EvaluationResult(
@@ -351,22 +536,55 @@ class PromptEvaluator:
             ai_response=ai_response
         )
     
-    def _calculate_semantic_accuracy(self, ai_response: str, target_response: str) -> float:
-        """Use ML to calculate semantic similarity between responses"""
+    def reference_matrix(self, references: Tuple[str, ...]) -> np.ndarray:
+        """Normalized embeddings of a challenge's reference answers, encoded once per distinct set"""
+        matrix = self._reference_matrices.get(references)
+        if matrix is None:
+            matrix = normalize(self.sentence_model.encode(list(references)))
+            self._reference_matrices[references] = matrix
+            while len(self._reference_matrices) > REFERENCE_MATRIX_CACHE_SIZE:
+                self._reference_matrices.popitem(last=False)
+        else:
+            self._reference_matrices.move_to_end(references)
+        return matrix
+    
+    def precompute_references(self, reference_sets: List[Tuple[str, ...]]):
+        """Encode the reference matrices of many challenges in a single call"""
+        missing = list(dict.fromkeys(refs for refs in reference_sets if refs not in self._reference_matrices))
+        if not missing:
+            return
+        embeddings = normalize(self.sentence_model.encode([text for refs in missing for text in refs]))
+        offset = 0
+        for refs in missing:
+            self._reference_matrices[refs] = embeddings[offset:offset + len(refs)]
+            offset += len(refs)
+        while len(self._reference_matrices) > REFERENCE_MATRIX_CACHE_SIZE:
+            self._reference_matrices.popitem(last=False)
+    
+    def _calculate_semantic_accuracy(self, ai_response: str, target_response: str,
+                                     reference_responses: Sequence[str] = ()) -> float:
+        """Use ML to calculate semantic similarity between the response and the reference answers"""
+        return self._calculate_semantic_accuracies([ai_response], target_response, reference_responses)[0]
+    
+    def _calculate_semantic_accuracies(self, ai_responses: List[str], target_response: str,
+                                       reference_responses: Sequence[str] = ()) -> List[float]:
+        """Semantic accuracy of several responses: one encode of the responses, then a single
+        (responses x references) matrix product against the cached reference embeddings"""
         try:
-            embeddings = self.sentence_model.encode([ai_response, target_response])
-            similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-            return max(0, min(100, similarity * 100))
+            references = self.reference_matrix((target_response, *reference_responses))
+            responses = normalize(self.sentence_model.encode(ai_responses))
+            similarities = self.reference_aggregate(responses @ references.T, axis=1)
+            return [max(0, min(100, similarity * 100)) for similarity in similarities]
         except Exception:
-            return 75.0  # Fallback score
+            return [75.0] * len(ai_responses)  # Fallback score
     
-    def _calculate_task_compliance(self, ai_response: str, constraints: Dict[str, Any]) -> float:
+    def _calculate_task_compliance(self, response: TextAnalysis, constraints: Dict[str, Any]) -> float:
         """Check if AI response meets all specified constraints"""
         score = 100.0
         
         # Word count constraint
         if 'max_words' in constraints:
-            word_count = len(ai_response.split())
+            word_count = response.word_count
             if word_count > constraints['max_words']:
                 penalty = min(30, (word_count - constraints['max_words']) * 2)
                 score -= penalty
@@ -374,20 +592,20 @@ class PromptEvaluator:
         # Required keywords
         if 'required_keywords' in constraints:
             for keyword in constraints['required_keywords']:
-                if keyword.lower() not in ai_response.lower():
+                if keyword.lower() not in response.lower:
                     score -= 15
         
         # Format requirements
         if 'format' in constraints:
             format_type = constraints['format']
-            if format_type == 'bullet_points' and not re.search(r'[•\-\*]\s', ai_response):
+            if format_type == 'bullet_points' and not re.search(r'[•\-\*]\s', response.text):
                 score -= 25
-            elif format_type == 'numbered_list' and not re.search(r'\d+\.\s', ai_response):
+            elif format_type == 'numbered_list' and not re.search(r'\d+\.\s', response.text):
                 score -= 25
         
         return max(0, score)
     
-    def _calculate_style_match(self, ai_response: str, target_style: Dict[str, Any]) -> float:
+    def _calculate_style_match(self, response: TextAnalysis, target_style: Dict[str, Any]) -> float:
         """Analyze if response matches target style and tone"""
         if not target_style:
             return 100.0
@@ -399,8 +617,8 @@ class PromptEvaluator:
             formal_indicators = ['please', 'kindly', 'respectfully', 'sincerely', 'therefore']
             informal_indicators = ['hey', 'gonna', 'wanna', 'cool', 'awesome', 'yeah']
             
-            formal_count = sum(1 for word in formal_indicators if word in ai_response.lower())
-            informal_count = sum(1 for word in informal_indicators if word in ai_response.lower())
+            formal_count = sum(1 for word in formal_indicators if word in response.lower)
+            informal_count = sum(1 for word in informal_indicators if word in response.lower)
             
             if target_style['formality'] == 'formal' and informal_count > formal_count:
                 score -= 25
@@ -419,14 +637,14 @@ class PromptEvaluator:
             target_tone = target_style['tone']
             if target_tone in tone_keywords:
                 tone_words = tone_keywords[target_tone]
-                if not any(word in ai_response.lower() for word in tone_words):
+                if not any(word in response.lower for word in tone_words):
                     score -= 15
         
         return max(0, score)
     
-    def _calculate_efficiency(self, prompt: str, response: str, semantic_score: float) -> float:
+    def _calculate_efficiency(self, prompt: TextAnalysis, semantic_score: float) -> float:
         """Calculate prompt efficiency (quality per unit of prompt length)"""
-        prompt_length = len(prompt.split())
+        prompt_length = prompt.word_count
         response_quality = semantic_score / 100
         
         if prompt_length == 0:
@@ -436,13 +654,13 @@ class PromptEvaluator:
         base_efficiency = response_quality / max(prompt_length / 10, 1)
         return min(100, base_efficiency * 100)
     
-    def _calculate_complexity(self, prompt: str) -> float:
+    def _calculate_complexity(self, prompt: TextAnalysis) -> float:
         """Calculate prompt complexity score"""
         factors = [
-            len(prompt.split()),  # Word count
-            len(re.findall(r'[.!?]', prompt)),  # Sentence count
-            len(re.findall(r'[(){}[\]]', prompt)),  # Bracket count
-            len(re.findall(r'["\']', prompt)),  # Quote count
+            prompt.word_count,  # Word count
+            prompt.sentence_marks,  # Sentence count
+            prompt.brackets,  # Bracket count
+            prompt.quotes,  # Quote count
         ]
         return min(100, sum(factors) / 2)
     
@@ -487,43 +705,170 @@ class PromptEvaluator:
 
 evaluator = PromptEvaluator()
 
+async def precompute_reference_embeddings() -> int:
+    """Encode every challenge's reference answers before the first evaluation needs them"""
+    reference_sets = []
+    for summary in await storage.list_challenges():
+        scoring = await storage.get_challenge_scoring(summary["id"])
+        reference_sets.append((scoring[0], *json.loads(scoring[2])))
+    await asyncio.to_thread(evaluator.precompute_references, reference_sets)
+    return len(reference_sets)
+
+# 💾 Memoized evaluation results
+evaluation_cache = EvaluationCache(storage)
+
+# 🔁 Near-duplicate prompt index
+prompt_index = PromptIndex(PROMPT_INDEX_PATH)
+prompt_index_status = {"state": "not_loaded", "indexed_on_startup": 0, "saving": False}
+
+def embed_prompt(prompt: str):
+    """Embedding used for prompt similarity (same model as semantic scoring)"""
+    return sentence_model.encode([prompt])[0]
+
+async def catch_up_prompt_index(batch_size: int = 1024) -> int:
+    """Embed original attempts above the index watermark that this worker hasn't added yet"""
+    indexed = 0
+    async for rows in storage.iter_original_prompts(prompt_index.last_attempt_id, batch_size):
+        missing = [row for row in rows if row[0] not in prompt_index.recent_ids]
+        if missing:
+            vectors = await asyncio.to_thread(sentence_model.encode, [row[2] for row in missing])
+            by_challenge = {}
+            for row, vector in zip(missing, vectors):
+                if row[0] in prompt_index.recent_ids:
+                    continue  # added live while this batch was being embedded
+                ids, vecs = by_challenge.setdefault(row[1], ([], []))
+                ids.append(row[0])
+                vecs.append(vector)
+            for challenge_id, (ids, vecs) in by_challenge.items():
+                prompt_index.add(challenge_id, ids, vecs)
+                indexed += len(ids)
+        prompt_index.mark_synced(rows[-1][0])
+    return indexed
+
+async def sync_prompt_index(batch_size: int = 1024):
+    """Load the saved index, embed any attempts recorded since it was written, then keep
+    folding in attempts recorded by other workers"""
+    prompt_index_status["state"] = "loading"
+    try:
+        await asyncio.to_thread(prompt_index.load)
+        if prompt_index.last_attempt_id > await storage.max_attempt_id():
+            # The database was rebuilt underneath a saved index - start over
+            prompt_index.clear()
+        
+        prompt_index_status["state"] = "catching_up"
+        prompt_index_status["indexed_on_startup"] = await catch_up_prompt_index(batch_size)
+        
+        if prompt_index.pending_writes:
+            await asyncio.to_thread(prompt_index.save)
+        prompt_index_status["state"] = "ready"
+    except Exception as e:
+        prompt_index_status["state"] = f"error: {str(e)}"
+        return
+    
+    while PROMPT_INDEX_REFRESH_SECONDS > 0:
+        await asyncio.sleep(PROMPT_INDEX_REFRESH_SECONDS)
+        try:
+            await catch_up_prompt_index(batch_size)
+        except Exception as e:
+            print(f"⚠️ Prompt index refresh failed: {e}")
+
+def save_prompt_index_in_background():
+    """Persist the index off the event loop, at most one save at a time"""
+    if prompt_index_status["state"] != "ready" or prompt_index_status["saving"]:
+        return
+    prompt_index_status["saving"] = True
+    
+    def _save():
+        try:
+            prompt_index.save()
+        finally:
+            prompt_index_status["saving"] = False
+    
+    asyncio.get_running_loop().run_in_executor(None, _save)
+
+# 📈 Score distributions: sketches live in the state store, shared by all workers
+score_sketch_status = {"state": "not_loaded", "attempts_read": 0}
+
+async def build_score_sketches(batch_size: int = 10_000) -> Tuple[Dict[str, Dict[str, ScoreSketch]], int]:
+    """Sketches from the last saved snapshot plus every attempt recorded after it, and the
+    highest attempt id they include"""
+    sketches: Dict[str, Dict[str, ScoreSketch]] = {}
+    watermark = 0
+    for challenge_id, model_name, payload, last_attempt_id in await storage.load_score_sketches():
+        sketches.setdefault(challenge_id, {})[model_name] = ScoreSketch.from_payload(payload)
+        watermark = max(watermark, last_attempt_id)
+    if watermark > await storage.max_attempt_id():
+        # The database was rebuilt underneath the snapshot - start over
+        sketches, watermark = {}, 0
+    
+    async for rows in storage.iter_attempt_scores(watermark, batch_size):
+        for _, challenge_id, model_name, score in rows:
+            models = sketches.setdefault(challenge_id, {})
+            sketch = models.get(model_name)
+            if sketch is None:
+                sketch = models[model_name] = ScoreSketch()
+            sketch.add(score)
+        # Archived months are read before the hot table, so ids need not rise across batches
+        watermark = max(watermark, rows[-1][0])
+        score_sketch_status["attempts_read"] += len(rows)
+    return sketches, watermark
+
+async def save_score_sketches():
+    """Persist the sketches if they changed since any worker last saved them"""
+    taken = state_store.take_score_sketches()
+    if taken is None:
+        return
+    watermark, sketches = taken
+    await storage.save_score_sketches([
+        (challenge_id, model_name, sketch.to_payload(), watermark)
+        for challenge_id, models in sketches.items() for model_name, sketch in models.items()
+    ])
+
+async def sync_score_sketches():
+    """Load the sketches into the state store (the first worker to get there does it), then
+    save them periodically"""
+    score_sketch_status["state"] = "loading"
+    try:
+        if not state_store.score_sketches_ready():
+            sketches, watermark = await build_score_sketches()
+            state_store.load_score_sketches(sketches, watermark)
+        score_sketch_status["state"] = "ready"
+    except Exception as e:
+        score_sketch_status["state"] = f"error: {str(e)}"
+        return
+    
+    while SCORE_SKETCH_SAVE_SECONDS > 0:
+        await asyncio.sleep(SCORE_SKETCH_SAVE_SECONDS)
+        try:
+            await save_score_sketches()
+        except Exception as e:
+            print(f"⚠️ Saving score sketches failed: {e}")
+
+def find_near_duplicate(challenge_id: str, prompt_vector) -> Optional[Dict[str, Any]]:
+    """Closest earlier prompt for the challenge, if it is above the duplicate threshold"""
+    matches = prompt_index.search(challenge_id, prompt_vector, k=1)
+    if matches and matches[0][1] >= DUPLICATE_SIMILARITY_THRESHOLD:
+        return {"attempt_id": matches[0][0], "similarity": round(matches[0][1], 4)}
+    return None
+
 # 🌐 API ENDPOINTS
 
 # 🔐 Authentication Endpoints
 @app.post("/api/auth/register")
 async def register_user(user: UserCreate):
     """Register a new user account"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-            (user.username, user.email, hash_password(user.password))
-        )
-        conn.commit()
-        user_id = cursor.lastrowid
-        
-        token = create_jwt_token(user_id, user.username)
-        return {"token": token, "username": user.username, "user_id": user_id}
-        
-    except sqlite3.IntegrityError:
+        user_id = await storage.create_user(user.username, user.email, hash_password(user.password))
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Username or email already exists")
-    finally:
-        conn.close()
+    
+    token = create_jwt_token(user_id, user.username)
+    return {"token": token, "username": user.username, "user_id": user_id}
 
 @app.post("/api/auth/login")
 async def login_user(user: UserLogin):
     """User login endpoint"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT id, username, password_hash FROM users WHERE username = ?",
-        (user.username,)
-    )
-    result = cursor.fetchone()
-    conn.close()
+    result = await storage.get_user_credentials(user.username)
     
     if not result or not verify_password(user.password, result[2]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -532,60 +877,110 @@ async def login_user(user: UserLogin):
     return {"token": token, "username": result[1], "user_id": result[0]}
 
 # 🎯 Challenge Endpoints
+# Per-worker copy of the catalog, reloaded whenever the shared catalog_version moves.
+# The responses are rendered to JSON bytes and compressed once per version, not once per request.
+challenge_catalog = {"version": None, "list_payloads": {}, "detail_payloads": {}}
+challenge_catalog_lock = asyncio.Lock()   # one reload at a time; the rest wait for its result
+
+async def load_challenge_catalog() -> Dict[str, Any]:
+    """The cached catalog, re-read from the database if another process changed it"""
+    version = state_store.get("catalog_version", 0)
+    if challenge_catalog["version"] == version:
+        return challenge_catalog
+    async with challenge_catalog_lock:
+        if challenge_catalog["version"] == version:
+            return challenge_catalog
+        challenges = await storage.list_challenges()
+        list_payloads = {None: dumps(challenges)}
+        for difficulty in {c["difficulty"] for c in challenges}:
+            list_payloads[difficulty] = dumps([c for c in challenges if c["difficulty"] == difficulty])
+        detail_payloads = {}
+        for summary in challenges:
+            detail_payloads[summary["id"]] = dumps(await storage.get_challenge(summary["id"]))
+        # Max-level brotli takes a few ms per payload: keep it off the event loop
+        list_payloads, detail_payloads = await asyncio.to_thread(
+            lambda: [{key: precompress(body, COMPRESSION_MIN_SIZE) for key, body in payloads.items()}
+                     for payloads in (list_payloads, detail_payloads)]
+        )
+        challenge_catalog.update(version=version, list_payloads=list_payloads, detail_payloads=detail_payloads)
+    return challenge_catalog
+
 @app.get("/api/challenges")
-async def get_challenges(difficulty: Optional[str] = None):
+async def get_challenges(request: Request, difficulty: Optional[str] = None):
     """Get all available challenges, optionally filtered by difficulty"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    if difficulty:
-        cursor.execute(
-            "SELECT id, title, description, difficulty, time_limit FROM challenges WHERE difficulty = ?",
-            (difficulty,)
-        )
-    else:
-        cursor.execute(
-            "SELECT id, title, description, difficulty, time_limit FROM challenges"
-        )
-    
-    challenges = []
-    for row in cursor.fetchall():
-        challenges.append({
-            "id": row[0],
-            "title": row[1],
-            "description": row[2],
-            "difficulty": row[3],
-            "time_limit": row[4]
-        })
-    
-    conn.close()
-    return challenges
+    catalog = await load_challenge_catalog()
+    payload = catalog["list_payloads"].get(difficulty or None)
+    if not payload:
+        return FastJSONResponse([])
+    return encoded_response(request, payload)
 
 @app.get("/api/challenges/{challenge_id}")
-async def get_challenge(challenge_id: str):
+async def get_challenge(request: Request, challenge_id: str):
     """Get detailed information about a specific challenge"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT id, title, description, difficulty, target_response, constraints, time_limit FROM challenges WHERE id = ?",
-        (challenge_id,)
-    )
-    result = cursor.fetchone()
-    conn.close()
-    
-    if not result:
+    catalog = await load_challenge_catalog()
+    payload = catalog["detail_payloads"].get(challenge_id)
+    if not payload:
         raise HTTPException(status_code=404, detail="Challenge not found")
+    return encoded_response(request, payload)
+
+@app.get("/api/challenges/{challenge_id}/distribution")
+async def get_score_distribution(challenge_id: str, model_name: Optional[str] = None, bins: int = 20):
+    """Quantiles and a histogram of every score on a challenge (or on one model), served from
+    the score sketches without reading the attempts table"""
+    catalog = await load_challenge_catalog()
+    if challenge_id not in catalog["detail_payloads"]:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    if model_name is not None and model_name not in MODEL_NAMES:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {model_name}. Use any of: {', '.join(MODEL_NAMES)}")
     
-    return {
-        "id": result[0],
-        "title": result[1],
-        "description": result[2],
-        "difficulty": result[3],
-        "target_response": result[4],
-        "constraints": json.loads(result[5]),
-        "time_limit": result[6]
-    }
+    sketch = state_store.score_distribution(challenge_id, model_name)
+    if sketch is None:
+        raise HTTPException(status_code=503, detail="Score distributions are still loading", headers={"Retry-After": "5"})
+    return FastJSONResponse({
+        "challenge_id": challenge_id,
+        "model_name": model_name,
+        "attempts": sketch.count,
+        "resolution": SCORE_RESOLUTION,
+        "quantiles": sketch.quantiles(),
+        "histogram": sketch.histogram(max(1, min(bins, 100))),
+    })
+
+# 🚦 Admission control for the evaluation endpoint
+evaluate_admission = AdmissionController(
+    EVALUATE_MAX_CONCURRENCY, EVALUATE_MAX_QUEUE, EVALUATE_QUEUE_TIMEOUT_SECONDS
+)
+
+def evaluation_traffic_high() -> bool:
+    """Whether background maintenance should hold off"""
+    return evaluate_admission.active + evaluate_admission.waiting >= MAINTENANCE_BUSY_EVALUATIONS
+
+# 🧹 Database upkeep, created when the app starts (it runs against the storage in use then)
+maintenance_scheduler: Optional[MaintenanceScheduler] = None
+
+EVALUATE_RATE_LIMITS = {
+    "user": (EVALUATE_USER_RATE, EVALUATE_USER_BURST),
+    "model": (EVALUATE_MODEL_RATE, EVALUATE_MODEL_BURST),
+}
+
+def check_evaluate_rate_limits(user_id: int, model_names: List[str]):
+    """Take a token per evaluation from the user's bucket and one from each model's, or reject
+    with 429; the buckets are debited together, so a rejected request costs no tokens"""
+    checks = [("user", user_id, len(model_names))] + [("model", model_name, 1) for model_name in model_names]
+    limited = [(scope, key, cost) + EVALUATE_RATE_LIMITS[scope] for scope, key, cost in checks
+               if EVALUATE_RATE_LIMITS[scope][0] > 0]
+    if not limited:
+        return
+    waits = state_store.take_tokens([
+        (f"evaluate:{scope}:{key}", rate, burst, cost) for scope, key, cost, rate, burst in limited
+    ])
+    wait, scope = max(zip(waits, (check[0] for check in limited)))
+    if wait > 0:
+        state_store.incr(f"evaluate:rejected:{scope}")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for this {scope}, retry in {wait:.1f}s",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
 
 # 🧠 Core Evaluation Endpoint
 @app.post("/api/evaluate")
@@ -594,187 +989,409 @@ async def evaluate_prompt(submission: PromptSubmission, current_user = Depends(g
     🚀 MAIN FEATURE: Evaluate a user's prompt across 4 key metrics
     This is the core functionality that makes the app valuable!
     """
+    check_evaluate_rate_limits(current_user["user_id"], [submission.model_name])
+    timer = StageTimer()
+    timer.details.update(
+        challenge_id=submission.challenge_id, model_name=submission.model_name,
+        prompt_chars=len(submission.prompt), status=200
+    )
+    try:
+        async with evaluate_admission.slot():
+            timer.mark("admission")
+            return FastJSONResponse(await run_evaluation(submission, current_user, timer))
+    except AdmissionRejected as e:
+        timer.details["status"] = 503
+        raise HTTPException(
+            status_code=503,
+            detail=f"Evaluation capacity exhausted ({e.reason}), retry in {e.retry_after}s",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException as e:
+        timer.details["status"] = e.status_code
+        raise
+    except Exception:
+        timer.details["status"] = 500
+        raise
+    finally:
+        slow_evaluations.record(timer)
+
+async def run_evaluation(submission: PromptSubmission, current_user: Dict[str, Any],
+                         timer: Optional[StageTimer] = None) -> EvaluationResult:
+    """Score one submission and record the attempt; `timer` gets the duration of each stage"""
+    timer = timer or StageTimer()
     # Get challenge details
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
+    challenge = await storage.get_challenge_scoring(submission.challenge_id)
+    timer.mark("challenge")
     
-    cursor.execute(
-        "SELECT target_response, constraints FROM challenges WHERE id = ?",
-        (submission.challenge_id,)
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    
+    target_response = challenge[0]
+    constraints = json.loads(challenge[1])
+    reference_responses = json.loads(challenge[2])
+    
+    # 💾 Identical (challenge, model, prompt) submissions reuse the memoized result
+    cache_key = None
+    result = None
+    if submission.model_name in CACHEABLE_MODELS:
+        cache_key = make_cache_key(
+            submission.challenge_id, challenge_fingerprint(*challenge),
+            submission.model_name, submission.prompt, EVALUATOR_VERSION
+        )
+        cached = await evaluation_cache.get(cache_key)
+        if cached is not None:
+            result = EvaluationResult(**cached)
+            timer.details["outcome"] = "cached"
+        timer.mark("cache_lookup")
+    
+    # 🔁 Near-duplicate check against earlier prompts for this challenge
+    prompt_vector = embed_prompt(submission.prompt)
+    timer.mark("embed")
+    duplicate = find_near_duplicate(submission.challenge_id, prompt_vector)
+    timer.mark("near_duplicate")
+    
+    if result is None and duplicate and DUPLICATE_SHORT_CIRCUIT:
+        # Only a result from the same model answers this submission; otherwise score it afresh
+        stored = await storage.get_stored_result(duplicate["attempt_id"], submission.model_name)
+        if stored:
+            result = EvaluationResult(**stored)
+            timer.details["outcome"] = "near_duplicate"
+        timer.mark("stored_result")
+    
+    if result is None:
+        # 🤖 Get AI response from selected model
+        ai_response = await ai_manager.get_response(submission.prompt, submission.model_name)
+        timer.mark("provider")
+        
+        # 🧠 Evaluate the prompt using our advanced ML-powered system
+        result = evaluator.evaluate_prompt(
+            ai_response=ai_response,
+            target_response=target_response,
+            prompt=submission.prompt,
+            constraints=constraints,
+            reference_responses=reference_responses
+        )
+        timer.details["outcome"] = "evaluated"
+        timer.mark("scoring")
+        if cache_key is not None:
+            await evaluation_cache.put(cache_key, result.dict())
+            timer.mark("cache_store")
+    timer.details["response_chars"] = len(result.ai_response)
+    
+    if duplicate:
+        result.detailed_metrics["near_duplicate_of"] = duplicate["attempt_id"]
+        result.detailed_metrics["duplicate_similarity"] = duplicate["similarity"]
+    
+    # 💾 Save attempt and update user statistics and achievements in one transaction
+    attempt_id, result.achievements_unlocked = await storage.record_attempt(
+        current_user["user_id"], submission.challenge_id, submission.prompt, submission.model_name,
+        result.dict(), duplicate["attempt_id"] if duplicate else None
+    )
+    timer.mark("record")
+    
+    # 📈 Where the score falls among all attempts on the challenge, from the score sketches
+    [(result.percentile, result.model_percentile)] = state_store.add_scores(
+        submission.challenge_id, [(submission.model_name, attempt_id, result.total_score)]
     )
-    challenge = cursor.fetchone()
     
+    # Only original prompts go into the index and the leaderboards
+    if not duplicate:
+        state_store.invalidate_leaderboard(submission.challenge_id, result.total_score)
+        prompt_index.add(submission.challenge_id, attempt_id, prompt_vector)
+        if prompt_index.pending_writes >= PROMPT_INDEX_SAVE_EVERY:
+            save_prompt_index_in_background()
+    timer.mark("bookkeeping")
+    
+    return result
+
+# ⚖️ Multi-model comparison
+@app.post("/api/evaluate/compare")
+async def compare_models(submission: CompareSubmission, current_user = Depends(get_current_user)):
+    """Evaluate one prompt on several models at once: the providers are called concurrently,
+    the responses scored in one batch and all attempts recorded in one transaction"""
+    model_names = list(dict.fromkeys(submission.model_names))
+    unknown = [name for name in model_names if name not in MODEL_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown models: {', '.join(unknown)}. Use any of: {', '.join(MODEL_NAMES)}")
+    
+    check_evaluate_rate_limits(current_user["user_id"], model_names)
+    try:
+        async with evaluate_admission.slot():
+            return FastJSONResponse(await run_comparison(submission, model_names, current_user))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Evaluation capacity exhausted ({e.reason}), retry in {e.retry_after}s",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def fetch_model_response(prompt: str, model_name: str, timeout: float) -> Tuple[Optional[str], float]:
+    """The model's response, or None if it missed the deadline, and the seconds spent waiting"""
+    started = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(ai_manager.get_response(prompt, model_name), timeout)
+    except asyncio.TimeoutError:
+        response = None
+    return response, time.perf_counter() - started
+
+async def run_comparison(submission: CompareSubmission, model_names: List[str],
+                         current_user: Dict[str, Any]) -> ComparisonResult:
+    """Score one prompt on every requested model and record an attempt per answering model"""
+    started = time.perf_counter()
+    challenge = await storage.get_challenge_scoring(submission.challenge_id)
     if not challenge:
-        conn.close()
         raise HTTPException(status_code=404, detail="Challenge not found")
     
     target_response = challenge[0]
     constraints = json.loads(challenge[1])
+    reference_responses = json.loads(challenge[2])
     
-    # 🤖 Get AI response from selected model
-    ai_response = await ai_manager.get_response(submission.prompt, submission.model_name)
+    # 💾 Memoized results need no provider call
+    evaluations = {name: ModelEvaluation(model_name=name, status="timeout") for name in model_names}
+    cache_keys = {}
+    for name in model_names:
+        if name in CACHEABLE_MODELS:
+            cache_keys[name] = make_cache_key(
+                submission.challenge_id, challenge_fingerprint(*challenge),
+                name, submission.prompt, EVALUATOR_VERSION
+            )
+            cached = await evaluation_cache.get(cache_keys[name])
+            if cached is not None:
+                evaluations[name].status = "cached"
+                evaluations[name].result = EvaluationResult(**cached)
     
-    # 🧠 Evaluate the prompt using our advanced ML-powered system
-    result = evaluator.evaluate_prompt(
-        ai_response=ai_response,
-        target_response=target_response,
-        prompt=submission.prompt,
-        constraints=constraints
-    )
+    # 🔁 One near-duplicate check for the shared prompt. A stored result belongs to a single
+    # model, so unlike /api/evaluate it is never reused here.
+    prompt_vector = embed_prompt(submission.prompt)
+    duplicate = find_near_duplicate(submission.challenge_id, prompt_vector)
     
-    # 💾 Save attempt to database for analytics
-    cursor.execute('''
-        INSERT INTO attempts (
-            user_id, challenge_id, prompt, model_name, ai_response,
-            semantic_accuracy, task_compliance, style_match, efficiency_score, total_score,
-            time_taken, feedback, detailed_metrics
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        current_user["user_id"], submission.challenge_id, submission.prompt, submission.model_name,
-        ai_response, result.semantic_accuracy, result.task_compliance, result.style_match,
-        result.efficiency_score, result.total_score, 0, json.dumps(result.feedback),
-        json.dumps(result.detailed_metrics)
+    # 🤖 Fan out to the providers; wall time is the slowest one, capped by the deadline
+    timeout = min(submission.timeout_seconds or COMPARE_PROVIDER_TIMEOUT_SECONDS, COMPARE_PROVIDER_TIMEOUT_SECONDS)
+    pending = [name for name in model_names if evaluations[name].result is None]
+    responses = await asyncio.gather(*(
+        fetch_model_response(submission.prompt, name, timeout) for name in pending
     ))
+    answered = []
+    for name, (ai_response, waited) in zip(pending, responses):
+        evaluations[name].latency_ms = round(waited * 1000, 1)
+        if ai_response is not None:
+            answered.append((name, ai_response))
+    
+    # 🧠 Score every response with a single embedding batch
+    if answered:
+        results = evaluator.evaluate_responses(
+            [ai_response for _, ai_response in answered], target_response, submission.prompt, constraints,
+            reference_responses
+        )
+        for (name, _), result in zip(answered, results):
+            evaluations[name].status = "ok"
+            evaluations[name].result = result
+            if name in cache_keys:
+                await evaluation_cache.put(cache_keys[name], result.dict())
     
-    # 📊 Update user statistics
-    cursor.execute(
-        "UPDATE users SET challenges_completed = challenges_completed + 1, total_score = total_score + ? WHERE id = ?",
-        (result.total_score, current_user["user_id"])
+    scored = [name for name in model_names if evaluations[name].result is not None]
+    if not scored:
+        raise HTTPException(status_code=504, detail=f"No model answered within {timeout:g}s")
+    
+    if duplicate:
+        for name in scored:
+            evaluations[name].result.detailed_metrics["near_duplicate_of"] = duplicate["attempt_id"]
+            evaluations[name].result.detailed_metrics["duplicate_similarity"] = duplicate["similarity"]
+    
+    # 💾 One transaction for all attempts, their user statistics and achievements
+    recorded = await storage.record_attempts(
+        current_user["user_id"], submission.challenge_id, submission.prompt,
+        [(name, evaluations[name].result.dict(), duplicate["attempt_id"] if duplicate else None) for name in scored]
     )
+    ranks = state_store.add_scores(submission.challenge_id, [
+        (name, attempt_id, evaluations[name].result.total_score) for name, (attempt_id, _) in zip(scored, recorded)
+    ])
+    for name, (_, unlocked), (percentile, model_percentile) in zip(scored, recorded, ranks):
+        evaluations[name].result.achievements_unlocked = unlocked
+        evaluations[name].result.percentile = percentile
+        evaluations[name].result.model_percentile = model_percentile
     
-    conn.commit()
-    conn.close()
+    best_model = max(scored, key=lambda name: evaluations[name].result.total_score)
+    if not duplicate:
+        state_store.invalidate_leaderboard(submission.challenge_id, evaluations[best_model].result.total_score)
+        prompt_index.add(submission.challenge_id, [attempt_id for attempt_id, _ in recorded], [prompt_vector] * len(recorded))
+        if prompt_index.pending_writes >= PROMPT_INDEX_SAVE_EVERY:
+            save_prompt_index_in_background()
     
-    return result
+    return ComparisonResult(
+        challenge_id=submission.challenge_id,
+        evaluations=[evaluations[name] for name in model_names],
+        best_model=best_model,
+        wall_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+
+@app.post("/api/prompts/similar")
+async def find_similar_prompts(query: SimilarPromptQuery, current_user = Depends(get_current_user)):
+    """Find the most similar earlier prompts submitted for a challenge. Prompt text is only
+    returned for the caller's own attempts; other users' matches are anonymous."""
+    matches = prompt_index.search(query.challenge_id, embed_prompt(query.prompt), k=query.limit)
+    if not matches:
+        return []
+    
+    summaries = await storage.get_attempt_summaries([attempt_id for attempt_id, _ in matches])
+    
+    similar = []
+    for attempt_id, similarity in matches:
+        summary = summaries.get(attempt_id)
+        if summary:
+            own = summary.pop("user_id") == current_user["user_id"]
+            if not own:
+                del summary["prompt"]
+            similar.append({"attempt_id": attempt_id, **summary, "own": own, "similarity": round(similarity, 4)})
+    return FastJSONResponse(similar)
 
 # 🏆 Leaderboard Endpoints
 @app.get("/api/leaderboard/{challenge_id}")
-async def get_leaderboard(challenge_id: str, limit: int = 10):
-    """Get ranked leaderboard for a specific challenge"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT u.username, MAX(a.total_score) as best_score, MIN(a.time_taken) as best_time, a.created_at
-        FROM attempts a
-        JOIN users u ON a.user_id = u.id
-        WHERE a.challenge_id = ?
-        GROUP BY u.id, u.username
-        ORDER BY best_score DESC, best_time ASC
-        LIMIT ?
-    ''', (challenge_id, limit))
-    
-    leaderboard = []
-    for i, row in enumerate(cursor.fetchall(), 1):
-        leaderboard.append({
-            "rank": i,
-            "username": row[0],
-            "score": row[1],
-            "time_taken": row[2],
-            "timestamp": row[3]
-        })
-    
-    conn.close()
-    return leaderboard
+async def get_leaderboard(challenge_id: str, limit: int = 10, period: str = "all"):
+    """Get ranked leaderboard for a specific challenge: all-time, this UTC week or today"""
+    if period not in LEADERBOARD_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unknown period; choose from {', '.join(LEADERBOARD_PERIODS)}")
+    # Attempt timestamps are UTC, so the current window is too
+    bucket = leaderboard_bucket(period, datetime.utcnow())
+    if limit > LEADERBOARD_CACHE_MAX_LIMIT:
+        return FastJSONResponse(await storage.get_leaderboard(challenge_id, limit, bucket))
+    
+    leaderboard = state_store.get_leaderboard(challenge_id, limit, bucket)
+    if leaderboard is None:
+        leaderboard = await storage.get_leaderboard(challenge_id, limit, bucket)
+        state_store.put_leaderboard(challenge_id, limit, leaderboard, LEADERBOARD_CACHE_SECONDS, bucket)
+    return FastJSONResponse(leaderboard)
 
 # 📊 User Progress Endpoints
 @app.get("/api/user/progress")
 async def get_user_progress(current_user = Depends(get_current_user)):
     """Get comprehensive user progress and performance data"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
+    return FastJSONResponse(await storage.get_user_progress(current_user["user_id"]))
+
+def encode_attempt_cursor(created_at: Any, attempt_id: int) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of the last row on a page"""
+    raw = json.dumps([str(created_at), attempt_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_attempt_cursor(cursor_token: str):
+    try:
+        padded = cursor_token + "=" * (-len(cursor_token) % 4)
+        created_at, attempt_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), int(attempt_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/api/user/attempts")
+async def get_user_attempts(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    challenge_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """
+    Page through the user's attempt history, newest first.
+    Keyset pagination on (created_at, id): every page is a range read on
+    idx_attempts_user_created (or idx_attempts_user_challenge_created), however deep.
+    Pages that reach past the hot table continue into the archived months.
+    """
+    limit = max(1, min(limit, 100))
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_ATTEMPT_FIELDS
+    unknown = [f for f in requested if f not in ATTEMPT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
     
-    # Get user stats
-    cursor.execute(
-        "SELECT total_score, challenges_completed FROM users WHERE id = ?",
-        (current_user["user_id"],)
-    )
-    user_stats = cursor.fetchone()
-    
-    # Get recent attempts
-    cursor.execute('''
-        SELECT c.title, a.total_score, a.created_at
-        FROM attempts a
-        JOIN challenges c ON a.challenge_id = c.id
-        WHERE a.user_id = ?
-        ORDER BY a.created_at DESC
-        LIMIT 10
-    ''', (current_user["user_id"],))
-    
-    recent_attempts = []
-    for row in cursor.fetchall():
-        recent_attempts.append({
-            "challenge_title": row[0],
-            "score": row[1],
-            "timestamp": row[2]
-        })
-    
-    # Get achievements
-    cursor.execute(
-        "SELECT achievement_name, earned_at FROM achievements WHERE user_id = ?",
-        (current_user["user_id"],)
+    attempts, last_position = await storage.list_user_attempts(
+        current_user["user_id"], requested, limit,
+        challenge_id=challenge_id, model_name=model_name,
+        before=decode_attempt_cursor(cursor) if cursor else None
     )
-    
-    achievements = []
-    for row in cursor.fetchall():
-        achievements.append({
-            "name": row[0],
-            "earned_at": row[1]
-        })
-    
-    conn.close()
-    
-    return {
-        "total_score": user_stats[0] if user_stats else 0,
-        "challenges_completed": user_stats[1] if user_stats else 0,
-        "recent_attempts": recent_attempts,
-        "achievements": achievements
-    }
+    return FastJSONResponse({
+        "attempts": attempts,
+        "next_cursor": encode_attempt_cursor(*last_position) if last_position else None
+    })
 
 @app.get("/api/user/stats")
 async def get_user_stats(current_user = Depends(get_current_user)):
     """Get detailed user performance analytics"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    # Performance by difficulty
-    cursor.execute('''
-        SELECT c.difficulty, AVG(a.total_score) as avg_score, COUNT(*) as attempts
-        FROM attempts a
-        JOIN challenges c ON a.challenge_id = c.id
-        WHERE a.user_id = ?
-        GROUP BY c.difficulty
-    ''', (current_user["user_id"],))
-    
-    difficulty_stats = {}
-    for row in cursor.fetchall():
-        difficulty_stats[row[0]] = {
-            "avg_score": row[1],
-            "attempts": row[2]
-        }
-    
-    # Performance by model
-    cursor.execute('''
-        SELECT model_name, AVG(total_score) as avg_score, COUNT(*) as attempts
-        FROM attempts
-        WHERE user_id = ?
-        GROUP BY model_name
-    ''', (current_user["user_id"],))
-    
-    model_stats = {}
-    for row in cursor.fetchall():
-        model_stats[row[0]] = {
-            "avg_score": row[1],
-            "attempts": row[2]
-        }
+    return FastJSONResponse(await storage.get_user_stats(current_user["user_id"]))
+
+# 📦 Admin Export Endpoints
+@app.get("/api/admin/export/attempts")
+async def export_attempts_endpoint(
+    format: str = "csv",
+    challenge_id: Optional[str] = None,
+    user_id: Optional[int] = None,
+    model_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    admin_user = Depends(get_admin_user)
+):
+    """Stream attempts as CSV, NDJSON or Parquet using a read-only, chunked cursor"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
     
-    conn.close()
+    filters = {
+        "challenge_id": challenge_id,
+        "user_id": user_id,
+        "model_name": model_name,
+        "since": since,
+        "until": until
+    }
+    filename = f"attempts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
     
+    # A sync generator: Starlette pulls each chunk in its threadpool, off the event loop
+    return StreamingResponse(
+        storage.export_stream(format, filters),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# 🔬 Diagnostics (per worker: with serve.py each request reaches whichever worker accepts it)
+profiler = SamplingProfiler()
+slow_evaluations = SlowRequestLog(SLOW_EVALUATION_LOG_SIZE)
+
+@app.get("/api/admin/profile")
+async def profile_worker(seconds: float = 10.0, interval_ms: float = 10.0, admin_user = Depends(get_admin_user)):
+    """Sample this worker's stacks for `seconds`, then download them as collapsed stacks
+    (flamegraph.pl, speedscope, inferno)"""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS:g}")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    try:
+        # The sampler sleeps on a worker thread between samples; the event loop keeps serving
+        stacks, summary = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already being taken on this worker")
+    worker_id = os.getenv("WORKER_ID", "0")
+    filename = f"profile_worker{worker_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+    return PlainTextResponse(format_collapsed(stacks), headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Worker": worker_id,
+        **{f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in summary.items()},
+    })
+
+@app.get("/api/admin/slow-evaluations")
+async def list_slow_evaluations(limit: int = 50, admin_user = Depends(get_admin_user)):
+    """The slowest /api/evaluate requests this worker served, with per-stage timings (ms)"""
     return {
-        "difficulty_stats": difficulty_stats,
-        "model_stats": model_stats
+        "worker": {"id": os.getenv("WORKER_ID", "0"), "pid": os.getpid()},
+        "capacity": slow_evaluations.capacity,
+        "evaluations_seen": slow_evaluations.recorded,
+        "threshold_ms": round(slow_evaluations.threshold_ms(), 2),
+        "evaluations": slow_evaluations.slowest(max(1, limit)),
     }
 
+@app.delete("/api/admin/slow-evaluations")
+async def clear_slow_evaluations(admin_user = Depends(get_admin_user)):
+    """Start collecting the slowest evaluations afresh (e.g. after a deploy)"""
+    slow_evaluations.clear()
+    return {"status": "cleared"}
+
 # 🏠 Health Check Endpoint
 @app.get("/")
 async def root():
@@ -792,41 +1409,97 @@ async def root():
         ]
     }
 
+async def check_database() -> Dict[str, Any]:
+    """Cheap database probe: the row counters, read without scanning any table"""
+    started = time.perf_counter()
+    try:
+        counters = await storage.read_counters()
+        return {
+            "status": "healthy",
+            "backend": storage.backend,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "connections": storage.connection_info(),
+            **counters
+        }
+    except Exception as e:
+        return {"status": f"error: {str(e)}", "backend": storage.backend, "connections": storage.connection_info()}
+
+@app.get("/api/metrics")
+async def metrics():
+    """Load-shedding counters: evaluation admission (this worker) and rate limits (all workers),
+    plus the database maintenance runs"""
+    return {
+        "worker": {"id": os.getenv("WORKER_ID", "0"), "pid": os.getpid()},
+        "evaluate": {
+            "admission": evaluate_admission.snapshot(),
+            "rate_limits": {
+                "user": {
+                    "rate": EVALUATE_RATE_LIMITS["user"][0],
+                    "burst": EVALUATE_RATE_LIMITS["user"][1],
+                    "rejected": state_store.get("evaluate:rejected:user", 0),
+                    "active_buckets": state_store.count_buckets("evaluate:user:"),
+                },
+                "model": {
+                    "rate": EVALUATE_RATE_LIMITS["model"][0],
+                    "burst": EVALUATE_RATE_LIMITS["model"][1],
+                    "rejected": state_store.get("evaluate:rejected:model", 0),
+                    "tokens": {
+                        key.rsplit(":", 1)[1]: level
+                        for key, level in state_store.bucket_levels("evaluate:model:").items()
+                    },
+                },
+            },
+        },
+        "maintenance": maintenance_scheduler.snapshot() if maintenance_scheduler else None,
+        "traffic_capture": traffic_capture.snapshot() if traffic_capture.active else None,
+        "state_store": state_store.info(),
+    }
+
+@app.get("/api/health/live")
+async def liveness_check():
+    """Liveness probe - the process is up and serving requests, no I/O"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    """Readiness probe - database reachable and embedding model warmed up"""
+    database = await check_database()
+    ready = database["status"] == "healthy" and model_status["warmed_up"]
+    
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.now().isoformat(),
+        "database": database,
+        "ml_models": {
+            "sentence_transformer": "warmed_up" if model_status["warmed_up"] else "warming_up",
+            "warmup_seconds": model_status["warmup_seconds"],
+            "error": model_status["error"]
+        },
+        "prompt_index": {"state": prompt_index_status["state"], **prompt_index.stats()},
+        "score_sketches": score_sketch_status,
+        "evaluation_cache": evaluation_cache.snapshot(),
+        "worker": {"id": os.getenv("WORKER_ID", "0"), "pid": os.getpid()},
+        "state_store": state_store.info()
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
 @app.get("/api/health")
 async def health_check():
     """Detailed health check for monitoring"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    # Check database
-    try:
-        cursor.execute("SELECT COUNT(*) FROM users")
-        user_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM challenges")
-        challenge_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM attempts")
-        attempt_count = cursor.fetchone()[0]
-        
-        db_status = "healthy"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
-        user_count = challenge_count = attempt_count = 0
-    finally:
-        conn.close()
+    database = await check_database()
     
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "database": {
-            "status": db_status,
-            "users": user_count,
-            "challenges": challenge_count,
-            "attempts": attempt_count
+            "status": database["status"],
+            "users": database.get("users", 0),
+            "challenges": database.get("challenges", 0),
+            "attempts": database.get("attempts", 0)
         },
         "ml_models": {
-            "sentence_transformer": "loaded" if sentence_model else "error"
+            "sentence_transformer": "loaded" if getattr(sentence_model, "loaded", True) else "not_loaded",
+            "warmed_up": model_status["warmed_up"]
         }
     }
 
@@ -836,4 +1509,5 @@ if __name__ == "__main__":
     print("🎯 Starting Prompt Engineering Trainer API...")
     print("📚 API Documentation: http://localhost:8000/docs")
     print("🔗 Frontend should connect to: http://localhost:8000")
+    print("🏭 For production use `python serve.py` (pre-forked workers, shared state)")
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,132 @@
+# maintenance.py - Periodic database upkeep inside the API process
+# MaintenanceScheduler runs the storage backend's maintenance tasks (SQLite: PRAGMA optimize,
+# ANALYZE, WAL checkpoint and incremental vacuum; PostgreSQL: ANALYZE) each on its own
+# interval, started from the app lifespan:
+# - Low priority: runs happen one at a time on a dedicated thread whose OS scheduling
+#   priority is lowered (Linux), so evaluations keep the CPU.
+# - Load aware: a task that falls due while `busy()` reports evaluation traffic is
+#   deferred (re-checked every tick) and skipped if traffic stays high for a whole
+#   interval. Long tasks (incremental vacuum) also stop between steps when busy.
+# - One worker per run: the last run time and a short lease live in the state store, so
+#   pre-forked workers (serve.py) don't all run the same task.
+# Each run's duration and effect (e.g. WAL bytes truncated, pages freed) is kept for
+# /api/metrics.
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+LOW_PRIORITY_NICE = 10          # added to the maintenance thread's nice value
+LEASE_SECONDS = 600             # longest a run may hold a task before another worker may retry it
+FIRST_RUN_DELAY_SECONDS = 300   # tasks never seen before run this long after startup at the earliest
+
+
+def lower_thread_priority():
+    """Lower the calling thread's scheduling priority (Linux treats threads as processes)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), LOW_PRIORITY_NICE)
+    except (AttributeError, OSError):
+        pass   # not supported here: run at normal priority
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {"runs": 0, "deferred": 0, "skipped_busy": 0, "failures": 0, "total_seconds": 0.0}
+
+
+class MaintenanceScheduler:
+    """Runs storage.run_maintenance(task) every `intervals[task]` seconds (0 disables a task)"""
+
+    def __init__(self, storage, state_store, intervals: Dict[str, float], busy: Callable[[], bool],
+                 tick_seconds: float = 30.0):
+        self.storage = storage
+        self.state_store = state_store
+        self.intervals = {
+            task: seconds for task, seconds in intervals.items()
+            if seconds > 0 and task in storage.maintenance_tasks
+        }
+        self.busy = busy
+        self.tick_seconds = tick_seconds
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="maintenance",
+                                           initializer=lower_thread_priority)
+        self.stats: Dict[str, Dict[str, Any]] = {task: empty_stats() for task in self.intervals}
+
+    def _key(self, task: str) -> str:
+        return f"maintenance:{self.storage.backend}:{task}"
+
+    def due_tasks(self, now: float):
+        for task, interval in self.intervals.items():
+            last = self.state_store.get(self._key(task) + ":last")
+            if last is None:
+                # Nothing ran yet: start counting from now instead of running everything at boot
+                last = now - interval + min(interval, FIRST_RUN_DELAY_SECONDS)
+                self.state_store.set(self._key(task) + ":last", last)
+            if now >= last + interval:
+                yield task, interval, last
+
+    async def run_pending(self) -> int:
+        """Run every task that is due and not held back by traffic; returns how many ran"""
+        ran = 0
+        now = time.time()
+        for task, interval, last in list(self.due_tasks(now)):
+            if self.busy():
+                self.stats[task]["deferred"] += 1
+                if now >= last + 2 * interval:
+                    # Busy for a whole extra interval: give this run up
+                    self.stats[task]["skipped_busy"] += 1
+                    self.state_store.set(self._key(task) + ":last", now)
+                continue
+            if not self.state_store.claim(self._key(task) + ":lease", os.getpid(), LEASE_SECONDS):
+                continue   # another worker is running it
+            try:
+                await self.run(task)
+                ran += 1
+            finally:
+                self.state_store.set(self._key(task) + ":last", time.time())
+                self.state_store.delete(self._key(task) + ":lease")
+        return ran
+
+    async def run(self, task: str) -> Optional[Dict[str, Any]]:
+        """Run one task now, recording its duration and effect"""
+        stats = self.stats.setdefault(task, empty_stats())
+        started = time.perf_counter()
+        try:
+            effect = await self.storage.run_maintenance(task, self.busy, self.executor)
+        except Exception as e:
+            stats["failures"] += 1
+            stats["last_error"] = str(e)
+            print(f"⚠️ Maintenance task {task} failed: {e}")
+            return None
+        seconds = time.perf_counter() - started
+        stats["runs"] += 1
+        stats["total_seconds"] = round(stats["total_seconds"] + seconds, 3)
+        last_run = {"at": datetime.utcnow().isoformat(), "seconds": round(seconds, 3),
+                    "worker": os.getenv("WORKER_ID", "0"), **effect}
+        # Any worker's /api/metrics shows the latest run, whichever worker did it
+        self.state_store.set(self._key(task) + ":last_run", last_run)
+        return effect
+
+    async def serve(self):
+        """Check for due tasks every tick until cancelled"""
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.run_pending()
+            except Exception as e:
+                print(f"⚠️ Maintenance check failed: {e}")
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            task: {
+                "interval_seconds": interval,
+                **self.stats[task],
+                "last_run": self.state_store.get(self._key(task) + ":last_run"),
+            }
+            for task, interval in self.intervals.items()
+        }
@@ -0,0 +1,140 @@
+# migrate_compact_storage.py - Convert existing attempts to the compact storage format
+# Rewrites legacy rows in small batches (short write transactions, safe to run while the
+# API is serving) and reports how many bytes the converted columns and the file shrank by.
+#
+#   python migrate_compact_storage.py --db prompt_trainer.db --vacuum
+
+import argparse
+import os
+import sqlite3
+import time
+
+from compact_storage import (
+    FeedbackCodec, ensure_compact_schema, split_metrics, join_metrics, compress_text
+)
+
+DATABASE_PATH = "prompt_trainer.db"
+
+def column_bytes(cursor):
+    """Bytes used by the three bulky columns, summed over all attempts"""
+    cursor.execute('''
+        SELECT COUNT(*),
+               COALESCE(SUM(LENGTH(CAST(ai_response AS BLOB))), 0),
+               COALESCE(SUM(LENGTH(CAST(feedback AS BLOB))), 0),
+               COALESCE(SUM(LENGTH(CAST(detailed_metrics AS BLOB))), 0)
+        FROM attempts
+    ''')
+    rows, response_bytes, feedback_bytes, metrics_bytes = cursor.fetchone()
+    return {
+        "rows": rows,
+        "ai_response": response_bytes,
+        "feedback": feedback_bytes,
+        "detailed_metrics": metrics_bytes,
+    }
+
+def file_bytes(db_path: str) -> int:
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+def convert_row(row, codec: FeedbackCodec):
+    """Compact values for one legacy row, or None if it is already compact"""
+    attempt_id, ai_response, feedback, detailed_metrics = row[:4]
+    typed = row[4:]
+    legacy_feedback = feedback.startswith("[") if feedback else False
+    legacy_metrics = bool(detailed_metrics) and all(value is None for value in typed)
+    compressible = isinstance(ai_response, str) and compress_text(ai_response) is not ai_response
+    if not (legacy_feedback or legacy_metrics or compressible):
+        return None
+
+    new_feedback = codec.encode(codec.decode(feedback)) if legacy_feedback else feedback
+    if legacy_metrics:
+        new_typed, new_extras = split_metrics(join_metrics(typed, detailed_metrics))
+    else:
+        new_typed, new_extras = tuple(typed), detailed_metrics
+    new_response = compress_text(ai_response) if compressible else ai_response
+    return (new_response, new_feedback, new_extras, *new_typed, attempt_id)
+
+def migrate(db_path: str, batch_size: int):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_compact_schema(cursor)
+    conn.commit()
+
+    codec = FeedbackCodec(db_path)
+    last_id = 0
+    converted = 0
+    while True:
+        cursor.execute('''
+            SELECT id, ai_response, feedback, detailed_metrics,
+                   metric_response_length, metric_prompt_length, metric_readability_grade, metric_complexity_score
+            FROM attempts WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        # Encode first: new feedback messages are committed on the codec's own connection,
+        # which must happen before this connection opens its write transaction
+        updates = [update for update in (convert_row(row, codec) for row in rows) if update]
+        if updates:
+            cursor.executemany('''
+                UPDATE attempts SET ai_response = ?, feedback = ?, detailed_metrics = ?,
+                    metric_response_length = ?, metric_prompt_length = ?,
+                    metric_readability_grade = ?, metric_complexity_score = ?
+                WHERE id = ?
+            ''', updates)
+            conn.commit()
+            converted += len(updates)
+            print(f"   ... converted {converted:,} rows (up to id {last_id})")
+
+    conn.close()
+    return converted
+
+def print_report(before, after, file_before, file_after):
+    print("\n" + "="*60)
+    print("📦 COMPACT STORAGE REPORT")
+    print("="*60)
+    print(f"{'column':20s} {'before':>14s} {'after':>14s} {'saved':>14s}")
+    for column in ("ai_response", "feedback", "detailed_metrics"):
+        saved = before[column] - after[column]
+        print(f"{column:20s} {before[column]:14,d} {after[column]:14,d} {saved:14,d}")
+    total_before = sum(before[c] for c in ("ai_response", "feedback", "detailed_metrics"))
+    total_after = sum(after[c] for c in ("ai_response", "feedback", "detailed_metrics"))
+    print(f"{'all columns':20s} {total_before:14,d} {total_after:14,d} {total_before - total_after:14,d}")
+    print(f"{'database file':20s} {file_before:14,d} {file_after:14,d} {file_before - file_after:14,d}")
+    if before["rows"]:
+        print(f"\n📝 {before['rows']:,} attempts, "
+              f"{(total_before - total_after) / before['rows']:.0f} bytes saved per row")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert attempts to compact storage and report savings")
+    parser.add_argument("--db", default=DATABASE_PATH, help="SQLite database file")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so the file actually shrinks")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print("🗜️ Migrating attempts to compact storage...")
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(args.db)
+    before = column_bytes(conn.cursor())
+    conn.close()
+    file_before = file_bytes(args.db)
+
+    converted = migrate(args.db, args.batch_size)
+
+    conn = sqlite3.connect(args.db)
+    if args.vacuum:
+        print("🧹 Running VACUUM...")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+    after = column_bytes(conn.cursor())
+    conn.close()
+
+    print(f"✅ Converted {converted:,} rows in {time.perf_counter() - started:.1f}s")
+    print_report(before, after, file_before, file_bytes(args.db))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# profiling.py - Production diagnostics for slow evaluations
+# - SamplingProfiler: a statistical sampler that, only while a profile is being taken,
+#   wakes every few milliseconds on its own thread, reads every thread's current stack
+#   (sys._current_frames) and counts identical stacks. The result is in the "collapsed
+#   stacks" format (`frame;frame;frame count` per line) that flamegraph.pl, speedscope
+#   and inferno read directly. Coroutines show up on the event loop thread's stack while
+#   they run; an idle loop shows as its selector wait.
+# - StageTimer / SlowRequestLog: always on. Each evaluation marks the end of every stage
+#   (perf_counter deltas) and the log keeps the N slowest in a bounded min-heap, so a
+#   p99 spike can be traced to the stage and input that caused it.
+# Both are per worker process: with serve.py, each worker profiles and records itself.
+
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ProfilerBusy(Exception):
+    """A profile is already being taken in this process"""
+
+
+def collapse_stack(frame, thread_name: str, labels: Dict[Any, str]) -> str:
+    """`thread;outermost function;...;innermost function` for one sampled frame.
+    `labels` caches the label of each code object across samples."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        names.append(label)
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples all thread stacks at a fixed interval; one profile at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.profiles_taken = 0
+
+    def profile(self, seconds: float, interval: float) -> Tuple[Counter, Dict[str, Any]]:
+        """Sample for `seconds` (blocking the calling thread) and return the stack counts
+        and a summary. Raises ProfilerBusy if another profile is running."""
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy()
+            self.running = True
+        try:
+            stacks: Counter = Counter()
+            labels: Dict[Any, str] = {}
+            own_id = threading.get_ident()
+            samples = 0
+            overhead = 0.0
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_sample = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_sample:
+                    time.sleep(next_sample - now)
+                sample_started = time.perf_counter()
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_id:
+                        stacks[collapse_stack(frame, names.get(thread_id, f"thread-{thread_id}"), labels)] += 1
+                samples += 1
+                overhead += time.perf_counter() - sample_started
+                next_sample += interval
+            elapsed = time.perf_counter() - started
+            self.profiles_taken += 1
+            return stacks, {
+                "seconds": round(elapsed, 3),
+                "interval_ms": round(interval * 1000, 3),
+                "samples": samples,
+                "distinct_stacks": len(stacks),
+                # Share of one core spent sampling
+                "overhead_percent": round(100 * overhead / elapsed, 2) if elapsed else 0.0,
+            }
+        finally:
+            self.running = False
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Collapsed stacks, heaviest first (the order doesn't matter to flame graph tools)"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StageTimer:
+    """Durations of consecutive stages of one request: mark(stage) ends the current one"""
+
+    __slots__ = ("started", "_last", "stages", "details")
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.details: Dict[str, Any] = {}   # input sizes and outcome, filled in along the way
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+class SlowRequestLog:
+    """The `capacity` slowest requests seen since the last clear()"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.recorded = 0
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []   # fastest kept entry on top
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def threshold_ms(self) -> float:
+        """A request must be slower than this to be kept"""
+        with self._lock:
+            return self._heap[0][0] if 0 < self.capacity <= len(self._heap) else 0.0
+
+    def record(self, timer: StageTimer):
+        total_ms = timer.total_ms()
+        self.recorded += 1
+        if self.capacity <= 0 or total_ms <= self.threshold_ms():
+            return   # the common case: cheaper than building the entry
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "total_ms": round(total_ms, 2),
+            "stages_ms": {stage: round(ms, 2) for stage, ms in timer.stages.items()},
+            **timer.details,
+        }
+        with self._lock:
+            item = (total_ms, next(self._order), entry)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, item)
+            elif total_ms > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [entry for _, _, entry in entries[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
@@ -0,0 +1,228 @@
+# prompt_index.py - Approximate nearest-neighbour index over submitted prompts
+# One partition per challenge. Small partitions are searched exactly with a single
+# matrix-vector product; once a partition grows past IVF_TRAIN_THRESHOLD it is split
+# into inverted lists by spherical k-means and only the closest lists are probed.
+# The index is updated in memory on every insert and persisted to a .npz file.
+# last_attempt_id is a watermark: every original attempt up to it is indexed. Attempts
+# added live above it are tracked in recent_ids, so when several workers share one
+# database a catch-up pass can fill in the ids the others inserted without re-adding ours.
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+IVF_TRAIN_THRESHOLD = 4096   # exact search below this many vectors per challenge
+IVF_RETRAIN_GROWTH = 4.0     # retrain centroids once a partition has grown this much
+IVF_NPROBE = 4               # inverted lists probed per query
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50_000
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so cosine similarity is a plain dot product"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        norm = np.linalg.norm(vectors)
+        return vectors / norm if norm else vectors
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _Partition:
+    """Vectors of one challenge plus an optional IVF layer"""
+
+    def __init__(self, dimensions: int, capacity: int = 64):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.attempt_ids = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(capacity, dtype=np.int32)
+        self.trained_at = 0
+        self._lists: Optional[List[np.ndarray]] = None
+
+    def _grow(self, needed: int):
+        capacity = len(self.attempt_ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+        self.attempt_ids = np.resize(self.attempt_ids, capacity)
+        self.assignments = np.resize(self.assignments, capacity)
+
+    def add(self, attempt_ids: np.ndarray, vectors: np.ndarray):
+        start = self.count
+        self._grow(start + len(attempt_ids))
+        self.vectors[start:start + len(attempt_ids)] = vectors
+        self.attempt_ids[start:start + len(attempt_ids)] = attempt_ids
+        self.count += len(attempt_ids)
+
+        if self.centroids is None:
+            if self.count >= IVF_TRAIN_THRESHOLD:
+                self.train()
+        elif self.count >= self.trained_at * IVF_RETRAIN_GROWTH:
+            self.train()
+        else:
+            self.assignments[start:self.count] = np.argmax(vectors @ self.centroids.T, axis=1)
+            self._lists = None
+
+    def train(self, seed: int = 0):
+        """Spherical k-means over (a sample of) the partition, then assign every vector"""
+        rng = np.random.default_rng(seed)
+        data = self.vectors[:self.count]
+        nlist = max(1, int(np.sqrt(self.count)))
+        sample = data if self.count <= KMEANS_SAMPLE else data[rng.choice(self.count, KMEANS_SAMPLE, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+
+        self.centroids = centroids
+        for start in range(0, self.count, 65536):
+            chunk = data[start:start + 65536]
+            self.assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        self.trained_at = self.count
+        self._lists = None
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        if self.centroids is None:
+            return None
+        if self._lists is None:
+            order = np.argsort(self.assignments[:self.count], kind="stable")
+            bounds = np.searchsorted(self.assignments[:self.count][order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self._lists[i] for i in probes])
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> List[Tuple[int, float]]:
+        if self.count == 0:
+            return []
+        rows = self._candidate_rows(query, nprobe)
+        if rows is None:
+            similarities = self.vectors[:self.count] @ query
+            rows = np.arange(self.count)
+        else:
+            similarities = self.vectors[rows] @ query
+        if len(rows) == 0:
+            return []
+        k = min(k, len(rows))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(int(self.attempt_ids[rows[i]]), float(similarities[i])) for i in top]
+
+
+class PromptIndex:
+    """Per-challenge ANN index mapping prompt embeddings to attempt ids"""
+
+    def __init__(self, path: Optional[str] = None, nprobe: int = IVF_NPROBE):
+        self.path = path
+        self.nprobe = nprobe
+        self.partitions: Dict[str, _Partition] = {}
+        self.last_attempt_id = 0
+        self.recent_ids = set()
+        self.pending_writes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(partition.count for partition in self.partitions.values())
+
+    def add(self, challenge_id: str, attempt_ids, vectors):
+        """Insert one or more (attempt_id, embedding) pairs into a challenge's partition"""
+        attempt_ids = np.atleast_1d(np.asarray(attempt_ids, dtype=np.int64))
+        vectors = normalize(np.atleast_2d(vectors))
+        with self._lock:
+            partition = self.partitions.get(challenge_id)
+            if partition is None:
+                partition = self.partitions[challenge_id] = _Partition(vectors.shape[1])
+            partition.add(attempt_ids, vectors)
+            self.recent_ids.update(attempt_ids[attempt_ids > self.last_attempt_id].tolist())
+            self.pending_writes += len(attempt_ids)
+
+    def mark_synced(self, up_to: int):
+        """Advance the watermark once every attempt up to `up_to` has been added"""
+        with self._lock:
+            self.last_attempt_id = max(self.last_attempt_id, up_to)
+            self.recent_ids = {i for i in self.recent_ids if i > self.last_attempt_id}
+
+    def clear(self):
+        with self._lock:
+            self.partitions.clear()
+            self.last_attempt_id = 0
+            self.recent_ids = set()
+
+    def search(self, challenge_id: str, vector, k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (attempt_id, cosine similarity) within one challenge"""
+        partition = self.partitions.get(challenge_id)
+        if partition is None:
+            return []
+        query = normalize(np.asarray(vector).reshape(-1))
+        with self._lock:
+            return partition.search(query, k, self.nprobe)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "vectors": len(self),
+            "challenges": len(self.partitions),
+            "ivf_partitions": sum(1 for p in self.partitions.values() if p.centroids is not None),
+            "last_attempt_id": self.last_attempt_id,
+            "recent": len(self.recent_ids),
+            "pending_writes": self.pending_writes,
+        }
+
+    def save(self, path: Optional[str] = None):
+        """Write the index atomically (temp file + rename)"""
+        path = path or self.path
+        with self._lock:
+            arrays = {"last_attempt_id": np.array([self.last_attempt_id], dtype=np.int64)}
+            for n, (challenge_id, partition) in enumerate(self.partitions.items()):
+                arrays[f"p{n}_challenge"] = np.array([challenge_id])
+                arrays[f"p{n}_vectors"] = partition.vectors[:partition.count]
+                arrays[f"p{n}_attempt_ids"] = partition.attempt_ids[:partition.count]
+                if partition.centroids is not None:
+                    arrays[f"p{n}_centroids"] = partition.centroids
+                    arrays[f"p{n}_trained_at"] = np.array([partition.trained_at], dtype=np.int64)
+            self.pending_writes = 0
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"   # workers may save concurrently
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Load a saved index; returns False when there is nothing to load"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        with np.load(path, allow_pickle=False) as data:
+            partitions = {}
+            n = 0
+            while f"p{n}_challenge" in data:
+                vectors = data[f"p{n}_vectors"]
+                partition = _Partition(vectors.shape[1], capacity=max(64, len(vectors)))
+                partition.vectors[:len(vectors)] = vectors
+                partition.attempt_ids[:len(vectors)] = data[f"p{n}_attempt_ids"]
+                partition.count = len(vectors)
+                if f"p{n}_centroids" in data:
+                    partition.centroids = data[f"p{n}_centroids"]
+                    partition.trained_at = int(data[f"p{n}_trained_at"][0])
+                    partition.assignments[:partition.count] = np.argmax(vectors @ partition.centroids.T, axis=1)
+                partitions[str(data[f"p{n}_challenge"][0])] = partition
+                n += 1
+            last_attempt_id = int(data["last_attempt_id"][0])
+        recent_ids = set()
+        for partition in partitions.values():
+            ids = partition.attempt_ids[:partition.count]
+            recent_ids.update(ids[ids > last_attempt_id].tolist())
+        with self._lock:
+            self.partitions = partitions
+            self.last_attempt_id = last_attempt_id
+            self.recent_ids = recent_ids
+            self.pending_writes = 0
+        return True
@@ -0,0 +1,79 @@
+# result_cache.py - Content-addressed store of evaluation results
+# Identical (challenge, model, prompt) submissions produce identical results while the
+# providers and the evaluator are deterministic, so results are memoized under a hash of
+# those inputs plus the evaluator version: an in-process LRU in front of the
+# evaluation_cache table of whichever storage backend is configured (see storage.py).
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_MEMORY_ENTRIES = 10_000
+
+
+def make_cache_key(challenge_id: str, challenge_fingerprint: str, model_name: str,
+                   prompt: str, evaluator_version: str) -> str:
+    """SHA-256 over every input that can change the result"""
+    digest = hashlib.sha256()
+    for part in (evaluator_version, challenge_id, challenge_fingerprint, model_name, prompt):
+        digest.update(part.encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def challenge_fingerprint(target_response: str, constraints_json: str, references_json: str = "[]") -> str:
+    """Short hash of a challenge's scoring inputs, so edited challenges miss the cache"""
+    scoring_inputs = f"{target_response}\x00{constraints_json}"
+    if references_json != "[]":  # challenges without alternatives keep their existing keys
+        scoring_inputs += f"\x00{references_json}"
+    return hashlib.sha256(scoring_inputs.encode()).hexdigest()[:16]
+
+
+class EvaluationCache:
+    """Two-tier (memory LRU, then database) result store keyed by make_cache_key()"""
+
+    def __init__(self, storage, max_memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.storage = storage
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+    def _remember(self, key: str, payload: str):
+        with self._lock:
+            self._memory[key] = payload
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result dict, or None on a miss in both tiers"""
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return json.loads(payload)
+
+        payload = await self.storage.cache_get(key)
+        if payload is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["db_hits"] += 1
+        self._remember(key, payload)
+        return json.loads(payload)
+
+    async def put(self, key: str, result: Dict[str, Any]):
+        payload = json.dumps(result)
+        self._remember(key, payload)
+        await self.storage.cache_put(key, payload)
+        self.stats["stores"] += 1
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "memory_entries": len(self._memory)}
@@ -0,0 +1,90 @@
+# score_sketch.py - Mergeable score distributions for percentile ranks and histograms
+# Every total_score lies in [0, 100], so a fixed-resolution histogram is a mergeable
+# quantile sketch with a known error: 0.1-point bins (1001 counters, 100.0 in a bin of its
+# own), O(1) updates, merging by addition, and ranks and quantiles exact to one bin. A
+# t-digest or KLL sketch of the same size is less accurate here; they pay off for unbounded
+# values. The shared state store (shared_state.py) keeps one sketch per (challenge, model);
+# a challenge's distribution is the merge of its model sketches.
+
+import json
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+SCORE_RESOLUTION = 0.1
+BIN_COUNT = int(round(100 / SCORE_RESOLUTION)) + 1
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def score_bin(score: float) -> int:
+    """Bin of a score; the epsilon keeps e.g. 82.3 (822.999... bins) out of the bin below"""
+    return min(BIN_COUNT - 1, max(0, int(score / SCORE_RESOLUTION + 1e-6)))
+
+
+class ScoreSketch:
+    """Counts of scores per 0.1-point bin"""
+
+    __slots__ = ("counts", "count")
+
+    def __init__(self, counts: Optional[np.ndarray] = None):
+        self.counts = np.zeros(BIN_COUNT, dtype=np.int64) if counts is None else counts
+        self.count = int(self.counts.sum())
+
+    def add(self, score: float):
+        self.counts[score_bin(score)] += 1
+        self.count += 1
+
+    def merge(self, other: "ScoreSketch") -> "ScoreSketch":
+        self.counts += other.counts
+        self.count += other.count
+        return self
+
+    def copy(self) -> "ScoreSketch":
+        return ScoreSketch(self.counts.copy())
+
+    @classmethod
+    def merged(cls, sketches: Iterable["ScoreSketch"]) -> "ScoreSketch":
+        total = cls()
+        for sketch in sketches:
+            total.merge(sketch)
+        return total
+
+    def percentile_rank(self, score: float) -> Optional[float]:
+        """Share of scores (in %) below `score`; scores within the same bin count as ties"""
+        if not self.count:
+            return None
+        below = int(self.counts[:score_bin(score)].sum())
+        return round(100.0 * below / self.count, 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Lowest bin edge with at least a `q` share of the scores at or below its bin"""
+        if not self.count:
+            return None
+        target = max(1, int(np.ceil(q * self.count)))
+        return round(int(np.searchsorted(np.cumsum(self.counts), target)) * SCORE_RESOLUTION, 1)
+
+    def quantiles(self) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100):d}": self.quantile(q) for q in QUANTILES}
+
+    def histogram(self, bins: int) -> List[Dict[str, float]]:
+        """`bins` equal-width buckets over 0-100; the last one includes 100"""
+        starts = [round(n * (BIN_COUNT - 1) / bins) for n in range(bins)]
+        counts = np.add.reduceat(self.counts, starts)
+        edges = starts + [BIN_COUNT - 1]
+        return [
+            {"min": round(edges[n] * SCORE_RESOLUTION, 1), "max": round(edges[n + 1] * SCORE_RESOLUTION, 1),
+             "count": int(counts[n])}
+            for n in range(bins)
+        ]
+
+    def to_payload(self) -> str:
+        """Sparse JSON form for the score_sketches table: [[bin, count], ...]"""
+        nonzero = np.flatnonzero(self.counts)
+        return json.dumps([[int(index), int(self.counts[index])] for index in nonzero])
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ScoreSketch":
+        counts = np.zeros(BIN_COUNT, dtype=np.int64)
+        for index, count in json.loads(payload):
+            counts[index] = count
+        return cls(counts)
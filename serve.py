@@ -0,0 +1,177 @@
+# serve.py - Production entry point: pre-forked uvicorn workers sharing one model copy
+# The parent loads main (and with it the SentenceTransformer weights) once, freezes the
+# GC so the loaded objects aren't written to again, then forks the workers: the weights
+# stay shared copy-on-write instead of being loaded once per worker. A small state store
+# process (shared_state.py) holds the cross-worker state on a Unix socket.
+#
+#   python serve.py --port 8000              # one worker per available CPU
+#   WEB_CONCURRENCY=4 python serve.py
+#
+# Use a postgresql:// DATABASE_URL when running many workers against a busy database.
+
+import argparse
+import gc
+import os
+import secrets
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+from shared_state import run_state_server
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects taskset/cgroup affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus(),
+                        help="Worker processes (default: $WEB_CONCURRENCY or the CPU count)")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def spawn_state_store(address: str, authkey: bytes) -> int:
+    """Fork the state store process and wait until its socket exists"""
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)   # the parent stops it after the workers
+        try:
+            run_state_server(address, authkey)
+        finally:
+            os._exit(1)
+    for _ in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.05)
+    return pid
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Listening socket created once in the parent and inherited by every worker"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(worker_id: int, app_module, sock: socket.socket, args):
+    """Body of a forked worker process; never returns"""
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    os.environ["WORKER_ID"] = str(worker_id)
+    try:
+        import torch
+        # Otherwise every worker starts one compute thread per CPU and they all contend
+        torch.set_num_threads(max(1, available_cpus() // args.workers))
+    except ImportError:
+        pass
+
+    config = uvicorn.Config(app_module.app, log_level=args.log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    code = 0
+    try:
+        server.run(sockets=[sock])
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    os._exit(code)
+
+
+def main():
+    args = parse_args()
+    print(f"🏭 Starting {args.workers} workers on {args.host}:{args.port}")
+
+    # The store is forked before main is imported so it doesn't carry a copy of the model
+    socket_dir = tempfile.mkdtemp(prefix="prompt-trainer-")   # created with mode 0700
+    address = os.path.join(socket_dir, "state.sock")
+    authkey = secrets.token_bytes(32)
+    store_pid = spawn_state_store(address, authkey)
+    os.environ["STATE_STORE_SOCKET"] = address
+    os.environ["STATE_STORE_AUTHKEY"] = authkey.hex()
+    sock = bind_socket(args.host, args.port, args.backlog)
+
+    started = time.perf_counter()
+    import main as app_module
+    app_module.sentence_model.load()   # main loads the weights lazily; here they must precede the fork
+    print(f"🤖 Application and models loaded in {time.perf_counter() - started:.1f}s (shared by all workers)")
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    shutting_down = False
+
+    def spawn(worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(worker_id, app_module, sock, args)
+        workers[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(args.workers):
+        spawn(worker_id)
+
+    try:
+        while workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid == store_pid:
+                if not shutting_down:
+                    # Workers serve from local state until they reconnect to the new store
+                    print(f"⚠️ State store (pid {pid}) exited with status {status}; restarting")
+                    store_pid = spawn_state_store(address, authkey)
+                continue
+            if pid not in workers:
+                continue
+            worker_id = workers.pop(pid)
+            if not shutting_down:
+                print(f"⚠️ Worker {worker_id} (pid {pid}) exited with status {status}; restarting")
+                time.sleep(RESPAWN_DELAY_SECONDS)
+                spawn(worker_id)
+    finally:
+        try:
+            os.kill(store_pid, signal.SIGTERM)
+            os.waitpid(store_pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        shutil.rmtree(socket_dir, ignore_errors=True)
+        sock.close()
+    print("👋 All workers stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+# shared_state.py - Hot state shared by all API worker processes
+# serve.py starts one store process listening on a Unix socket before it forks the
+# workers; each worker talks to it through a multiprocessing manager proxy. Every
+# operation runs atomically inside the store, so the workers agree on:
+# - cached leaderboards (dropped when a new score can change them)
+# - counters and versions (e.g. the challenge catalog version)
+# - leases, so only one worker runs a periodic job (see maintenance.py)
+# - token buckets for rate limiting
+# - score distribution sketches per (challenge, model), see score_sketch.py
+# Without STATE_STORE_SOCKET (a single `uvicorn main:app` process) the same API is
+# served by an in-process LocalStateStore.
+
+import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, List, Optional, Tuple
+
+from score_sketch import ScoreSketch
+
+RECONNECT_SECONDS = 5.0   # how long a worker stays on its local fallback after an error
+BUCKET_PRUNE_EVERY = 4096   # token bucket takes between sweeps for refilled buckets
+PENDING_SCORES_MAX = 100_000   # scores held back while the sketches are loaded from the database
+
+
+class LocalStateStore:
+    """Thread-safe in-process implementation of the store API"""
+
+    backend = "local"
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._leaderboards: Dict[str, Dict[Tuple[str, int], tuple]] = {}   # challenge -> (bucket, limit) -> board
+        self._buckets: Dict[str, List[float]] = {}
+        self._takes = 0
+        self._sketches: Optional[Dict[str, Dict[str, ScoreSketch]]] = None   # challenge -> model -> sketch; None until loaded
+        self._sketch_watermark = 0   # highest attempt id in the sketches
+        self._sketches_changed = False
+        self._pending_scores: List[Tuple[str, str, int, float]] = []
+        self._lock = threading.Lock()
+
+    # 🔑 Plain values
+    def _live(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._values
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._values[key] if self._live(key) else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._values[key] = value
+            if ttl is None:
+                self._expires.pop(key, None)
+            else:
+                self._expires[key] = time.monotonic() + ttl
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = (self._values[key] if self._live(key) else 0) + amount
+            self._values[key] = value
+            return value
+
+    def claim(self, key: str, value: Any, ttl: float) -> bool:
+        """Set `key` only if it is not already set: a lease only one worker can hold"""
+        with self._lock:
+            if self._live(key):
+                return False
+            self._values[key] = value
+            self._expires[key] = time.monotonic() + ttl
+            return True
+
+    # 🏆 Leaderboards
+    def get_leaderboard(self, challenge_id: str, limit: int, bucket: str = "all") -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._leaderboards.get(challenge_id, {}).get((bucket, limit))
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def put_leaderboard(self, challenge_id: str, limit: int, rows: List[Dict[str, Any]], ttl: float,
+                        bucket: str = "all"):
+        """Cache a board; the TTL bounds staleness from writes made while a worker was
+        cut off from the shared store and could not invalidate it"""
+        with self._lock:
+            self._leaderboards.setdefault(challenge_id, {})[(bucket, limit)] = (rows, time.monotonic() + ttl)
+
+    def invalidate_leaderboard(self, challenge_id: str, score: Optional[float] = None) -> int:
+        """Drop the cached boards a new score could enter (all of them when score is None),
+        in every bucket, along with expired ones (e.g. boards of windows that rolled over)"""
+        now = time.monotonic()
+        with self._lock:
+            boards = self._leaderboards.get(challenge_id)
+            if not boards:
+                return 0
+            stale = [
+                key for key, (rows, expires) in boards.items()
+                if score is None or expires <= now or len(rows) < key[1] or score >= rows[-1]["score"]
+            ]
+            for key in stale:
+                del boards[key]
+            return len(stale)
+
+    # 🪣 Token buckets
+    def take_token(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens from a bucket refilled at `rate`/s. Returns 0.0 when granted,
+        otherwise the seconds until enough tokens will be available (nothing is taken)."""
+        return self.take_tokens([(key, rate, capacity, cost)])[0]
+
+    def take_tokens(self, requests: List[Tuple[str, float, float, float]]) -> List[float]:
+        """Take tokens from several buckets, all or nothing; each request is (key, rate,
+        capacity, cost). Returns the seconds each bucket is short of its tokens: all 0.0 when
+        granted, otherwise nothing is taken from any bucket."""
+        now = time.monotonic()
+        with self._lock:
+            self._takes += 1
+            if self._takes % BUCKET_PRUNE_EVERY == 0:
+                self._prune_buckets(now)
+            needed: Dict[str, float] = {}
+            for key, rate, capacity, cost in requests:
+                needed[key] = needed.get(key, 0.0) + cost
+            waits = []
+            for key, rate, capacity, _ in requests:
+                tokens = self._refill(key, rate, capacity, now)[0]
+                short = needed[key] - tokens
+                waits.append(0.0 if short <= 0 else short / rate if rate > 0 else float("inf"))
+            if not any(waits):
+                for key, cost in needed.items():
+                    self._buckets[key][0] -= cost
+            return waits
+
+    def _refill(self, key: str, rate: float, capacity: float, now: float) -> List[float]:
+        """The bucket for `key` with the tokens accrued since its last take added"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now, rate, capacity]
+        else:
+            bucket[2], bucket[3] = rate, capacity
+        bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket
+
+    def _prune_buckets(self, now: float):
+        """Forget buckets that have refilled completely; a missing bucket starts full anyway"""
+        full = [
+            key for key, (tokens, last, rate, capacity) in self._buckets.items()
+            if tokens + (now - last) * rate >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    def bucket_levels(self, prefix: str = "") -> Dict[str, float]:
+        """Current token count of every bucket whose key starts with `prefix`, for metrics"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: round(min(capacity, tokens + (now - last) * rate), 3)
+                for key, (tokens, last, rate, capacity) in self._buckets.items() if key.startswith(prefix)
+            }
+
+    def count_buckets(self, prefix: str = "") -> int:
+        with self._lock:
+            return sum(1 for key in self._buckets if key.startswith(prefix))
+
+    # 📈 Score distributions
+    def score_sketches_ready(self) -> bool:
+        with self._lock:
+            return self._sketches is not None
+
+    def load_score_sketches(self, sketches: Dict[str, Dict[str, ScoreSketch]], watermark: int) -> bool:
+        """Install sketches built from the database up to attempt `watermark`, unless another
+        worker already did. Scores added meanwhile above the watermark are replayed on top."""
+        with self._lock:
+            if self._sketches is not None:
+                return False
+            self._sketches = sketches
+            self._sketch_watermark = watermark
+            for challenge_id, model_name, attempt_id, score in self._pending_scores:
+                if attempt_id > watermark:
+                    self._add_score(challenge_id, model_name, attempt_id, score)
+            self._pending_scores = []
+            self._sketches_changed = True
+            return True
+
+    def _add_score(self, challenge_id: str, model_name: str, attempt_id: int, score: float):
+        models = self._sketches.setdefault(challenge_id, {})
+        sketch = models.get(model_name)
+        if sketch is None:
+            sketch = models[model_name] = ScoreSketch()
+        sketch.add(score)
+        self._sketch_watermark = max(self._sketch_watermark, attempt_id)
+
+    def add_scores(self, challenge_id: str, scores: List[Tuple[str, int, float]]) -> List[Tuple[Optional[float], Optional[float]]]:
+        """Add (model_name, attempt_id, score) entries of one challenge. Returns, per entry, its
+        percentile rank among all of the challenge's attempts and among the same model's
+        (None while the sketches are still loading)."""
+        with self._lock:
+            if self._sketches is None:
+                room = PENDING_SCORES_MAX - len(self._pending_scores)
+                self._pending_scores.extend(
+                    (challenge_id, model_name, attempt_id, score) for model_name, attempt_id, score in scores[:room]
+                )
+                return [(None, None)] * len(scores)
+            for model_name, attempt_id, score in scores:
+                self._add_score(challenge_id, model_name, attempt_id, score)
+            self._sketches_changed = True
+            models = self._sketches[challenge_id]
+            challenge_sketch = ScoreSketch.merged(models.values())
+            return [
+                (challenge_sketch.percentile_rank(score), models[model_name].percentile_rank(score))
+                for model_name, _, score in scores
+            ]
+
+    def score_distribution(self, challenge_id: str, model_name: Optional[str] = None) -> Optional[ScoreSketch]:
+        """Merged sketch of the challenge (or of one model on it); None while loading"""
+        with self._lock:
+            if self._sketches is None:
+                return None
+            models = self._sketches.get(challenge_id, {})
+            return ScoreSketch.merged(
+                sketch for sketch_model, sketch in models.items() if model_name in (None, sketch_model)
+            )
+
+    def take_score_sketches(self) -> Optional[Tuple[int, Dict[str, Dict[str, ScoreSketch]]]]:
+        """(watermark, copies of all sketches) if they changed since the last take, else None;
+        with several workers only one of them gets each change to persist"""
+        with self._lock:
+            if self._sketches is None or not self._sketches_changed:
+                return None
+            self._sketches_changed = False
+            return self._sketch_watermark, {
+                challenge_id: {model_name: sketch.copy() for model_name, sketch in models.items()}
+                for challenge_id, models in self._sketches.items()
+            }
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "keys": len(self._values),
+                "leaderboards": sum(len(boards) for boards in self._leaderboards.values()),
+                "buckets": len(self._buckets),
+                "score_sketches": sum(map(len, self._sketches.values())) if self._sketches is not None else None,
+            }
+
+
+class StateStoreManager(BaseManager):
+    pass
+
+
+_server_store = LocalStateStore()
+StateStoreManager.register("store", callable=lambda: _server_store)
+
+
+def run_state_server(address: str, authkey: bytes):
+    """Serve one LocalStateStore on a Unix socket until the process is terminated"""
+    if os.path.exists(address):
+        os.remove(address)
+    manager = StateStoreManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    os.chmod(address, 0o600)
+    server.serve_forever()
+
+
+class SharedStateStore:
+    """Client of the store process; degrades to a local store while it is unreachable"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._proxy = None
+        self._fallback = LocalStateStore()
+        self._retry_at = 0.0
+        self.errors = 0
+
+    @property
+    def backend(self) -> str:
+        return "shared" if self._proxy is not None or time.monotonic() >= self._retry_at else "local-fallback"
+
+    def _call(self, method: str, *args, **kwargs):
+        if self._proxy is None and time.monotonic() >= self._retry_at:
+            try:
+                manager = StateStoreManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._proxy = manager.store()
+            except (OSError, EOFError) as e:
+                self._give_up(e)
+        if self._proxy is not None:
+            try:
+                return getattr(self._proxy, method)(*args, **kwargs)
+            except (OSError, EOFError) as e:
+                self._give_up(e)
+        return getattr(self._fallback, method)(*args, **kwargs)
+
+    def _give_up(self, error: Exception):
+        self.errors += 1
+        self._proxy = None
+        self._retry_at = time.monotonic() + RECONNECT_SECONDS
+        print(f"⚠️ Shared state store unavailable ({error}); using local state for {RECONNECT_SECONDS:.0f}s")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._call("get", key, default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        return self._call("set", key, value, ttl)
+
+    def delete(self, key: str):
+        return self._call("delete", key)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return self._call("incr", key, amount)
+
+    def claim(self, key: str, value: Any, ttl: float) -> bool:
+        return self._call("claim", key, value, ttl)
+
+    def get_leaderboard(self, challenge_id: str, limit: int, bucket: str = "all") -> Optional[List[Dict[str, Any]]]:
+        return self._call("get_leaderboard", challenge_id, limit, bucket)
+
+    def put_leaderboard(self, challenge_id: str, limit: int, rows: List[Dict[str, Any]], ttl: float,
+                        bucket: str = "all"):
+        return self._call("put_leaderboard", challenge_id, limit, rows, ttl, bucket)
+
+    def invalidate_leaderboard(self, challenge_id: str, score: Optional[float] = None) -> int:
+        return self._call("invalidate_leaderboard", challenge_id, score)
+
+    def take_token(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        return self._call("take_token", key, rate, capacity, cost)
+
+    def take_tokens(self, requests: List[Tuple[str, float, float, float]]) -> List[float]:
+        return self._call("take_tokens", requests)
+
+    def bucket_levels(self, prefix: str = "") -> Dict[str, float]:
+        return self._call("bucket_levels", prefix)
+
+    def count_buckets(self, prefix: str = "") -> int:
+        return self._call("count_buckets", prefix)
+
+    def score_sketches_ready(self) -> bool:
+        return self._call("score_sketches_ready")
+
+    def load_score_sketches(self, sketches: Dict[str, Dict[str, ScoreSketch]], watermark: int) -> bool:
+        return self._call("load_score_sketches", sketches, watermark)
+
+    def add_scores(self, challenge_id: str, scores: List[Tuple[str, int, float]]) -> List[Tuple[Optional[float], Optional[float]]]:
+        return self._call("add_scores", challenge_id, scores)
+
+    def score_distribution(self, challenge_id: str, model_name: Optional[str] = None) -> Optional[ScoreSketch]:
+        return self._call("score_distribution", challenge_id, model_name)
+
+    def take_score_sketches(self) -> Optional[Tuple[int, Dict[str, Dict[str, ScoreSketch]]]]:
+        return self._call("take_score_sketches")
+
+    def info(self) -> Dict[str, Any]:
+        return {**self._call("info"), "backend": self.backend, "errors": self.errors}
+
+
+def create_state_store(address: Optional[str] = None, authkey: Optional[str] = None):
+    """SharedStateStore when serve.py exported a socket address, else LocalStateStore"""
+    if address:
+        return SharedStateStore(address, bytes.fromhex(authkey or ""))
+    return LocalStateStore()
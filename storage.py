@@ -0,0 +1,1804 @@
+# storage.py - Repository layer between the API endpoints and the database
+# Endpoints call the async methods of a Storage object and never touch SQL directly.
+# - SQLiteStorage: the original single-file deployment (per-call connections, WAL mode,
+#   trigger-maintained row counters). One writer at a time, one host.
+# - PostgresStorage: the same operations on an asyncpg connection pool, so several
+#   uvicorn workers (on one host or many) can serve and write concurrently.
+# create_storage() picks the backend from DATABASE_URL: a postgresql:// URL or a file path.
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from attempt_export import (
+    BASE_COLUMNS, DEFAULT_CHUNK_SIZE, build_export_query, expand_row, export_attempts,
+    iter_async_chunks, stream_chunks
+)
+from compact_storage import (
+    FeedbackCodec, ensure_compact_schema, split_metrics, join_metrics, compress_text, decompress_text
+)
+from achievements import ACHIEVEMENT_TYPES, STATE_COLUMNS, AchievementState, apply_attempt, earned_mask
+from leaderboards import aggregate_windowed, attempt_buckets, leaderboard_bucket, oldest_kept_buckets, windowed_since
+from attempt_archive import (
+    DEFAULT_ARCHIVE_BATCH_SIZE, TIMESTAMP_FORMAT, archive_file_name, as_timestamp, attached, list_archives,
+    next_month, open_archive, resolve_archive_path
+)
+
+# Imported by PostgresStorage.connect(): only the PostgreSQL backend needs it, and it adds
+# ~30 ms to every `import storage` (the API, the CLIs)
+asyncpg = None
+
+# Tables whose row counts are reported by the health endpoints
+COUNTED_TABLES = ["users", "challenges", "attempts"]
+
+# Projectable attempt fields -> (SQL columns, decoder). id and created_at are always
+# returned because they form the keyset cursor of /api/user/attempts.
+ATTEMPT_FIELDS = {
+    "challenge_id": (["a.challenge_id"], lambda v, codec: v[0]),
+    "model_name": (["a.model_name"], lambda v, codec: v[0]),
+    "prompt": (["a.prompt"], lambda v, codec: v[0]),
+    "ai_response": (["a.ai_response"], lambda v, codec: decompress_text(v[0])),
+    "semantic_accuracy": (["a.semantic_accuracy"], lambda v, codec: v[0]),
+    "task_compliance": (["a.task_compliance"], lambda v, codec: v[0]),
+    "style_match": (["a.style_match"], lambda v, codec: v[0]),
+    "efficiency_score": (["a.efficiency_score"], lambda v, codec: v[0]),
+    "total_score": (["a.total_score"], lambda v, codec: v[0]),
+    "time_taken": (["a.time_taken"], lambda v, codec: v[0]),
+    "feedback": (["a.feedback"], lambda v, codec: codec.decode(v[0])),
+    "detailed_metrics": (
+        ["a.metric_response_length", "a.metric_prompt_length", "a.metric_readability_grade",
+         "a.metric_complexity_score", "a.detailed_metrics"],
+        lambda v, codec: join_metrics(v[:4], v[4])
+    ),
+    "duplicate_of": (["a.duplicate_of"], lambda v, codec: v[0]),
+}
+DEFAULT_ATTEMPT_FIELDS = ["challenge_id", "model_name", "total_score", "time_taken"]
+
+# Maintenance (see maintenance.py) waits at most this long for a lock, then gives way
+MAINTENANCE_LOCK_TIMEOUT = 1.0
+INCREMENTAL_VACUUM_STEP_PAGES = 2000   # pages released per step; traffic is re-checked in between
+
+# Folds a new best score into a leaderboard_buckets row (SQLite upsert)
+LEADERBOARD_MERGE = '''
+    ON CONFLICT (challenge_id, bucket, user_id) DO UPDATE SET
+        achieved_at = CASE WHEN excluded.best_score > best_score THEN excluded.achieved_at ELSE achieved_at END,
+        best_score = MAX(best_score, excluded.best_score),
+        best_time = MIN(best_time, excluded.best_time)
+'''
+
+STORED_RESULT_COLUMNS = '''
+    ai_response, semantic_accuracy, task_compliance, style_match, efficiency_score,
+    total_score, feedback, detailed_metrics,
+    metric_response_length, metric_prompt_length, metric_readability_grade, metric_complexity_score
+'''
+
+
+class DuplicateKeyError(Exception):
+    """A unique constraint (username, email) rejected the insert"""
+
+
+def stored_result(row, feedback_codec: FeedbackCodec) -> Dict[str, Any]:
+    """EvaluationResult fields from a row selected with STORED_RESULT_COLUMNS"""
+    return {
+        "semantic_accuracy": row[1],
+        "task_compliance": row[2],
+        "style_match": row[3],
+        "efficiency_score": row[4],
+        "total_score": row[5],
+        "feedback": feedback_codec.decode(row[6]),
+        "detailed_metrics": join_metrics(tuple(row[8:12]), row[7]),
+        "ai_response": decompress_text(row[0]),
+    }
+
+
+def decode_attempt_row(row, fields: List[str], feedback_codec: FeedbackCodec) -> Dict[str, Any]:
+    """One /api/user/attempts item from (id, created_at, *projected columns)"""
+    item = {"id": row[0], "timestamp": row[1]}
+    position = 2
+    for field in fields:
+        width = len(ATTEMPT_FIELDS[field][0])
+        item[field] = ATTEMPT_FIELDS[field][1](tuple(row[position:position + width]), feedback_codec)
+        position += width
+    return item
+
+
+def attempt_values(user_id: int, challenge_id: str, prompt: str, model_name: str,
+                   result: Dict[str, Any], feedback_codes: str, duplicate_of: Optional[int],
+                   ai_response) -> tuple:
+    """Column values for INSERT INTO attempts, in the order both backends use"""
+    typed_metrics, extra_metrics = split_metrics(result["detailed_metrics"])
+    return (
+        user_id, challenge_id, prompt, model_name, ai_response,
+        result["semantic_accuracy"], result["task_compliance"], result["style_match"],
+        result["efficiency_score"], result["total_score"], 0, feedback_codes,
+        extra_metrics, duplicate_of, *typed_metrics
+    )
+
+
+class Storage:
+    """Operations the API needs from its database; one subclass per backend"""
+
+    backend = "abstract"
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def connection_info(self) -> Any:
+        raise NotImplementedError
+
+    async def init_schema(self):
+        raise NotImplementedError
+
+    async def add_challenges(self, challenges: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    async def create_user(self, username: str, email: str, password_hash: str) -> int:
+        raise NotImplementedError
+
+    async def get_user_credentials(self, username: str) -> Optional[Tuple[int, str, str]]:
+        raise NotImplementedError
+
+    async def list_challenges(self, difficulty: Optional[str] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def get_challenge(self, challenge_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def get_challenge_scoring(self, challenge_id: str) -> Optional[Tuple[str, str, str]]:
+        """(target_response, constraints JSON, reference_responses JSON) of a challenge"""
+        raise NotImplementedError
+
+    async def get_stored_result(self, attempt_id: int, model_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The attempt's EvaluationResult fields; None if it doesn't exist or, given
+        `model_name`, was answered by another model"""
+        raise NotImplementedError
+
+    async def record_attempt(self, user_id: int, challenge_id: str, prompt: str, model_name: str,
+                             result: Dict[str, Any], duplicate_of: Optional[int] = None) -> Tuple[int, List[str]]:
+        """Insert the attempt, update the user's stats and achievements in one transaction.
+        Returns the attempt id and the names of any achievements it unlocked."""
+        recorded = await self.record_attempts(user_id, challenge_id, prompt, [(model_name, result, duplicate_of)])
+        return recorded[0]
+
+    async def record_attempts(self, user_id: int, challenge_id: str, prompt: str,
+                              attempts: List[Tuple[str, Dict[str, Any], Optional[int]]]) -> List[Tuple[int, List[str]]]:
+        """record_attempt for several (model_name, result, duplicate_of) of one prompt, in one
+        transaction; achievements are applied in list order"""
+        raise NotImplementedError
+
+    async def get_attempt_summaries(self, attempt_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """attempt id -> user_id, prompt, model_name, score and timestamp"""
+        raise NotImplementedError
+
+    async def get_leaderboard(self, challenge_id: str, limit: int, bucket: str = "all") -> List[Dict[str, Any]]:
+        """Top `limit` users of one leaderboard bucket (see leaderboards.py)"""
+        raise NotImplementedError
+
+    async def get_user_progress(self, user_id: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def list_user_attempts(self, user_id: int, fields: List[str], limit: int,
+                                 challenge_id: Optional[str] = None, model_name: Optional[str] = None,
+                                 before: Optional[Tuple[str, int]] = None):
+        """(items, (created_at, id) of the last item or None when this is the last page)"""
+        raise NotImplementedError
+
+    async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def read_counters(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    async def cache_get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def cache_put(self, key: str, payload: str):
+        raise NotImplementedError
+
+    async def max_attempt_id(self) -> int:
+        raise NotImplementedError
+
+    def iter_original_prompts(self, after_id: int, batch_size: int) -> AsyncIterator[List[tuple]]:
+        """Batches of (id, challenge_id, prompt) for non-duplicate attempts after `after_id`"""
+        raise NotImplementedError
+
+    def iter_attempt_scores(self, after_id: int, batch_size: int) -> AsyncIterator[List[tuple]]:
+        """Batches of (id, challenge_id, model_name, total_score) for attempts after `after_id`"""
+        raise NotImplementedError
+
+    async def load_score_sketches(self) -> List[Tuple[str, str, str, int]]:
+        """Persisted (challenge_id, model_name, sketch payload, last_attempt_id) rows"""
+        raise NotImplementedError
+
+    async def save_score_sketches(self, rows: List[Tuple[str, str, str, int]]):
+        raise NotImplementedError
+
+    async def reset_achievements(self):
+        """Forget all achievement state and the badges the engine awards"""
+        raise NotImplementedError
+
+    async def archive_attempts(self, older_than: datetime, batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE,
+                               progress=None) -> Dict[str, int]:
+        """Move attempts created before `older_than` out of the hot table (see attempt_archive.py).
+        Returns {month: attempts moved}."""
+        raise NotImplementedError
+
+    def iter_achievement_events(self, batch_size: int) -> AsyncIterator[List[tuple]]:
+        """Batches of (user_id, model_name, total_score, created_at) for non-duplicate
+        attempts, ordered by user and then time"""
+        raise NotImplementedError
+
+    # Upkeep tasks run_maintenance() accepts
+    maintenance_tasks: Tuple[str, ...] = ()
+
+    async def run_maintenance(self, task: str, busy: Callable[[], bool], executor=None) -> Dict[str, Any]:
+        """Run one upkeep task and return what it changed. Long tasks stop early once
+        busy() is true; blocking work runs on `executor`."""
+        raise NotImplementedError
+
+    async def save_achievement_states(self, states: List[Tuple[int, AchievementState]],
+                                      awards: List[Tuple[int, str, str, str]]):
+        """Upsert (user_id, state) rows and insert (user_id, type, name, earned_at) badges"""
+        raise NotImplementedError
+
+    def export_stream(self, export_format: str, filters: Dict[str, Any],
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Sync byte iterator for StreamingResponse (pulled from Starlette's threadpool)"""
+        raise NotImplementedError
+
+
+# 🗄️ SQLite
+class SQLiteStorage(Storage):
+    """Single-file backend; each call opens its own short-lived connection"""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.feedback_codec = FeedbackCodec(db_path)
+        self._leaderboard_day: Optional[str] = None
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, **kwargs)
+
+    def connection_info(self) -> Any:
+        return "per-request"
+
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table if an older schema lacks it"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    async def init_schema(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        # A new database hands freed pages back to the file system in steps (incremental_vacuum)
+        if cursor.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+        # WAL lets long readers (exports, analytics) run without blocking evaluation writes
+        cursor.execute("PRAGMA journal_mode = WAL")
+
+        # Users table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                total_score REAL DEFAULT 0,
+                challenges_completed INTEGER DEFAULT 0
+            )
+        ''')
+
+        # Challenges table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS challenges (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                target_response TEXT NOT NULL,
+                constraints TEXT NOT NULL,
+                time_limit INTEGER DEFAULT 300,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                reference_responses TEXT NOT NULL DEFAULT '[]'
+            )
+        ''')
+        # Alternative valid answers, scored alongside target_response (JSON list)
+        self._ensure_column(cursor, "challenges", "reference_responses", "TEXT NOT NULL DEFAULT '[]'")
+
+        # Attempts table - stores all user prompt submissions
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                challenge_id TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                ai_response TEXT NOT NULL,
+                semantic_accuracy REAL NOT NULL,
+                task_compliance REAL NOT NULL,
+                style_match REAL NOT NULL,
+                efficiency_score REAL NOT NULL,
+                total_score REAL NOT NULL,
+                time_taken INTEGER NOT NULL,
+                feedback TEXT NOT NULL,
+                detailed_metrics TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duplicate_of INTEGER,
+                metric_response_length INTEGER,
+                metric_prompt_length INTEGER,
+                metric_readability_grade REAL,
+                metric_complexity_score REAL,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (challenge_id) REFERENCES challenges (id)
+            )
+        ''')
+
+        # Columns added after the first release
+        self._ensure_column(cursor, "attempts", "duplicate_of", "INTEGER")
+
+        # Feedback message codes and typed metric columns (compact attempt storage)
+        ensure_compact_schema(cursor)
+
+        # Achievements table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS achievements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                achievement_type TEXT NOT NULL,
+                achievement_name TEXT NOT NULL,
+                earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Incremental achievements engine state (see achievements.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS achievement_state (
+                user_id INTEGER PRIMARY KEY,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                best_score REAL NOT NULL DEFAULT 0,
+                models INTEGER NOT NULL DEFAULT 0,
+                streak_days INTEGER NOT NULL DEFAULT 0,
+                last_day INTEGER NOT NULL DEFAULT 0,
+                recent_passes TEXT NOT NULL DEFAULT '',
+                earned INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Memoized evaluation results (second tier of the result cache)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS evaluation_cache (
+                cache_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+        ''')
+
+        # Snapshots of the score distribution sketches (see score_sketch.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS score_sketches (
+                challenge_id TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                counts TEXT NOT NULL,
+                last_attempt_id INTEGER NOT NULL,
+                PRIMARY KEY (challenge_id, model_name)
+            ) WITHOUT ROWID
+        ''')
+
+        # Archived months of attempts and per-user totals of what they hold (see attempt_archive.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attempt_archives (
+                month TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                through TIMESTAMP NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                min_id INTEGER,
+                max_id INTEGER
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_rollups (
+                user_id INTEGER NOT NULL,
+                challenge_id TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                score_sum REAL NOT NULL,
+                PRIMARY KEY (user_id, challenge_id, model_name)
+            ) WITHOUT ROWID
+        ''')
+
+        # Best score per user in each leaderboard bucket, maintained by record_attempts
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leaderboard_buckets'")
+        rebuild_leaderboards = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_buckets (
+                challenge_id TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                best_score REAL NOT NULL,
+                best_time INTEGER NOT NULL,
+                achieved_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (challenge_id, bucket, user_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_buckets_rank
+            ON leaderboard_buckets (challenge_id, bucket, best_score DESC, best_time)
+        ''')
+        if rebuild_leaderboards:
+            self._rebuild_leaderboards(conn)
+
+        # Secondary indexes for per-user history and per-challenge leaderboards
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_created ON attempts (user_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_challenge_score ON attempts (challenge_id, total_score)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_challenge_created ON attempts (user_id, challenge_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_achievements_user ON achievements (user_id)")
+        # Time-range scans: archiving and the leaderboard window rebuild
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_created ON attempts (created_at)")
+
+        # Row counters - maintained by triggers so health checks never COUNT(*) a table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_counters (
+                table_name TEXT PRIMARY KEY,
+                row_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        for table in COUNTED_TABLES:
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+                BEGIN
+                    UPDATE table_counters SET row_count = row_count + 1 WHERE table_name = '{table}';
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+                BEGIN
+                    UPDATE table_counters SET row_count = row_count - 1 WHERE table_name = '{table}';
+                END
+            ''')
+
+            # Seed once; afterwards the triggers keep the counter exact
+            cursor.execute("SELECT 1 FROM table_counters WHERE table_name = ?", (table,))
+            if cursor.fetchone() is None:
+                cursor.execute(
+                    f"INSERT INTO table_counters (table_name, row_count) SELECT ?, COUNT(*) FROM {table}",
+                    (table,)
+                )
+
+        conn.commit()
+        conn.close()
+
+    async def add_challenges(self, challenges: List[Dict[str, Any]]):
+        conn = self._connect()
+        # Existing challenges are left alone, except that ones seeded before reference
+        # responses existed pick them up
+        conn.executemany('''
+            INSERT INTO challenges (id, title, description, difficulty, target_response, constraints, time_limit,
+                                    reference_responses)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET reference_responses = excluded.reference_responses
+            WHERE challenges.reference_responses = '[]'
+        ''', [(c["id"], c["title"], c["description"], c["difficulty"], c["target_response"],
+               json.dumps(c["constraints"]), c["time_limit"], json.dumps(c.get("reference_responses", [])))
+              for c in challenges])
+        conn.commit()
+        conn.close()
+
+    async def create_user(self, username: str, email: str, password_hash: str) -> int:
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+                (username, email, password_hash)
+            )
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            raise DuplicateKeyError(username)
+        finally:
+            conn.close()
+
+    async def get_user_credentials(self, username: str) -> Optional[Tuple[int, str, str]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, username, password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        conn.close()
+        return row
+
+    async def list_challenges(self, difficulty: Optional[str] = None) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        if difficulty:
+            rows = conn.execute(
+                "SELECT id, title, description, difficulty, time_limit FROM challenges WHERE difficulty = ?",
+                (difficulty,)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT id, title, description, difficulty, time_limit FROM challenges").fetchall()
+        conn.close()
+        return [
+            {"id": row[0], "title": row[1], "description": row[2], "difficulty": row[3], "time_limit": row[4]}
+            for row in rows
+        ]
+
+    async def get_challenge(self, challenge_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, title, description, difficulty, target_response, constraints, time_limit, reference_responses "
+            "FROM challenges WHERE id = ?",
+            (challenge_id,)
+        ).fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "title": row[1],
+            "description": row[2],
+            "difficulty": row[3],
+            "target_response": row[4],
+            "constraints": json.loads(row[5]),
+            "time_limit": row[6],
+            "reference_responses": json.loads(row[7])
+        }
+
+    async def get_challenge_scoring(self, challenge_id: str) -> Optional[Tuple[str, str, str]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT target_response, constraints, reference_responses FROM challenges WHERE id = ?", (challenge_id,)
+        ).fetchone()
+        conn.close()
+        return row
+
+    async def get_stored_result(self, attempt_id: int, model_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT {STORED_RESULT_COLUMNS} FROM attempts WHERE id = ? AND model_name = COALESCE(?, model_name)",
+            (attempt_id, model_name)
+        ).fetchone()
+        conn.close()
+        return stored_result(row, self.feedback_codec) if row else None
+
+    async def record_attempts(self, user_id: int, challenge_id: str, prompt: str,
+                              attempts: List[Tuple[str, Dict[str, Any], Optional[int]]]) -> List[Tuple[int, List[str]]]:
+        # Encode first: new feedback messages are committed on the codec's own connection
+        feedback_codes = [self.feedback_codec.encode(result["feedback"]) for _, result, _ in attempts]
+        conn = self._connect()
+        cursor = conn.cursor()
+        recorded = []
+        for (model_name, result, duplicate_of), codes in zip(attempts, feedback_codes):
+            cursor.execute('''
+                INSERT INTO attempts (
+                    user_id, challenge_id, prompt, model_name, ai_response,
+                    semantic_accuracy, task_compliance, style_match, efficiency_score, total_score,
+                    time_taken, feedback, detailed_metrics, duplicate_of,
+                    metric_response_length, metric_prompt_length, metric_readability_grade, metric_complexity_score
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', attempt_values(user_id, challenge_id, prompt, model_name, result, codes,
+                                duplicate_of, compress_text(result["ai_response"])))
+            attempt_id = cursor.lastrowid
+
+            # 🏆 Near-duplicates don't count towards achievements or the leaderboards
+            unlocked = []
+            if duplicate_of is None:
+                cursor.execute("SELECT created_at FROM attempts WHERE id = ?", (attempt_id,))
+                created_at = cursor.fetchone()[0]
+                unlocked = self._award_achievements(cursor, user_id, model_name, result["total_score"], created_at)
+                self._update_leaderboards(cursor, user_id, challenge_id, result, created_at)
+            recorded.append((attempt_id, unlocked))
+
+        # 📊 Update user statistics in the same transaction
+        cursor.execute(
+            "UPDATE users SET challenges_completed = challenges_completed + ?, total_score = total_score + ? WHERE id = ?",
+            (len(attempts), sum(result["total_score"] for _, result, _ in attempts), user_id)
+        )
+        conn.commit()
+        conn.close()
+        return recorded
+
+    @staticmethod
+    def _award_achievements(cursor, user_id: int, model_name: str, total_score: float, created_at: str) -> List[str]:
+        cursor.execute(f"SELECT {', '.join(STATE_COLUMNS)} FROM achievement_state WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        if row is None:
+            # First event for this user: keep badges awarded before the state existed
+            cursor.execute("SELECT achievement_type FROM achievements WHERE user_id = ?", (user_id,))
+            state = AchievementState(earned=earned_mask(r[0] for r in cursor.fetchall()))
+        else:
+            state = AchievementState.from_row(row)
+
+        unlocked = apply_attempt(state, model_name, total_score, created_at)
+        cursor.execute(
+            f"INSERT OR REPLACE INTO achievement_state (user_id, {', '.join(STATE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id, *state.to_row())
+        )
+        cursor.executemany(
+            "INSERT INTO achievements (user_id, achievement_type, achievement_name, earned_at) VALUES (?, ?, ?, ?)",
+            [(user_id, achievement_type, name, created_at) for achievement_type, name in unlocked]
+        )
+        return [name for _, name in unlocked]
+
+    def _update_leaderboards(self, cursor, user_id: int, challenge_id: str, result: Dict[str, Any], created_at: str):
+        cursor.executemany('''
+            INSERT INTO leaderboard_buckets (challenge_id, bucket, user_id, best_score, best_time, achieved_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''' + LEADERBOARD_MERGE, [(challenge_id, bucket, user_id, result["total_score"], result.get("time_taken", 0), created_at)
+              for bucket in attempt_buckets(created_at)])
+        # ⏳ The first write of a new day drops the windows that have rolled out
+        today = leaderboard_bucket("day", created_at)
+        if today != self._leaderboard_day:
+            for period, oldest in oldest_kept_buckets(datetime.fromisoformat(created_at)).items():
+                cursor.execute("DELETE FROM leaderboard_buckets WHERE bucket >= ? AND bucket < ?", (f"{period}:", oldest))
+            self._leaderboard_day = today
+
+    def _rebuild_leaderboards(self, conn: sqlite3.Connection):
+        """Recompute every kept bucket from the attempts, archived ones included. Sources are
+        merged oldest first, so ties keep the earliest achievement."""
+        # DETACH is refused inside a transaction: read the archives before writing anything
+        conn.commit()
+        # created_at of the best (then earliest) attempt; a bare column next to both MAX() and
+        # MIN() could come from the fastest attempt instead
+        best_sql = '''
+            SELECT challenge_id, 'all', user_id, total_score, best_time, created_at FROM (
+                SELECT challenge_id, user_id, total_score, created_at,
+                       MIN(time_taken) OVER (PARTITION BY challenge_id, user_id) AS best_time,
+                       ROW_NUMBER() OVER (PARTITION BY challenge_id, user_id ORDER BY total_score DESC, id) AS position
+                FROM {attempts} a WHERE duplicate_of IS NULL AND {archived}
+            ) WHERE position = 1
+        '''
+        recent_sql = '''
+            SELECT challenge_id, user_id, total_score, time_taken, created_at FROM {attempts} a
+            WHERE duplicate_of IS NULL AND created_at >= ? AND {archived} ORDER BY id
+        '''
+        now = datetime.utcnow()
+        since = windowed_since(now).strftime(TIMESTAMP_FORMAT)
+        archived_best, recent = [], []
+        for archive in list_archives(conn, self.db_path):
+            with attached(conn, archive.path) as alias:
+                source = {"attempts": f"{alias}.attempts", "archived": "a.created_at < ?"}
+                archived_best += conn.execute(best_sql.format(**source), (archive.through,)).fetchall()
+                if archive.through > since:
+                    recent += conn.execute(recent_sql.format(**source), (since, archive.through)).fetchall()
+
+        insert = "INSERT INTO leaderboard_buckets (challenge_id, bucket, user_id, best_score, best_time, achieved_at) "
+        conn.execute("DELETE FROM leaderboard_buckets")
+        conn.executemany(insert + "VALUES (?, ?, ?, ?, ?, ?)" + LEADERBOARD_MERGE, archived_best)
+        conn.execute(insert + best_sql.format(attempts="attempts", archived="1") + LEADERBOARD_MERGE)
+        recent += conn.execute(recent_sql.format(attempts="attempts", archived="1"), (since,)).fetchall()
+        conn.executemany(insert + "VALUES (?, ?, ?, ?, ?, ?)", aggregate_windowed(recent, now))
+
+    def _history_rows(self, conn: sqlite3.Connection, sql: str, params: List[Any], limit: int,
+                      before: Optional[str] = None) -> list:
+        """Rows of a newest-first history query: the hot table first, then the archived months
+        (newest first, each attached in turn) while fewer than `limit` rows were found. `sql`
+        reads {attempts} AS a, has {archived} as its last condition and ends in LIMIT ?.
+        Every hot row is newer than every archived one, so the concatenation stays ordered."""
+        rows = conn.execute(sql.format(attempts="attempts", archived="1"), [*params, limit]).fetchall()
+        if len(rows) >= limit:
+            return rows
+        for archive in list_archives(conn, self.db_path, newest_first=True):
+            if before is not None and archive.month > before[:7]:
+                continue
+            with attached(conn, archive.path) as alias:
+                rows += conn.execute(sql.format(attempts=f"{alias}.attempts", archived="a.created_at < ?"),
+                                     [*params, archive.through, limit - len(rows)]).fetchall()
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def _archived_batches(self, conn: sqlite3.Connection, sql: str, params: tuple, batch_size: int,
+                          after_id: Optional[int] = None) -> Iterator[list]:
+        """Batches of `sql` (reading {attempts} AS a, with an {archived} condition) over each
+        archived month, oldest first"""
+        for archive in list_archives(conn, self.db_path, after_id=after_id):
+            with attached(conn, archive.path) as alias:
+                cursor = conn.execute(sql.format(attempts=f"{alias}.attempts", archived="a.created_at < ?"),
+                                      (*params, archive.through))
+                try:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield rows
+                finally:
+                    cursor.close()
+
+    async def get_attempt_summaries(self, attempt_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        conn = self._connect()
+        placeholders = ",".join("?" for _ in attempt_ids)
+        rows = conn.execute(f'''
+            SELECT id, user_id, prompt, model_name, total_score, created_at
+            FROM attempts
+            WHERE id IN ({placeholders})
+        ''', attempt_ids).fetchall()
+        conn.close()
+        return {
+            row[0]: {"user_id": row[1], "prompt": row[2], "model_name": row[3], "score": row[4], "timestamp": row[5]}
+            for row in rows
+        }
+
+    async def get_leaderboard(self, challenge_id: str, limit: int, bucket: str = "all") -> List[Dict[str, Any]]:
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT u.username, l.best_score, l.best_time, l.achieved_at
+            FROM leaderboard_buckets l
+            JOIN users u ON l.user_id = u.id
+            WHERE l.challenge_id = ? AND l.bucket = ?
+            ORDER BY l.best_score DESC, l.best_time ASC
+            LIMIT ?
+        ''', (challenge_id, bucket, limit)).fetchall()
+        conn.close()
+        return [
+            {"rank": i, "username": row[0], "score": row[1], "time_taken": row[2], "timestamp": row[3]}
+            for i, row in enumerate(rows, 1)
+        ]
+
+    async def get_user_progress(self, user_id: int) -> Dict[str, Any]:
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT total_score, challenges_completed FROM users WHERE id = ?", (user_id,))
+        user_stats = cursor.fetchone()
+
+        recent = self._history_rows(conn, '''
+            SELECT c.title, a.total_score, a.created_at
+            FROM {attempts} a
+            JOIN challenges c ON a.challenge_id = c.id
+            WHERE a.user_id = ? AND {archived}
+            ORDER BY a.created_at DESC
+            LIMIT ?
+        ''', [user_id], 10)
+        recent_attempts = [
+            {"challenge_title": row[0], "score": row[1], "timestamp": row[2]} for row in recent
+        ]
+
+        cursor.execute("SELECT achievement_name, earned_at FROM achievements WHERE user_id = ?", (user_id,))
+        achievements = [{"name": row[0], "earned_at": row[1]} for row in cursor.fetchall()]
+        conn.close()
+
+        return {
+            "total_score": user_stats[0] if user_stats else 0,
+            "challenges_completed": user_stats[1] if user_stats else 0,
+            "recent_attempts": recent_attempts,
+            "achievements": achievements
+        }
+
+    async def list_user_attempts(self, user_id: int, fields: List[str], limit: int,
+                                 challenge_id: Optional[str] = None, model_name: Optional[str] = None,
+                                 before: Optional[Tuple[str, int]] = None):
+        columns = ["a.id", "a.created_at"]
+        for field in fields:
+            columns.extend(ATTEMPT_FIELDS[field][0])
+
+        conditions = ["a.user_id = ?"]
+        params: List[Any] = [user_id]
+        if challenge_id:
+            conditions.append("a.challenge_id = ?")
+            params.append(challenge_id)
+        if model_name:
+            conditions.append("a.model_name = ?")
+            params.append(model_name)
+        if before:
+            conditions.append("(a.created_at, a.id) < (?, ?)")
+            params.extend(before)
+        conditions.append("{archived}")
+
+        conn = self._connect()
+        try:
+            rows = self._history_rows(conn, f'''
+                SELECT {", ".join(columns)}
+                FROM {{attempts}} a
+                WHERE {" AND ".join(conditions)}
+                ORDER BY a.created_at DESC, a.id DESC
+                LIMIT ?
+            ''', params, limit + 1, before[0] if before else None)
+        finally:
+            conn.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [decode_attempt_row(row, fields, self.feedback_codec) for row in rows]
+        return items, ((rows[-1][1], rows[-1][0]) if has_more else None)
+
+    async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        # Hot attempts plus the rollups of archived ones
+        history = '''
+            WITH history AS (
+                SELECT challenge_id, model_name, total_score AS score_sum, 1 AS attempts
+                FROM attempts WHERE user_id = ?
+                UNION ALL
+                SELECT challenge_id, model_name, score_sum, attempts
+                FROM archived_rollups WHERE user_id = ?
+            )
+        '''
+
+        # Performance by difficulty
+        cursor.execute(history + '''
+            SELECT c.difficulty, SUM(h.score_sum) / SUM(h.attempts) as avg_score, SUM(h.attempts) as attempts
+            FROM history h
+            JOIN challenges c ON h.challenge_id = c.id
+            GROUP BY c.difficulty
+        ''', (user_id, user_id))
+        difficulty_stats = {row[0]: {"avg_score": row[1], "attempts": row[2]} for row in cursor.fetchall()}
+
+        # Performance by model
+        cursor.execute(history + '''
+            SELECT model_name, SUM(score_sum) / SUM(attempts) as avg_score, SUM(attempts) as attempts
+            FROM history
+            GROUP BY model_name
+        ''', (user_id, user_id))
+        model_stats = {row[0]: {"avg_score": row[1], "attempts": row[2]} for row in cursor.fetchall()}
+        conn.close()
+
+        return {"difficulty_stats": difficulty_stats, "model_stats": model_stats}
+
+    async def read_counters(self) -> Dict[str, int]:
+        """Trigger-maintained row counters (O(1), no table scans)"""
+        conn = self._connect(timeout=1.0)
+        try:
+            rows = conn.execute("SELECT table_name, row_count FROM table_counters").fetchall()
+            archived = conn.execute("SELECT COALESCE(SUM(attempts), 0) FROM attempt_archives").fetchone()[0]
+        finally:
+            conn.close()
+        counters = {table: 0 for table in COUNTED_TABLES}
+        counters.update(dict(rows))
+        counters["attempts"] += archived
+        counters["attempts_archived"] = archived
+        return counters
+
+    async def cache_get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT result FROM evaluation_cache WHERE cache_key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    async def cache_put(self, key: str, payload: str):
+        conn = self._connect()
+        try:
+            conn.execute("INSERT OR REPLACE INTO evaluation_cache (cache_key, result) VALUES (?, ?)", (key, payload))
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def max_attempt_id(self) -> int:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(id) FROM attempts), 0), COALESCE((SELECT MAX(max_id) FROM attempt_archives), 0))"
+        ).fetchone()
+        conn.close()
+        return row[0]
+
+    async def iter_original_prompts(self, after_id: int, batch_size: int) -> AsyncIterator[List[tuple]]:
+        sql = "SELECT id, challenge_id, prompt FROM {attempts} a WHERE id > ? AND duplicate_of IS NULL AND {archived} ORDER BY id"
+        conn = self._connect()
+        try:
+            for rows in self._archived_batches(conn, sql, (after_id,), batch_size, after_id):
+                yield rows
+            cursor = conn.execute(sql.format(attempts="attempts", archived="1"), (after_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    async def iter_attempt_scores(self, after_id: int, batch_size: int) -> AsyncIterator[List[tuple]]:
+        sql = "SELECT id, challenge_id, model_name, total_score FROM {attempts} a WHERE id > ? AND {archived} ORDER BY id"
+        conn = self._connect()
+        try:
+            for rows in self._archived_batches(conn, sql, (after_id,), batch_size, after_id):
+                yield rows
+            cursor = conn.execute(sql.format(attempts="attempts", archived="1"), (after_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    async def load_score_sketches(self) -> List[Tuple[str, str, str, int]]:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT challenge_id, model_name, counts, last_attempt_id FROM score_sketches").fetchall()
+        finally:
+            conn.close()
+
+    async def save_score_sketches(self, rows: List[Tuple[str, str, str, int]]):
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO score_sketches (challenge_id, model_name, counts, last_attempt_id) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def reset_achievements(self):
+        conn = self._connect()
+        placeholders = ",".join("?" for _ in ACHIEVEMENT_TYPES)
+        conn.execute("DELETE FROM achievement_state")
+        conn.execute(f"DELETE FROM achievements WHERE achievement_type IN ({placeholders})", ACHIEVEMENT_TYPES)
+        conn.commit()
+        conn.close()
+
+    async def iter_achievement_events(self, batch_size: int) -> AsyncIterator[List[tuple]]:
+        sql = '''
+            SELECT user_id, model_name, total_score, created_at FROM attempts a
+            WHERE duplicate_of IS NULL AND {archived}
+            ORDER BY user_id, created_at, id
+        '''
+        conn = self._connect()
+        archive_conns = []
+        try:
+            # Walks idx_attempts_user_created in order, no sort
+            sources = [conn.execute(sql.format(archived="1"))]
+            # Each archive gets its own connection (SQLite only attaches a handful of files at
+            # once); the hot table and the archives are merged per user by time
+            for archive in list_archives(conn, self.db_path):
+                archive_conns.append(open_archive(archive.path))
+                sources.append(archive_conns[-1].execute(sql.format(archived="a.created_at < ?"), (archive.through,)))
+            events = heapq.merge(*sources, key=lambda row: (row[0], row[3]))
+            while True:
+                rows = list(itertools.islice(events, batch_size))
+                if not rows:
+                    break
+                yield rows
+        finally:
+            for archive_conn in archive_conns:
+                archive_conn.close()
+            conn.close()
+
+    async def save_achievement_states(self, states: List[Tuple[int, AchievementState]],
+                                      awards: List[Tuple[int, str, str, str]]):
+        conn = self._connect()
+        conn.executemany(
+            f"INSERT OR REPLACE INTO achievement_state (user_id, {', '.join(STATE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, *state.to_row()) for user_id, state in states]
+        )
+        conn.executemany(
+            "INSERT INTO achievements (user_id, achievement_type, achievement_name, earned_at) VALUES (?, ?, ?, ?)",
+            awards
+        )
+        conn.commit()
+        conn.close()
+
+    async def archive_attempts(self, older_than: datetime, batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE,
+                               progress=None) -> Dict[str, int]:
+        cutoff = as_timestamp(older_than)
+        moved: Dict[str, int] = {}
+        conn = self._connect(timeout=30.0)
+        try:
+            while True:
+                # Oldest hot attempt first (idx_attempts_created), one batch of a month at a time
+                low = conn.execute("SELECT MIN(created_at) FROM attempts").fetchone()[0]
+                if low is None or low >= cutoff:
+                    break
+                month_end = min(next_month(datetime.fromisoformat(low)).strftime(TIMESTAMP_FORMAT), cutoff)
+                row = conn.execute(
+                    "SELECT created_at FROM attempts WHERE created_at >= ? AND created_at < ? "
+                    "ORDER BY created_at LIMIT 1 OFFSET ?",
+                    (low, month_end, batch_size)
+                ).fetchone()
+                # Batches end on a timestamp boundary, so `through` splits hot and archived rows exactly
+                high = row[0] if row else month_end
+                if high == low:
+                    high = (datetime.fromisoformat(low) + timedelta(seconds=1)).strftime(TIMESTAMP_FORMAT)
+                month = low[:7]
+                moved[month] = moved.get(month, 0) + self._archive_range(conn, month, low, high)
+                if progress:
+                    progress(month, moved[month])
+        finally:
+            conn.close()
+        return moved
+
+    def _archive_range(self, conn: sqlite3.Connection, month: str, low: str, high: str) -> int:
+        """Move the attempts with low <= created_at < high (all in `month`) to its archive file"""
+        # The manifest entry comes first, so a file with rows but no entry belongs to another database
+        new_month = conn.execute(
+            "INSERT OR IGNORE INTO attempt_archives (month, path, through) VALUES (?, ?, ?)",
+            (month, archive_file_name(month), f"{month}-01 00:00:00")
+        ).rowcount == 1
+        conn.commit()
+        path = resolve_archive_path(self.db_path, conn.execute(
+            "SELECT path FROM attempt_archives WHERE month = ?", (month,)
+        ).fetchone()[0])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        columns = [row[1] for row in conn.execute("PRAGMA main.table_info(attempts)")]
+
+        # 1. Copy into the archive and commit it
+        with attached(conn, path, create=True) as alias:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {alias}.attempts AS SELECT * FROM main.attempts WHERE 0")
+            if new_month and conn.execute(f"SELECT 1 FROM {alias}.attempts LIMIT 1").fetchone():
+                conn.execute("DELETE FROM attempt_archives WHERE month = ?", (month,))
+                conn.commit()
+                raise RuntimeError(f"{path} already holds attempts that are not in this database's manifest")
+            archived_columns = {row[1] for row in conn.execute(f"PRAGMA {alias}.table_info(attempts)")}
+            for column in columns:
+                if column not in archived_columns:   # added to the hot table since this file was created
+                    conn.execute(f"ALTER TABLE {alias}.attempts ADD COLUMN {column}")
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {alias}.idx_attempts_id ON attempts (id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_attempts_user_created ON attempts (user_id, created_at)")
+            listed = ", ".join(columns)
+            # OR IGNORE: rows copied by an interrupted earlier run are already there
+            conn.execute(
+                f"INSERT OR IGNORE INTO {alias}.attempts ({listed}) SELECT {listed} FROM main.attempts "
+                "WHERE created_at >= ? AND created_at < ?",
+                (low, high)
+            )
+            conn.commit()
+
+        # 2. Roll the rows up, advance the manifest and delete them from the hot table, atomically
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute('''
+            INSERT INTO archived_rollups (user_id, challenge_id, model_name, attempts, score_sum)
+            SELECT user_id, challenge_id, model_name, COUNT(*), SUM(total_score) FROM attempts
+            WHERE created_at >= ? AND created_at < ?
+            GROUP BY user_id, challenge_id, model_name
+            ON CONFLICT (user_id, challenge_id, model_name) DO UPDATE SET
+                attempts = attempts + excluded.attempts,
+                score_sum = score_sum + excluded.score_sum
+        ''', (low, high))
+        count, min_id, max_id = conn.execute(
+            "SELECT COUNT(*), MIN(id), MAX(id) FROM attempts WHERE created_at >= ? AND created_at < ?", (low, high)
+        ).fetchone()
+        conn.execute('''
+            UPDATE attempt_archives SET
+                attempts = attempts + ?,
+                min_id = MIN(COALESCE(min_id, ?), ?),
+                max_id = MAX(COALESCE(max_id, ?), ?),
+                through = ?
+            WHERE month = ?
+        ''', (count, min_id, min_id, max_id, max_id, high, month))
+        conn.execute("DELETE FROM attempts WHERE created_at >= ? AND created_at < ?", (low, high))
+        conn.commit()
+        return count
+
+    maintenance_tasks = ("optimize", "analyze", "checkpoint", "incremental_vacuum")
+
+    async def run_maintenance(self, task: str, busy: Callable[[], bool], executor=None) -> Dict[str, Any]:
+        if task not in self.maintenance_tasks:
+            raise ValueError(f"Unknown maintenance task: {task}")
+        return await asyncio.get_running_loop().run_in_executor(executor, self._run_maintenance, task, busy)
+
+    def _run_maintenance(self, task: str, busy: Callable[[], bool]) -> Dict[str, Any]:
+        conn = self._connect(timeout=MAINTENANCE_LOCK_TIMEOUT)
+        try:
+            if task == "optimize":
+                # Re-analyzes only the tables whose statistics the planner found stale
+                conn.execute("PRAGMA optimize")
+                return {}
+            if task == "analyze":
+                conn.execute("ANALYZE")
+                return {"statistics_rows": conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]}
+            if task == "checkpoint":
+                wal_path = self.db_path + "-wal"
+                wal_bytes = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+                # TRUNCATE also shrinks the -wal file; blocked is true while a reader still needs it
+                blocked = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+                return {
+                    "blocked": bool(blocked), "wal_bytes_before": wal_bytes,
+                    "wal_bytes_after": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+                }
+            # incremental_vacuum: databases created before auto_vacuum was switched on need
+            # one offline `PRAGMA auto_vacuum = INCREMENTAL; VACUUM;` first
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return {"auto_vacuum": False, "freelist_pages": free, "freed_bytes": 0}
+            freed = 0
+            while free and not busy():
+                conn.execute(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_STEP_PAGES})").fetchall()
+                left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if left >= free:
+                    break
+                freed, free = freed + free - left, left
+            return {"auto_vacuum": True, "freelist_pages": free, "freed_bytes": freed * page_size}
+        finally:
+            conn.close()
+
+    def export_stream(self, export_format: str, filters: Dict[str, Any],
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        # Read-only connection in the threadpool; WAL keeps it from blocking writers
+        return export_attempts(self.db_path, export_format, filters, chunk_size)
+
+
+# 🐘 PostgreSQL
+POSTGRES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc'),
+        total_score DOUBLE PRECISION DEFAULT 0,
+        challenges_completed INTEGER DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS challenges (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        difficulty TEXT NOT NULL,
+        target_response TEXT NOT NULL,
+        constraints TEXT NOT NULL,
+        time_limit INTEGER DEFAULT 300,
+        created_at TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc'),
+        reference_responses TEXT NOT NULL DEFAULT '[]'
+    )
+    ''',
+    "ALTER TABLE challenges ADD COLUMN IF NOT EXISTS reference_responses TEXT NOT NULL DEFAULT '[]'",
+    # ai_response stays TEXT here: TOAST already compresses large values
+    '''
+    CREATE TABLE IF NOT EXISTS attempts (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL REFERENCES users (id),
+        challenge_id TEXT NOT NULL REFERENCES challenges (id),
+        prompt TEXT NOT NULL,
+        model_name TEXT NOT NULL,
+        ai_response TEXT NOT NULL,
+        semantic_accuracy DOUBLE PRECISION NOT NULL,
+        task_compliance DOUBLE PRECISION NOT NULL,
+        style_match DOUBLE PRECISION NOT NULL,
+        efficiency_score DOUBLE PRECISION NOT NULL,
+        total_score DOUBLE PRECISION NOT NULL,
+        time_taken INTEGER NOT NULL,
+        feedback TEXT NOT NULL,
+        detailed_metrics TEXT NOT NULL,
+        created_at TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc'),
+        duplicate_of BIGINT,
+        metric_response_length INTEGER,
+        metric_prompt_length INTEGER,
+        metric_readability_grade DOUBLE PRECISION,
+        metric_complexity_score DOUBLE PRECISION
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS achievements (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL REFERENCES users (id),
+        achievement_type TEXT NOT NULL,
+        achievement_name TEXT NOT NULL,
+        earned_at TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc')
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS achievement_state (
+        user_id BIGINT PRIMARY KEY REFERENCES users (id),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        best_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+        models INTEGER NOT NULL DEFAULT 0,
+        streak_days INTEGER NOT NULL DEFAULT 0,
+        last_day INTEGER NOT NULL DEFAULT 0,
+        recent_passes TEXT NOT NULL DEFAULT '',
+        earned INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS feedback_messages (
+        id SERIAL PRIMARY KEY,
+        message TEXT UNIQUE NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS evaluation_cache (
+        cache_key TEXT PRIMARY KEY,
+        result TEXT NOT NULL,
+        created_at TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc')
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS score_sketches (
+        challenge_id TEXT NOT NULL,
+        model_name TEXT NOT NULL,
+        counts TEXT NOT NULL,
+        last_attempt_id BIGINT NOT NULL,
+        PRIMARY KEY (challenge_id, model_name)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS leaderboard_buckets (
+        challenge_id TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        user_id BIGINT NOT NULL,
+        best_score DOUBLE PRECISION NOT NULL,
+        best_time INTEGER NOT NULL,
+        achieved_at TIMESTAMP(0) NOT NULL,
+        PRIMARY KEY (challenge_id, bucket, user_id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_leaderboard_buckets_rank ON leaderboard_buckets (challenge_id, bucket, best_score DESC, best_time)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_user_created ON attempts (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_challenge_score ON attempts (challenge_id, total_score)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_user_challenge_created ON attempts (user_id, challenge_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_achievements_user ON achievements (user_id)",
+]
+
+# Table -> columns copied by import_sqlite(), in dependency order
+POSTGRES_COPY_TABLES = [
+    ("users", ["id", "username", "email", "password_hash", "created_at", "total_score", "challenges_completed"]),
+    ("challenges", ["id", "title", "description", "difficulty", "target_response", "constraints",
+                    "time_limit", "created_at", "reference_responses"]),
+    ("attempts", ["id", "user_id", "challenge_id", "prompt", "model_name", "ai_response",
+                  "semantic_accuracy", "task_compliance", "style_match", "efficiency_score", "total_score",
+                  "time_taken", "feedback", "detailed_metrics", "created_at", "duplicate_of",
+                  "metric_response_length", "metric_prompt_length", "metric_readability_grade",
+                  "metric_complexity_score"]),
+    ("achievements", ["id", "user_id", "achievement_type", "achievement_name", "earned_at"]),
+    ("achievement_state", ["user_id"] + STATE_COLUMNS),
+    ("feedback_messages", ["id", "message"]),
+    ("evaluation_cache", ["cache_key", "result", "created_at"]),
+]
+TIMESTAMP_COLUMNS = {"created_at", "earned_at"}
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class PostgresStorage(Storage):
+    """asyncpg backend; every call borrows a connection from one pool per worker process"""
+
+    backend = "postgresql"
+
+    def __init__(self, url: str, min_size: int = 2, max_size: int = 10):
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self.feedback_codec = FeedbackCodec()
+        self._leaderboard_day: Optional[str] = None
+
+    async def connect(self):
+        global asyncpg
+        if asyncpg is None:
+            try:
+                import asyncpg
+            except ImportError:
+                raise RuntimeError("The PostgreSQL backend requires the asyncpg package")
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(self.url, min_size=self.min_size, max_size=self.max_size)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    # autovacuum reclaims space and keeps statistics roughly current on its own
+    maintenance_tasks = ("analyze",)
+
+    async def run_maintenance(self, task: str, busy: Callable[[], bool], executor=None) -> Dict[str, Any]:
+        if task not in self.maintenance_tasks:
+            raise ValueError(f"Unknown maintenance task: {task}")
+        async with self.pool.acquire() as conn:
+            changed = await conn.fetchval("SELECT COALESCE(SUM(n_mod_since_analyze), 0) FROM pg_stat_user_tables")
+            await conn.execute("ANALYZE")
+        return {"rows_changed_since_analyze": int(changed)}
+
+    def connection_info(self) -> Any:
+        if self.pool is None:
+            return {"pool": "closed"}
+        return {"pool_size": self.pool.get_size(), "pool_idle": self.pool.get_idle_size(),
+                "pool_max": self.max_size}
+
+    async def init_schema(self):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Serialize concurrent startups of several workers
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('prompt_trainer_schema'))")
+                rebuild_leaderboards = await conn.fetchval("SELECT to_regclass('leaderboard_buckets') IS NULL")
+                for statement in POSTGRES_SCHEMA:
+                    await conn.execute(statement)
+                if rebuild_leaderboards:
+                    await self._rebuild_leaderboards(conn)
+            self.feedback_codec.remember(await conn.fetch("SELECT id, message FROM feedback_messages"))
+
+    async def add_challenges(self, challenges: List[Dict[str, Any]]):
+        await self.pool.executemany('''
+            INSERT INTO challenges (id, title, description, difficulty, target_response, constraints, time_limit,
+                                    reference_responses)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (id) DO UPDATE SET reference_responses = EXCLUDED.reference_responses
+            WHERE challenges.reference_responses = '[]'
+        ''', [(c["id"], c["title"], c["description"], c["difficulty"], c["target_response"],
+               json.dumps(c["constraints"]), c["time_limit"], json.dumps(c.get("reference_responses", [])))
+              for c in challenges])
+
+    async def create_user(self, username: str, email: str, password_hash: str) -> int:
+        try:
+            return await self.pool.fetchval(
+                "INSERT INTO users (username, email, password_hash) VALUES ($1, $2, $3) RETURNING id",
+                username, email, password_hash
+            )
+        except asyncpg.UniqueViolationError:
+            raise DuplicateKeyError(username)
+
+    async def get_user_credentials(self, username: str) -> Optional[Tuple[int, str, str]]:
+        row = await self.pool.fetchrow("SELECT id, username, password_hash FROM users WHERE username = $1", username)
+        return tuple(row) if row else None
+
+    async def list_challenges(self, difficulty: Optional[str] = None) -> List[Dict[str, Any]]:
+        if difficulty:
+            rows = await self.pool.fetch(
+                "SELECT id, title, description, difficulty, time_limit FROM challenges WHERE difficulty = $1",
+                difficulty
+            )
+        else:
+            rows = await self.pool.fetch("SELECT id, title, description, difficulty, time_limit FROM challenges")
+        return [dict(row) for row in rows]
+
+    async def get_challenge(self, challenge_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetchrow(
+            "SELECT id, title, description, difficulty, target_response, constraints, time_limit, reference_responses "
+            "FROM challenges WHERE id = $1",
+            challenge_id
+        )
+        if not row:
+            return None
+        challenge = dict(row)
+        challenge["constraints"] = json.loads(challenge["constraints"])
+        challenge["reference_responses"] = json.loads(challenge["reference_responses"])
+        return challenge
+
+    async def get_challenge_scoring(self, challenge_id: str) -> Optional[Tuple[str, str, str]]:
+        row = await self.pool.fetchrow(
+            "SELECT target_response, constraints, reference_responses FROM challenges WHERE id = $1", challenge_id
+        )
+        return tuple(row) if row else None
+
+    async def _refresh_feedback(self, values):
+        """Reload the message table when a row carries a code this worker hasn't seen yet"""
+        if any(self.feedback_codec.has_unknown_codes(value) for value in values):
+            self.feedback_codec.remember(await self.pool.fetch("SELECT id, message FROM feedback_messages"))
+
+    async def _feedback_codes(self, messages: List[str]) -> str:
+        # Registered in autocommit outside the attempt transaction, like SQLiteStorage's codec
+        for message in self.feedback_codec.unknown_messages(messages):
+            code = await self.pool.fetchval('''
+                INSERT INTO feedback_messages (message) VALUES ($1)
+                ON CONFLICT (message) DO UPDATE SET message = EXCLUDED.message
+                RETURNING id
+            ''', message)
+            self.feedback_codec.remember([(code, message)])
+        return self.feedback_codec.encode(messages)
+
+    async def get_stored_result(self, attempt_id: int, model_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        row = await self.pool.fetchrow(
+            f"SELECT {STORED_RESULT_COLUMNS} FROM attempts WHERE id = $1 AND model_name = COALESCE($2::text, model_name)",
+            attempt_id, model_name
+        )
+        if not row:
+            return None
+        await self._refresh_feedback([row[6]])
+        return stored_result(tuple(row), self.feedback_codec)
+
+    async def record_attempts(self, user_id: int, challenge_id: str, prompt: str,
+                              attempts: List[Tuple[str, Dict[str, Any], Optional[int]]]) -> List[Tuple[int, List[str]]]:
+        rows = []
+        for model_name, result, duplicate_of in attempts:
+            feedback_codes = await self._feedback_codes(result["feedback"])
+            rows.append(attempt_values(user_id, challenge_id, prompt, model_name, result, feedback_codes,
+                                       duplicate_of, result["ai_response"]))
+        recorded = []
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "UPDATE users SET challenges_completed = challenges_completed + $1, total_score = total_score + $2 WHERE id = $3",
+                    len(attempts), sum(result["total_score"] for _, result, _ in attempts), user_id
+                )
+                for (model_name, result, duplicate_of), values in zip(attempts, rows):
+                    attempt_id, created_at = await conn.fetchrow('''
+                        INSERT INTO attempts (
+                            user_id, challenge_id, prompt, model_name, ai_response,
+                            semantic_accuracy, task_compliance, style_match, efficiency_score, total_score,
+                            time_taken, feedback, detailed_metrics, duplicate_of,
+                            metric_response_length, metric_prompt_length, metric_readability_grade, metric_complexity_score
+                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18)
+                        RETURNING id, created_at
+                    ''', *values)
+                    unlocked = []
+                    if duplicate_of is None:
+                        unlocked = await self._award_achievements(conn, user_id, model_name, result["total_score"], created_at)
+                        await self._update_leaderboards(conn, user_id, challenge_id, result, created_at)
+                    recorded.append((attempt_id, unlocked))
+        return recorded
+
+    async def _update_leaderboards(self, conn, user_id: int, challenge_id: str, result: Dict[str, Any],
+                                   created_at: datetime):
+        await conn.executemany('''
+            INSERT INTO leaderboard_buckets (challenge_id, bucket, user_id, best_score, best_time, achieved_at)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (challenge_id, bucket, user_id) DO UPDATE SET
+                achieved_at = CASE WHEN EXCLUDED.best_score > leaderboard_buckets.best_score
+                                   THEN EXCLUDED.achieved_at ELSE leaderboard_buckets.achieved_at END,
+                best_score = GREATEST(leaderboard_buckets.best_score, EXCLUDED.best_score),
+                best_time = LEAST(leaderboard_buckets.best_time, EXCLUDED.best_time)
+        ''', [(challenge_id, bucket, user_id, result["total_score"], result.get("time_taken", 0), created_at)
+              for bucket in attempt_buckets(created_at)])
+        # ⏳ The first write of a new day (per worker) drops the windows that have rolled out
+        today = leaderboard_bucket("day", created_at)
+        if today != self._leaderboard_day:
+            for period, oldest in oldest_kept_buckets(created_at).items():
+                await conn.execute("DELETE FROM leaderboard_buckets WHERE bucket >= $1 AND bucket < $2", f"{period}:", oldest)
+            self._leaderboard_day = today
+
+    @staticmethod
+    async def _rebuild_leaderboards(conn):
+        """Recompute every kept bucket from the attempts"""
+        await conn.execute("DELETE FROM leaderboard_buckets")
+        await conn.execute('''
+            INSERT INTO leaderboard_buckets (challenge_id, bucket, user_id, best_score, best_time, achieved_at)
+            SELECT DISTINCT ON (challenge_id, user_id)
+                   challenge_id, 'all', user_id, total_score,
+                   MIN(time_taken) OVER (PARTITION BY challenge_id, user_id), created_at
+            FROM attempts WHERE duplicate_of IS NULL
+            ORDER BY challenge_id, user_id, total_score DESC, id
+        ''')
+        now = datetime.utcnow()
+        rows = await conn.fetch('''
+            SELECT challenge_id, user_id, total_score, time_taken, created_at FROM attempts
+            WHERE duplicate_of IS NULL AND created_at >= $1 ORDER BY id
+        ''', windowed_since(now))
+        await conn.executemany(
+            "INSERT INTO leaderboard_buckets (challenge_id, bucket, user_id, best_score, best_time, achieved_at) "
+            "VALUES ($1, $2, $3, $4, $5, $6)",
+            aggregate_windowed(rows, now)
+        )
+
+    @staticmethod
+    async def _award_achievements(conn, user_id: int, model_name: str, total_score: float,
+                                  created_at: datetime) -> List[str]:
+        status = await conn.execute(
+            "INSERT INTO achievement_state (user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING", user_id
+        )
+        if status == "INSERT 0 1":
+            # First event for this user: keep badges awarded before the state existed
+            types = await conn.fetch("SELECT achievement_type FROM achievements WHERE user_id = $1", user_id)
+            await conn.execute(
+                "UPDATE achievement_state SET earned = $1 WHERE user_id = $2",
+                earned_mask(row[0] for row in types), user_id
+            )
+        # Row lock: concurrent attempts by the same user apply one after the other
+        row = await conn.fetchrow(
+            f"SELECT {', '.join(STATE_COLUMNS)} FROM achievement_state WHERE user_id = $1 FOR UPDATE", user_id
+        )
+        state = AchievementState.from_row(tuple(row))
+        unlocked = apply_attempt(state, model_name, total_score, created_at)
+        assignments = ", ".join(f"{column} = ${n}" for n, column in enumerate(STATE_COLUMNS, 2))
+        await conn.execute(f"UPDATE achievement_state SET {assignments} WHERE user_id = $1", user_id, *state.to_row())
+        if unlocked:
+            await conn.executemany(
+                "INSERT INTO achievements (user_id, achievement_type, achievement_name, earned_at) VALUES ($1, $2, $3, $4)",
+                [(user_id, achievement_type, name, created_at) for achievement_type, name in unlocked]
+            )
+        return [name for _, name in unlocked]
+
+    async def get_attempt_summaries(self, attempt_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        rows = await self.pool.fetch('''
+            SELECT id, user_id, prompt, model_name, total_score, created_at::text
+            FROM attempts
+            WHERE id = ANY($1::bigint[])
+        ''', attempt_ids)
+        return {
+            row[0]: {"user_id": row[1], "prompt": row[2], "model_name": row[3], "score": row[4], "timestamp": row[5]}
+            for row in rows
+        }
+
+    async def get_leaderboard(self, challenge_id: str, limit: int, bucket: str = "all") -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch('''
+            SELECT u.username, l.best_score, l.best_time, l.achieved_at::text
+            FROM leaderboard_buckets l
+            JOIN users u ON l.user_id = u.id
+            WHERE l.challenge_id = $1 AND l.bucket = $2
+            ORDER BY l.best_score DESC, l.best_time ASC
+            LIMIT $3
+        ''', challenge_id, bucket, limit)
+        return [
+            {"rank": i, "username": row[0], "score": row[1], "time_taken": row[2], "timestamp": row[3]}
+            for i, row in enumerate(rows, 1)
+        ]
+
+    async def get_user_progress(self, user_id: int) -> Dict[str, Any]:
+        async with self.pool.acquire() as conn:
+            user_stats = await conn.fetchrow(
+                "SELECT total_score, challenges_completed FROM users WHERE id = $1", user_id
+            )
+            recent = await conn.fetch('''
+                SELECT c.title, a.total_score, a.created_at::text
+                FROM attempts a
+                JOIN challenges c ON a.challenge_id = c.id
+                WHERE a.user_id = $1
+                ORDER BY a.created_at DESC
+                LIMIT 10
+            ''', user_id)
+            achievements = await conn.fetch(
+                "SELECT achievement_name, earned_at::text FROM achievements WHERE user_id = $1", user_id
+            )
+        return {
+            "total_score": user_stats[0] if user_stats else 0,
+            "challenges_completed": user_stats[1] if user_stats else 0,
+            "recent_attempts": [{"challenge_title": r[0], "score": r[1], "timestamp": r[2]} for r in recent],
+            "achievements": [{"name": r[0], "earned_at": r[1]} for r in achievements]
+        }
+
+    async def list_user_attempts(self, user_id: int, fields: List[str], limit: int,
+                                 challenge_id: Optional[str] = None, model_name: Optional[str] = None,
+                                 before: Optional[Tuple[str, int]] = None):
+        columns = ["a.id", "a.created_at::text"]
+        for field in fields:
+            columns.extend(ATTEMPT_FIELDS[field][0])
+
+        params: List[Any] = [user_id]
+        conditions = ["a.user_id = $1"]
+        if challenge_id:
+            params.append(challenge_id)
+            conditions.append(f"a.challenge_id = ${len(params)}")
+        if model_name:
+            params.append(model_name)
+            conditions.append(f"a.model_name = ${len(params)}")
+        if before:
+            params.extend(before)
+            conditions.append(f"(a.created_at, a.id) < (${len(params) - 1}::text::timestamp, ${len(params)})")
+        params.append(limit + 1)
+
+        rows = await self.pool.fetch(f'''
+            SELECT {", ".join(columns)}
+            FROM attempts a
+            WHERE {" AND ".join(conditions)}
+            ORDER BY a.created_at DESC, a.id DESC
+            LIMIT ${len(params)}
+        ''', *params)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if "feedback" in fields:
+            offset = 2 + sum(len(ATTEMPT_FIELDS[f][0]) for f in fields[:fields.index("feedback")])
+            await self._refresh_feedback([row[offset] for row in rows])
+        items = [decode_attempt_row(row, fields, self.feedback_codec) for row in rows]
+        return items, ((rows[-1][1], rows[-1][0]) if has_more else None)
+
+    async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        async with self.pool.acquire() as conn:
+            by_difficulty = await conn.fetch('''
+                SELECT c.difficulty, AVG(a.total_score) as avg_score, COUNT(*) as attempts
+                FROM attempts a
+                JOIN challenges c ON a.challenge_id = c.id
+                WHERE a.user_id = $1
+                GROUP BY c.difficulty
+            ''', user_id)
+            by_model = await conn.fetch('''
+                SELECT model_name, AVG(total_score) as avg_score, COUNT(*) as attempts
+                FROM attempts
+                WHERE user_id = $1
+                GROUP BY model_name
+            ''', user_id)
+        return {
+            "difficulty_stats": {row[0]: {"avg_score": row[1], "attempts": row[2]} for row in by_difficulty},
+            "model_stats": {row[0]: {"avg_score": row[1], "attempts": row[2]} for row in by_model}
+        }
+
+    async def read_counters(self) -> Dict[str, int]:
+        """Live-tuple estimates from the statistics collector - no counter row for every
+        worker's inserts to queue on, and still no table scans"""
+        rows = await self.pool.fetch(
+            "SELECT relname, n_live_tup FROM pg_stat_user_tables WHERE relname = ANY($1::text[])", COUNTED_TABLES
+        )
+        counters = {table: 0 for table in COUNTED_TABLES}
+        counters.update({row[0]: row[1] for row in rows})
+        counters["attempts_archived"] = 0   # attempts are only archived out of SQLite
+        return counters
+
+    async def cache_get(self, key: str) -> Optional[str]:
+        return await self.pool.fetchval("SELECT result FROM evaluation_cache WHERE cache_key = $1", key)
+
+    async def cache_put(self, key: str, payload: str):
+        await self.pool.execute('''
+            INSERT INTO evaluation_cache (cache_key, result) VALUES ($1, $2)
+            ON CONFLICT (cache_key) DO UPDATE SET result = EXCLUDED.result
+        ''', key, payload)
+
+    async def max_attempt_id(self) -> int:
+        return await self.pool.fetchval("SELECT COALESCE(MAX(id), 0) FROM attempts")
+
+    async def iter_original_prompts(self, after_id: int, batch_size: int) -> AsyncIterator[List[tuple]]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(
+                    "SELECT id, challenge_id, prompt FROM attempts WHERE id > $1 AND duplicate_of IS NULL ORDER BY id",
+                    after_id
+                )
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [tuple(row) for row in rows]
+
+    async def iter_attempt_scores(self, after_id: int, batch_size: int) -> AsyncIterator[List[tuple]]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(
+                    "SELECT id, challenge_id, model_name, total_score FROM attempts WHERE id > $1 ORDER BY id", after_id
+                )
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [tuple(row) for row in rows]
+
+    async def load_score_sketches(self) -> List[Tuple[str, str, str, int]]:
+        rows = await self.pool.fetch("SELECT challenge_id, model_name, counts, last_attempt_id FROM score_sketches")
+        return [tuple(row) for row in rows]
+
+    async def save_score_sketches(self, rows: List[Tuple[str, str, str, int]]):
+        await self.pool.executemany('''
+            INSERT INTO score_sketches (challenge_id, model_name, counts, last_attempt_id) VALUES ($1, $2, $3, $4)
+            ON CONFLICT (challenge_id, model_name) DO UPDATE SET counts = EXCLUDED.counts, last_attempt_id = EXCLUDED.last_attempt_id
+        ''', rows)
+
+    async def reset_achievements(self):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM achievement_state")
+                await conn.execute("DELETE FROM achievements WHERE achievement_type = ANY($1::text[])", ACHIEVEMENT_TYPES)
+
+    async def iter_achievement_events(self, batch_size: int) -> AsyncIterator[List[tuple]]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor('''
+                    SELECT user_id, model_name, total_score, created_at FROM attempts
+                    WHERE duplicate_of IS NULL
+                    ORDER BY user_id, created_at, id
+                ''')
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [tuple(row) for row in rows]
+
+    async def save_achievement_states(self, states: List[Tuple[int, AchievementState]],
+                                      awards: List[Tuple[int, str, str, str]]):
+        columns = ", ".join(STATE_COLUMNS)
+        placeholders = ", ".join(f"${n}" for n in range(2, len(STATE_COLUMNS) + 2))
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in STATE_COLUMNS)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(
+                    f"INSERT INTO achievement_state (user_id, {columns}) VALUES ($1, {placeholders}) "
+                    f"ON CONFLICT (user_id) DO UPDATE SET {updates}",
+                    [(user_id, *state.to_row()) for user_id, state in states]
+                )
+                await conn.executemany(
+                    "INSERT INTO achievements (user_id, achievement_type, achievement_name, earned_at) VALUES ($1, $2, $3, $4)",
+                    [(user_id, kind, name, parse_timestamp(earned_at)) for user_id, kind, name, earned_at in awards]
+                )
+
+    async def _export_chunks(self, filters: Dict[str, Any], chunk_size: int):
+        sql, params = build_export_query(**filters, numbered=True)
+        feedback_column = len(BASE_COLUMNS)
+        async with self.pool.acquire() as conn:
+            # One snapshot for the whole export, like the SQLite read transaction
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                cursor = await conn.cursor(sql, *params)
+                while True:
+                    rows = await cursor.fetch(chunk_size)
+                    if not rows:
+                        break
+                    await self._refresh_feedback([row[feedback_column] for row in rows])
+                    chunk = [expand_row(tuple(row), self.feedback_codec) for row in rows]
+                    for record in chunk:
+                        if record["created_at"] is not None:
+                            record["created_at"] = str(record["created_at"])
+                    yield chunk
+
+    def export_stream(self, export_format: str, filters: Dict[str, Any],
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        # The streamers are sync (Starlette runs them in its threadpool); chunks are
+        # fetched back on the event loop, where the pool lives
+        chunks = iter_async_chunks(self._export_chunks(filters, chunk_size), asyncio.get_running_loop())
+        return stream_chunks(export_format, chunks)
+
+    async def import_sqlite(self, sqlite_path: str, replace: bool = False, batch_size: int = 20_000):
+        """Bulk-copy an SQLite database (e.g. one built by database_setup.py) into PostgreSQL"""
+        source = sqlite3.connect(sqlite_path)
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    if replace:
+                        # score_sketches is derived from attempts and rebuilt on the next startup
+                        tables = ", ".join([table for table, _ in POSTGRES_COPY_TABLES] + ["score_sketches", "leaderboard_buckets"])
+                        await conn.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+                    existing = {row[0] for row in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                    for table, columns in POSTGRES_COPY_TABLES:
+                        if table not in existing:
+                            continue
+                        converters = [
+                            parse_timestamp if column in TIMESTAMP_COLUMNS
+                            else decompress_text if column == "ai_response" else None
+                            for column in columns
+                        ]
+                        copied = 0
+                        for rows in sqlite_table_batches(source, sqlite_path, table, columns, batch_size):
+                            records = [
+                                tuple(convert(value) if convert else value for convert, value in zip(converters, row))
+                                for row in rows
+                            ]
+                            await conn.copy_records_to_table(table, records=records, columns=columns)
+                            copied += len(records)
+                        if columns[0] == "id" and table != "challenges":
+                            await conn.execute(
+                                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+                            )
+                        print(f"   ... {table}: {copied:,} rows")
+                    # Leaderboard buckets are derived from the attempts just copied
+                    await self._rebuild_leaderboards(conn)
+                    # Inside the transaction: ANALYZE then leaves the rows it copied to the commit's
+                    # own statistics report. Run after the commit it counts them twice, and the
+                    # live-tuple estimates behind read_counters() stay doubled until autovacuum.
+                    await conn.execute("ANALYZE")
+                self.feedback_codec.remember(await conn.fetch("SELECT id, message FROM feedback_messages"))
+        finally:
+            source.close()
+
+
+def sqlite_table_batches(source: sqlite3.Connection, sqlite_path: str, table: str, columns: List[str],
+                         batch_size: int) -> Iterator[list]:
+    """Batches of an SQLite table's rows; for attempts, the archived months come first"""
+    select = f"SELECT {', '.join(columns)} FROM {{table}} a WHERE {{archived}}"
+
+    def batches(cursor):
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    if table == "attempts":
+        for archive in list_archives(source, sqlite_path):
+            with attached(source, archive.path) as alias:
+                yield from batches(source.execute(
+                    select.format(table=f"{alias}.attempts", archived="a.created_at < ?"), (archive.through,)
+                ))
+    yield from batches(source.execute(select.format(table=table, archived="1")))
+
+
+def is_postgres_url(url: str) -> bool:
+    return url.startswith(("postgres://", "postgresql://"))
+
+
+def create_storage(url: str, pool_min_size: int = 2, pool_max_size: int = 10) -> Storage:
+    """PostgresStorage for a postgresql:// URL, otherwise SQLiteStorage for a file path"""
+    if is_postgres_url(url):
+        return PostgresStorage(url, min_size=pool_min_size, max_size=pool_max_size)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteStorage(url)
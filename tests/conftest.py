@@ -0,0 +1,15 @@
+# tests/conftest.py - Shared setup for the pytest suite
+# The app is a set of flat top-level modules and the checks reuse helpers from
+# benchmarks/, so both directories go on sys.path.
+#
+#   python -m pytest -q tests
+#   TEST_POSTGRES_URL=postgresql://localhost/prompt_test python -m pytest -q tests
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
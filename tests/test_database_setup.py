@@ -0,0 +1,43 @@
+# tests/test_database_setup.py - Rebuilding a database only clears its own prompt index
+# The generator deletes the prompt index derived from the rows it drops: the one next to
+# the database file or the path it is given, never a file in the working directory.
+
+from datetime import datetime
+
+import database_setup
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def build(db_path, **options):
+    database_setup.setup_complete_database(db_path=str(db_path), users=4, attempts_per_user=2, days=3,
+                                           seed=1, now=NOW, **options)
+
+
+def test_rebuild_deletes_the_index_next_to_the_database(tmp_path, monkeypatch):
+    workdir, target = tmp_path / "cwd", tmp_path / "data"
+    workdir.mkdir()
+    target.mkdir()
+    monkeypatch.chdir(workdir)
+    unrelated = workdir / database_setup.PROMPT_INDEX_FILE
+    stale = target / database_setup.PROMPT_INDEX_FILE
+    unrelated.write_bytes(b"index of another database")
+    stale.write_bytes(b"index of the old rows")
+
+    build(target / "other.db")
+
+    assert unrelated.exists()
+    assert not stale.exists()
+
+
+def test_rebuild_deletes_an_explicit_index_path(tmp_path):
+    elsewhere = tmp_path / "indexes" / "served.npz"
+    elsewhere.parent.mkdir()
+    elsewhere.write_bytes(b"index of the old rows")
+    beside = tmp_path / database_setup.PROMPT_INDEX_FILE
+    beside.write_bytes(b"kept")
+
+    build(tmp_path / "trainer.db", prompt_index_path=str(elsewhere))
+
+    assert not elsewhere.exists()
+    assert beside.exists()
@@ -0,0 +1,30 @@
+# tests/test_import_budget.py - `import main` must stay cheap
+# Imports main in fresh interpreters with `python -X importtime` (see
+# benchmarks/import_budget.py) and asserts that the heavy dependencies stay lazy and
+# that the best-of-3 import time and the peak RSS stay within the budgets.
+
+import pytest
+
+from import_budget import LAZY_MODULES, MAX_IMPORT_MS, MAX_RSS_MB, measure
+
+RUNS = 3
+
+
+@pytest.fixture(scope="module")
+def runs():
+    return [measure() for _ in range(RUNS)]
+
+
+def test_heavy_modules_stay_lazy(runs):
+    loaded = sorted({name for _, _, names in runs for name in names})
+    assert not loaded, f"imported eagerly by `import main`: {', '.join(loaded)} (lazy: {', '.join(LAZY_MODULES)})"
+
+
+def test_import_time_within_budget(runs):
+    import_ms = min(modules["main"][1] for modules, _, _ in runs) / 1000
+    assert import_ms <= MAX_IMPORT_MS, f"import main took {import_ms:.0f} ms (budget {MAX_IMPORT_MS:.0f} ms)"
+
+
+def test_peak_rss_within_budget(runs):
+    rss_mb = min(rss for _, rss, _ in runs)
+    assert rss_mb <= MAX_RSS_MB, f"peak RSS after import main is {rss_mb:.0f} MB (budget {MAX_RSS_MB:.0f} MB)"
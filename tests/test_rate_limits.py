@@ -0,0 +1,58 @@
+# tests/test_rate_limits.py - Evaluation rate limits debit all their buckets or none
+# A request rejected by one bucket (e.g. an overloaded model) must not spend the tokens of
+# the others, or a client honouring Retry-After drains its own budget on unserved requests.
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from shared_state import LocalStateStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = LocalStateStore()
+    monkeypatch.setattr(main, "state_store", store)
+    monkeypatch.setitem(main.EVALUATE_RATE_LIMITS, "user", (0.01, 5))
+    monkeypatch.setitem(main.EVALUATE_RATE_LIMITS, "model", (0.01, 2))
+    return store
+
+
+def drain(store, key, burst):
+    assert store.take_token(key, 0.01, burst, burst) == 0.0
+
+
+def test_take_tokens_is_all_or_nothing():
+    store = LocalStateStore()
+    drain(store, "b", 1)
+    waits = store.take_tokens([("a", 1.0, 3, 2), ("b", 1.0, 1, 1)])
+    assert waits[0] == 0.0 and waits[1] > 0
+    assert store.bucket_levels("a")["a"] == 3
+    assert store.take_tokens([("a", 1.0, 3, 2), ("a", 1.0, 3, 2)])[0] > 0   # 4 tokens from one bucket of 3
+    assert store.take_tokens([("a", 1.0, 3, 2)]) == [0.0]
+
+
+def test_empty_model_bucket_leaves_user_bucket_untouched(store):
+    drain(store, "evaluate:model:claude", 2)
+    for _ in range(3):
+        with pytest.raises(HTTPException) as rejected:
+            main.check_evaluate_rate_limits(7, ["claude"])
+        assert rejected.value.status_code == 429
+        assert "model" in rejected.value.detail
+    assert store.bucket_levels("evaluate:user:")["evaluate:user:7"] == pytest.approx(5, abs=0.01)
+    assert store.get("evaluate:rejected:model") == 3
+
+
+def test_rejected_compare_spends_no_tokens(store):
+    drain(store, "evaluate:model:gemini", 2)
+    with pytest.raises(HTTPException):
+        main.check_evaluate_rate_limits(7, ["openai", "claude", "gemini"])
+    levels = store.bucket_levels("evaluate:")
+    assert levels["evaluate:user:7"] == pytest.approx(5, abs=0.01)
+    assert levels["evaluate:model:openai"] == pytest.approx(2, abs=0.01)
+    assert levels["evaluate:model:claude"] == pytest.approx(2, abs=0.01)
+
+    main.check_evaluate_rate_limits(7, ["openai", "claude"])
+    levels = store.bucket_levels("evaluate:")
+    assert levels["evaluate:user:7"] == pytest.approx(3, abs=0.01)
+    assert levels["evaluate:model:openai"] == pytest.approx(1, abs=0.01)
@@ -0,0 +1,24 @@
+# tests/test_readability_parity.py - TextAnalysis must match textstat exactly
+# The corpus of benchmarks/readability_parity.py (challenge targets, sample prompts, edge
+# cases and random mutations): the Flesch-Kincaid grade must equal
+# textstat.flesch_kincaid_grade and the word/punctuation counts the old per-metric
+# regexes. Skipped without textstat (only needed for this check) or pyphen.
+
+import pytest
+
+pytest.importorskip("textstat")
+pytest.importorskip("pyphen")
+
+from readability_parity import build_texts, find_mismatches
+
+FUZZ_TEXTS = 2000
+SEED = 7
+
+
+def test_textanalysis_matches_textstat():
+    texts = build_texts(FUZZ_TEXTS, SEED)
+    mismatches = find_mismatches(texts)
+    report = "\n".join(
+        f"{text[:60]!r}: textstat/old {expected} != {actual}" for text, expected, actual in mismatches[:10]
+    )
+    assert not mismatches, f"{len(mismatches)} of {len(texts)} texts differ:\n{report}"
@@ -0,0 +1,87 @@
+# text_analysis.py - Tokenize a text once and share the counts between all metrics
+# The evaluator used to split, lowercase and regex-scan the same response and prompt in
+# every metric, and textstat ran its own punctuation, sentence and syllable passes for the
+# readability grade. TextAnalysis does that work once per string. Its Flesch-Kincaid grade
+# reproduces textstat 0.7.3's flesch_kincaid_grade exactly (same tokenization, the same
+# pyphen hyphenation dictionary textstat uses for syllables, and its rounding), with
+# syllables cached per distinct word. benchmarks/readability_parity.py checks the parity.
+
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List
+
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+# The same characters for ASCII text, removed by str.translate (about 10x faster than the regex)
+ASCII_PUNCTUATION = {code: None for code in range(128) if PUNCTUATION_RE.match(chr(code))}
+SENTENCE_RE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+MIN_SENTENCE_WORDS = 3      # shorter fragments don't count as sentences (as in textstat)
+SENTENCE_SEPARATOR = "\x1f"  # whitespace: survives stripping, so all sentences are stripped in one call
+
+SENTENCE_MARKS = ".!?"
+BRACKETS = "(){}[]"
+QUOTES = "\"'"
+
+@lru_cache(maxsize=None)
+def hyphenator():
+    """The en_US dictionary takes ~170 ms to load, so it is read on first use"""
+    from pyphen import Pyphen
+    return Pyphen(lang="en_US")
+
+
+@lru_cache(maxsize=65536)
+def word_syllables(word: str) -> int:
+    """Syllables in one lowercase, punctuation-free word"""
+    return len(hyphenator().positions(word)) + 1
+
+
+def strip_punctuation(text: str) -> str:
+    return text.translate(ASCII_PUNCTUATION) if text.isascii() else PUNCTUATION_RE.sub("", text)
+
+
+def legacy_round(number: float, points: int = 1) -> float:
+    """Round half away from zero, like textstat"""
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+
+class TextAnalysis:
+    """Word tokens, lowercase form and punctuation/sentence/syllable counts of one text"""
+
+    __slots__ = (
+        "text", "lower", "words", "word_count", "lexicon_count", "sentence_count",
+        "syllable_count", "sentence_marks", "brackets", "quotes",
+    )
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self.words: List[str] = text.split()
+        self.word_count = len(self.words)
+
+        # Punctuation counts
+        self.sentence_marks = sum(map(text.count, SENTENCE_MARKS))
+        self.brackets = sum(map(text.count, BRACKETS))
+        self.quotes = sum(map(text.count, QUOTES))
+
+        # Readability counts: words without punctuation, sentences of 3+ words, syllables
+        stripped = strip_punctuation(text)
+        self.lexicon_count = len(stripped.split())
+        sentences = SENTENCE_RE.findall(text)
+        if SENTENCE_SEPARATOR in text:
+            stripped_sentences = [strip_punctuation(sentence) for sentence in sentences]
+        else:
+            stripped_sentences = strip_punctuation(SENTENCE_SEPARATOR.join(sentences)).split(SENTENCE_SEPARATOR)
+        short = sum(1 for sentence in stripped_sentences if len(sentence.split()) < MIN_SENTENCE_WORDS)
+        self.sentence_count = max(1, len(sentences) - short)
+        # Lowercasing only commutes with stripping for ASCII, as textstat lowercases first
+        stripped_lower = stripped.lower() if text.isascii() else strip_punctuation(self.lower)
+        self.syllable_count = sum(word_syllables(word) * count
+                                  for word, count in Counter(stripped_lower.split()).items())
+
+    def flesch_kincaid_grade(self) -> float:
+        """0.39 * words per sentence + 11.8 * syllables per word - 15.59"""
+        words_per_sentence = legacy_round(self.lexicon_count / self.sentence_count)
+        syllables_per_word = legacy_round(self.syllable_count / self.lexicon_count) if self.lexicon_count else 0.0
+        return legacy_round(0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59)
@@ -0,0 +1,257 @@
+# traffic_capture.py - Opt-in, anonymized capture of production traffic for offline replay
+# With TRAFFIC_CAPTURE_PATH set, TrafficCaptureMiddleware appends one JSON line per
+# captured request to a gzip file (one file per worker, "{worker}" in the path is
+# replaced by its id). Only the evaluation and read endpoints are captured; auth, admin
+# and health endpoints never are. A line holds:
+#   t  arrival (unix seconds)     m/p/q  method, path, query string
+#   u  user pseudonym (keyed HMAC of the user id; never the token or username)
+#   b  JSON body, with prompt text scrubbed     s/d/n  status, duration ms, response bytes
+#   c  provider calls made for it: [model, latency ms, response (scrubbed)]
+# Scrubbing swaps every word for a pseudo-word of the same length, the same one each time
+# it occurs, so lengths, word counts and exact repeats (cache hits, duplicates) survive
+# while the wording doesn't. TRAFFIC_CAPTURE_TEXT=keep stores the text verbatim.
+# Lines are queued and written by one background thread, flushed about once a second;
+# the file only ever grows. benchmarks/replay_traffic.py reads it back.
+
+import contextvars
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# (method, path prefix) of the requests worth replaying
+CAPTURED_ROUTES = [
+    ("POST", "/api/evaluate"),          # and /api/evaluate/compare
+    ("POST", "/api/prompts/similar"),
+    ("GET", "/api/challenges"),
+    ("GET", "/api/leaderboard/"),
+    ("GET", "/api/user/"),
+]
+TEXT_FIELDS = ("prompt",)   # request body fields that hold user-written text
+FLUSH_SECONDS = 1.0
+MAX_BODY_BYTES = 64 * 1024   # larger request bodies are not captured
+
+WORD_RE = re.compile(r"[^\W\d_]+")   # runs of letters
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+# Provider calls of the request being handled (set by the middleware)
+current_calls: contextvars.ContextVar[Optional[List[list]]] = contextvars.ContextVar("current_calls", default=None)
+
+
+def pseudo_word(word: str, key: bytes) -> str:
+    """A pronounceable stand-in for `word` of the same length and capitalization"""
+    digest = hashlib.blake2b(word.lower().encode(), key=key[:64], digest_size=32).digest()
+    letters = []
+    for i in range(len(word)):
+        alphabet = CONSONANTS if i % 2 == 0 else VOWELS
+        letters.append(alphabet[digest[i % len(digest)] % len(alphabet)])
+    fake = "".join(letters)
+    if word.isupper() and len(word) > 1:
+        return fake.upper()
+    return fake.capitalize() if word[0].isupper() else fake
+
+
+def scrub_text(text: str, key: bytes) -> str:
+    return WORD_RE.sub(lambda match: pseudo_word(match.group(), key), text)
+
+
+def capture_file(path: str, worker_id: str) -> str:
+    """The worker's own file: "{worker}" is replaced, or the id goes before the extensions"""
+    if "{worker}" in path:
+        return path.replace("{worker}", worker_id)
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(directory, f"{stem}-{worker_id}{dot}{extensions}")
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of one capture file; a file cut short by a crash ends at its last whole line"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+        except EOFError:
+            return
+
+
+class TrafficCapture:
+    """Owns the capture file of this worker and the thread writing to it"""
+
+    def __init__(self, path: str, key: bytes, sample: float = 1.0, keep_text: bool = False):
+        self.path = path
+        self.key = key
+        self.sample = sample
+        self.keep_text = keep_text
+        self.file_path: Optional[str] = None
+        self.captured = 0
+        self.dropped = 0
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self, worker_id: str):
+        if not self.path or self.active:
+            return
+        self.file_path = capture_file(self.path, worker_id)
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._write, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def wants(self, method: str, path: str) -> bool:
+        if not self.active:
+            return False
+        if not any(method == route_method and path.startswith(prefix) for route_method, prefix in CAPTURED_ROUTES):
+            return False
+        return self.sample >= 1.0 or random.random() < self.sample
+
+    def pseudonym(self, user_id: Any) -> str:
+        return hmac.new(self.key, str(user_id).encode(), hashlib.sha256).hexdigest()[:12]
+
+    def text(self, value: str) -> str:
+        return value if self.keep_text else scrub_text(value, self.key)
+
+    def record(self, entry: Dict[str, Any]):
+        """Queue one record; serialization and I/O happen on the writer thread"""
+        self._queue.put(entry)
+        self.captured += 1
+
+    def _write(self):
+        # Appending starts a new gzip member; gzip readers join the members back up
+        with gzip.open(self.file_path, "ab") as f:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    entry = self._queue.get(timeout=FLUSH_SECONDS)
+                except queue.Empty:
+                    entry = {}   # quiet second: just flush
+                if entry is None:
+                    return
+                if entry:
+                    try:
+                        f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+                    except (TypeError, ValueError):
+                        self.dropped += 1
+                if time.monotonic() - last_flush >= FLUSH_SECONDS:
+                    f.flush(zlib.Z_SYNC_FLUSH)   # readable up to here even if the process dies
+                    last_flush = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"file": self.file_path, "captured": self.captured, "dropped": self.dropped,
+                "sample": self.sample, "text": "keep" if self.keep_text else "scrub"}
+
+
+class RecordingModelManager:
+    """Wraps the AI model manager: each provider call's latency and response are added to
+    the captured request being handled"""
+
+    def __init__(self, inner, capture: TrafficCapture):
+        self.inner = inner
+        self.capture = capture
+
+    async def get_response(self, prompt: str, model_name: str) -> str:
+        started = time.perf_counter()
+        response = await self.inner.get_response(prompt, model_name)
+        calls = current_calls.get()
+        if calls is not None:
+            calls.append([model_name, round((time.perf_counter() - started) * 1000, 2), self.capture.text(response)])
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+
+class TrafficCaptureMiddleware:
+    """Records the captured routes' requests; everything else passes straight through.
+    `identify(token)` returns the user id of a bearer token, or None."""
+
+    def __init__(self, app: ASGIApp, capture: TrafficCapture, identify: Callable[[str], Any]):
+        self.app = app
+        self.capture = capture
+        self.identify = identify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.capture.wants(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        body_parts: List[bytes] = []
+        response = {"status": 0, "bytes": 0}
+        calls: List[list] = []
+        token = current_calls.set(calls)
+
+        async def receive_body() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                body_parts.append(message.get("body", b""))
+            return message
+
+        async def send_counted(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_counted)
+        finally:
+            current_calls.reset(token)
+            self.capture.record(self._entry(scope, arrived, started, b"".join(body_parts), response, calls))
+
+    def _entry(self, scope: Scope, arrived: float, started: float, body: bytes,
+               response: Dict[str, int], calls: List[list]) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {
+            "t": round(arrived, 3),
+            "m": scope["method"],
+            "p": scope["path"],
+            "s": response["status"] or 500,
+            "d": round((time.perf_counter() - started) * 1000, 2),
+            "n": response["bytes"],
+        }
+        query = scope.get("query_string", b"").decode("latin-1")
+        if query:
+            entry["q"] = query
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            user_id = self.identify(authorization[7:])
+            if user_id is not None:
+                entry["u"] = self.capture.pseudonym(user_id)
+        if body and len(body) <= MAX_BODY_BYTES:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                entry["b"] = {
+                    key: self.capture.text(value) if key in TEXT_FIELDS and isinstance(value, str) else value
+                    for key, value in payload.items()
+                }
+        if calls:
+            entry["c"] = calls
+        return entry